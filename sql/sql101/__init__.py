@@ -0,0 +1,14 @@
+"""Helpers for running the SQL lessons on more than a handful of rows.
+
+The lesson notebooks in this folder work on a tiny `my_database.db`. The
+modules in this package generate bigger versions of the same star schema
+and provide the tooling we use to make the lesson queries fast on them.
+
+Run notebooks (and `python -m sql101.<module>`) from the `sql/` folder so
+that both this package and `my_database.db` are found.
+"""
+
+import os
+
+# The shared lesson database sits right next to this package
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "my_database.db")
@@ -0,0 +1,154 @@
+"""Asyncio API for running lesson queries from services.
+
+The %%sql magic blocks until the query is done. `AsyncDB` runs queries
+on a bounded pool of read-only sqlite3 connections, one per worker
+thread, so an asyncio service can await many of them at once:
+
+    db = AsyncDB("my_database.db", size=4)
+    rows = await db.fetch("SELECT * FROM sql_101_store WHERE store_id = ?", (1,))
+    metrics = await db.batch(lesson_queries("3_Group"))   # {"cell 5": rows, ...}
+    await db.close()
+
+- Pool: `size` connections and threads. A query waits for a free
+  connection, never opens a new one.
+- Backpressure: at most `max_pending` queries are running or waiting
+  for a connection; further `fetch` calls wait before queueing.
+- Timeouts and cancellation: when a query times out (per call or the
+  pool's default `timeout`) or its task is cancelled, the running
+  statement is stopped with `sqlite3.Connection.interrupt()`. Its
+  connection and its `max_pending` slot are only given back once the
+  worker thread is done with it.
+- `close` cancels the queries still waiting for a connection, waits for
+  the running ones and only then closes the connections.
+- `batch` runs a dict of queries concurrently and returns their rows
+  under the same keys; the first failure cancels the rest.
+
+sqlite3 releases the GIL while SQLite works, so queries on different
+connections run in parallel on a multi-core machine.
+"""
+
+import asyncio
+import concurrent.futures
+
+from . import DEFAULT_DB
+from .lessons import lesson_path, sql_cells
+from .schema import split_statements
+from .wal import connect
+
+
+def lesson_queries(name="3_Group"):
+    """{"cell N": sql} for the read-only statements of a lesson (e.g. the 3_Group metrics)."""
+    queries = {}
+    for cell, text in sql_cells(lesson_path(name)):
+        statements = [s for s in split_statements(text) if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+        for number, statement in enumerate(statements, 1):
+            queries[f"cell {cell}" if len(statements) == 1 else f"cell {cell}.{number}"] = statement
+    return queries
+
+
+def _fetchall(conn, sql, params):
+    return conn.execute(sql, params).fetchall()
+
+
+class AsyncDB:
+    """A pool of read-only connections to `db_path`, used from asyncio."""
+
+    def __init__(self, db_path=DEFAULT_DB, size=4, max_pending=None, timeout=None):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix="sql101-aio")
+        self._connections = [connect(db_path, readonly=True, check_same_thread=False) for _ in range(size)]
+        self._idle = None
+        self._pending = None
+        self._max_pending = max_pending or 4 * size
+        self._closed = False
+        self._waiting = set()  # fetch tasks waiting for a slot or a connection
+        self._running = set()  # executor futures of the queries running now
+
+    def _init_loop_state(self):
+        # Created on first use so they belong to the running event loop
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for conn in self._connections:
+                self._idle.put_nowait(conn)
+            self._pending = asyncio.Semaphore(self._max_pending)
+
+    async def fetch(self, sql, params=(), timeout=None):
+        """Run one query and return all its rows.
+
+        Raises TimeoutError after `timeout` seconds (default: the pool's),
+        having interrupted the query.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncDB is closed")
+        self._init_loop_state()
+        timeout = self.timeout if timeout is None else timeout
+        task = asyncio.current_task()
+        self._waiting.add(task)
+        try:
+            await self._pending.acquire()
+            try:
+                conn = await self._idle.get()
+            except BaseException:
+                self._pending.release()
+                raise
+        finally:
+            self._waiting.discard(task)
+        if self._closed:
+            self._idle.put_nowait(conn)
+            self._pending.release()
+            raise RuntimeError("AsyncDB is closed")
+        future = asyncio.get_running_loop().run_in_executor(self._executor, _fetchall, conn, sql, params)
+        self._running.add(future)
+
+        def done(_):
+            # Free again once the thread is done with the connection, whatever happens to us
+            self._running.discard(future)
+            self._idle.put_nowait(conn)
+            self._pending.release()
+
+        future.add_done_callback(done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Once the query is done, `conn` may already run someone else's query
+            if not future.done():
+                conn.interrupt()
+            # Don't leave the interrupted query's error unretrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+
+    async def batch(self, queries, timeout=None):
+        """Run {key: sql or (sql, params)} concurrently; returns {key: rows}."""
+        keys = list(queries)
+        tasks = []
+        for key in keys:
+            query = queries[key]
+            sql, params = (query, ()) if isinstance(query, str) else query
+            tasks.append(asyncio.ensure_future(self.fetch(sql, params, timeout)))
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return dict(zip(keys, results))
+
+    async def close(self):
+        """Cancel the queries waiting for a connection, wait for the running ones, then close the connections."""
+        self._closed = True
+        for task in list(self._waiting):
+            task.cancel()
+        if self._running:
+            await asyncio.wait(set(self._running))
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+        for conn in self._connections:
+            conn.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,42 @@
+"""Benchmarks for the sql101 tools, run as `python -m sql101.benchmarks.<name>`.
+
+Each benchmark generates (or reuses) a scaled database with
+`sql101.datagen` and prints its timings as a small table.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from ..datagen import generate
+
+
+def scaled_db(path=None, scale=1000, seed=0, reuse=False, **kwargs):
+    """Return the path of a generated database, building it unless `reuse` finds one.
+
+    The default file name includes the `generate` options in `kwargs`, so
+    e.g. the builds with and without indexes are different files.
+    """
+    options = "".join(f"_{name}" if value is True else f"_{name}{value}"
+                      for name, value in sorted(kwargs.items()) if value not in (False, None))
+    path = path or os.path.join(tempfile.gettempdir(), f"sql101_sf{scale:g}_seed{seed}{options}.db")
+    if not (reuse and os.path.exists(path)):
+        print(f"Generating scale {scale:g} into {path} ...")
+        stats = generate(path, scale=scale, seed=seed, **kwargs)
+        print(f"  {stats['transactions']:,} transactions in {stats['seconds']}s")
+    return path
+
+
+def connect(path):
+    return sqlite3.connect(path)
+
+
+def print_table(headers, rows):
+    """Print rows as a plain fixed-width table."""
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows)) if rows else len(str(h))
+              for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)))
@@ -0,0 +1,72 @@
+"""The 3_Group metrics one after the other vs concurrently with `sql101.aio`.
+
+Builds sql_101_transactions_ext on a scaled database, runs every 3_Group
+query sequentially on one connection, then as one `AsyncDB.batch` with
+pools of 1, 2, 4, ... connections up to the core count. Also shows how
+long a query that times out keeps running before the interrupt stops it.
+
+    python -m sql101.benchmarks.aio --scale 1000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from .. import ext
+from ..aio import AsyncDB, lesson_queries
+from ..timing import format_ms, time_call
+from . import connect, print_table, scaled_db
+
+SLOW_QUERY = "SELECT COUNT(*) FROM sql_101_transactions a, sql_101_transactions b"
+
+
+def run_batch(path, queries, size):
+    async def batch():
+        async with AsyncDB(path, size=size) as db:
+            return await db.batch(queries)
+    return asyncio.run(batch())
+
+
+def timeout_latency(path, timeout):
+    """Seconds from the start of a query with `timeout` until fetch raises."""
+    async def fetch():
+        async with AsyncDB(path, size=1) as db:
+            started = time.perf_counter()
+            try:
+                await db.fetch(SLOW_QUERY, timeout=timeout)
+            except TimeoutError:
+                return time.perf_counter() - started
+    return asyncio.run(fetch())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed)
+    conn = connect(path)
+    ext.rebuild(conn)
+    queries = lesson_queries("3_Group")
+    cores = os.cpu_count() or 1
+    print(f"{len(queries)} 3_Group queries, {cores} core(s)")
+
+    sequential = time_call(lambda: {key: conn.execute(sql).fetchall() for key, sql in queries.items()},
+                           repeat=args.repeat)
+    rows = [["sequential, 1 connection", format_ms(sequential["median"]), "1.00x", ""]]
+    for size in sorted({1, 2, 4, cores}):
+        run = time_call(lambda: run_batch(path, queries, size), repeat=args.repeat)
+        rows.append([f"AsyncDB.batch, {size} connection(s)", format_ms(run["median"]),
+                     f"{sequential['median'] / run['median']:,.2f}x",
+                     "yes" if run["result"] == sequential["result"] else "NO"])
+    conn.close()
+    print_table(["run", "median", "speedup", "same rows"], rows)
+    print(f"\nA query with timeout=0.1s raised after {format_ms(timeout_latency(path, 0.1))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Kernel start: the lessons' cell 2 vs `sql101.bootstrap.setup()`.
+
+Each measurement runs in a fresh Python process with an IPython shell, the
+way a new notebook kernel would:
+
+- cold: the first run of the setup cell in that process
+- warm: running the same cell again (e.g. "Run all" after a restart of
+  the notebook but not of the kernel)
+
+Run from the `sql/` folder (needs IPython and ipython-sql installed):
+
+    python -m sql101.benchmarks.bootstrap
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from . import print_table
+from ..timing import format_ms
+
+# The lessons' cell 2, as the jupytext export runs it
+LESSON_CELL = """
+import subprocess, sys
+subprocess.run([sys.executable, "-m", "pip", "-q", "install", "ipython-sql"], check=True)
+ip.run_line_magic("load_ext", "sql")
+ip.run_line_magic("sql", "sqlite:///" + DB)
+"""
+
+BOOTSTRAP_CELL = """
+from sql101.bootstrap import setup
+setup(DB, ip=ip, quiet=True)
+"""
+
+# Runs the cell twice in one kernel-like process and prints both timings as JSON
+DRIVER = """
+import json, sys, time
+from IPython.core.interactiveshell import InteractiveShell
+ip = InteractiveShell.instance()
+DB = sys.argv[1]
+cell = sys.argv[2]
+timings = []
+for _ in range(2):
+    started = time.perf_counter()
+    exec(cell)
+    timings.append(time.perf_counter() - started)
+print(json.dumps(timings))
+"""
+
+
+def measure(cell, db_path):
+    """(cold, warm) seconds for `cell` in a fresh process."""
+    output = subprocess.run([sys.executable, "-c", DRIVER, db_path, cell],
+                            check=True, capture_output=True, text=True).stdout
+    cold, warm = json.loads(output.strip().splitlines()[-1])
+    return cold, warm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark notebook setup: pip install vs sql101.bootstrap.")
+    parser.add_argument("--db", default="my_database.db")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per variant")
+    args = parser.parse_args(argv)
+    db_path = os.path.abspath(args.db)
+
+    rows = []
+    for label, cell in (("lesson cell 2 (pip install)", LESSON_CELL), ("bootstrap.setup()", BOOTSTRAP_CELL)):
+        runs = [measure(cell, db_path) for _ in range(args.repeat)]
+        cold = statistics.median(r[0] for r in runs)
+        warm = statistics.median(r[1] for r in runs)
+        rows.append([label, format_ms(cold), format_ms(warm)])
+    print_table(["setup", "cold start", "warm re-run"], rows)
+
+
+if __name__ == "__main__":
+    main()
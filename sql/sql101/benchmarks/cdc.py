@@ -0,0 +1,125 @@
+"""The cost of `sql101.cdc` on writes, and reading the log back.
+
+Two fresh databases with the same products and stores, one with CDC
+enabled. On each, in one transaction per step:
+
+- --rows transactions inserted with batched executemany (`datagen.insert_rows`),
+- the same rows copied again with one INSERT ... SELECT,
+- an UPDATE and a DELETE of 10% of the rows.
+
+Reports each step's time and rows/s with and without the triggers, and
+how big the log got (dbstat). Then a consumer polls and acks the whole
+log in batches and `compact` empties it.
+
+    python -m sql101.benchmarks.cdc --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from .. import cdc
+from ..datagen import insert_rows, iter_products, iter_stores, iter_transactions, products_for_scale
+from ..schema import COLUMNS, create_tables
+from . import connect, print_table
+
+N_STORES = 10
+
+TABLE = "sql_101_transactions"
+
+
+def prepare(path, n_rows, seed):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    create_tables(conn)
+    products = list(iter_products(products_for_scale(n_rows / 1000), seed))
+    insert_rows(conn, "sql_101_product", COLUMNS["sql_101_product"], products)
+    insert_rows(conn, "sql_101_store", COLUMNS["sql_101_store"], iter_stores(N_STORES, seed))
+    return conn, [row[5] for row in products]
+
+
+def run_steps(conn, rows):
+    """{step: (seconds, rows changed)} for the write workload."""
+    n = len(rows)
+    steps = {}
+
+    started = time.perf_counter()
+    insert_rows(conn, TABLE, COLUMNS[TABLE], rows, rows_per_transaction=n)
+    steps["executemany INSERT"] = (time.perf_counter() - started, n)
+
+    statements = [
+        ("INSERT ... SELECT", f"INSERT INTO {TABLE} SELECT transaction_id + {n}, transaction_date, customer_id, "
+                              f"amount, price_per_unit, sku_id, store_id FROM {TABLE}"),
+        ("UPDATE 10%", f"UPDATE {TABLE} SET amount = amount + 1 WHERE transaction_id % 10 = 0"),
+        ("DELETE 10%", f"DELETE FROM {TABLE} WHERE transaction_id % 10 = 1"),
+    ]
+    for label, sql in statements:
+        started = time.perf_counter()
+        with conn:
+            changed = conn.execute(sql).rowcount
+        steps[label] = (time.perf_counter() - started, changed)
+    return steps
+
+
+def log_bytes(conn):
+    return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (cdc.LOG_TABLE,)).fetchone()[0] or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=10_000, help="changes per poll")
+    args = parser.parse_args(argv)
+
+    plain_path = os.path.join(tempfile.gettempdir(), "sql101_cdc_plain.db")
+    cdc_path = os.path.join(tempfile.gettempdir(), "sql101_cdc_logged.db")
+    plain, list_prices = prepare(plain_path, args.rows, args.seed)
+    logged, _ = prepare(cdc_path, args.rows, args.seed)
+    cdc.enable(logged)
+    cdc.subscribe(logged, "benchmark")
+    rows = list(iter_transactions(args.rows, list_prices, N_STORES, args.seed))
+
+    print(f"Writing {args.rows:,} transactions without and with CDC ...")
+    without = run_steps(plain, rows)
+    with_cdc = run_steps(logged, rows)
+    table = []
+    for step, (seconds, changed) in without.items():
+        logged_seconds = with_cdc[step][0]
+        table.append([step, f"{changed:,}", f"{seconds:,.2f} s", f"{logged_seconds:,.2f} s",
+                      f"{changed / seconds:,.0f}", f"{changed / logged_seconds:,.0f}",
+                      f"{logged_seconds / seconds - 1:+.0%}"])
+    print_table(["step", "rows", "no CDC", "CDC", "rows/s", "rows/s with CDC", "overhead"], table)
+
+    stats = cdc.stats(logged)
+    size = log_bytes(logged)
+    print(f"\nLog: {stats['changes']:,} changes, {size / 2**20:,.1f} MB "
+          f"({size / stats['changes']:,.0f} bytes per change)")
+
+    started = time.perf_counter()
+    consumed = 0
+    while True:
+        changes = cdc.poll(logged, "benchmark", args.batch)
+        if not changes:
+            break
+        consumed += len(changes)
+        cdc.ack(logged, "benchmark", changes[-1]["seq"])
+    consume = time.perf_counter() - started
+    started = time.perf_counter()
+    deleted = cdc.compact(logged)
+    compact = time.perf_counter() - started
+    print()
+    print_table(["consumer", "changes", "time", "changes/s"], [
+        [f"poll + ack, {args.batch:,} per batch", f"{consumed:,}", f"{consume:,.2f} s", f"{consumed / consume:,.0f}"],
+        ["compact", f"{deleted:,}", f"{compact:,.2f} s", f"{deleted / compact:,.0f}"],
+    ])
+
+    for conn, path in ((plain, plain_path), (logged, cdc_path)):
+        conn.close()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
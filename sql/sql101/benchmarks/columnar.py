@@ -0,0 +1,89 @@
+"""3_Group queries: SQLite vs the NumPy column store, with a result check.
+
+    python -m sql101.benchmarks.columnar --scale 1000
+    python -m sql101.benchmarks.columnar --scale 50000
+"""
+
+import argparse
+import time
+
+from .. import ext
+from ..columnar import ColumnStore
+from ..timing import format_ms, time_call, time_query
+from . import connect, print_table, scaled_db
+
+AFTER_JUNE = [("transaction_date", ">", "2024-06-01")]
+
+# (label, 3_Group SQL, aggregates, group_by, where)
+QUERIES = [
+    ("SUM(tot_spent) after June 1 (cell 5)",
+     "SELECT SUM(tot_spent) FROM sql_101_transactions_ext WHERE transaction_date > '2024-06-01'",
+     [("sum", "tot_spent")], [], AFTER_JUNE),
+    ("SUM(amount) after June 1 (cell 7)",
+     "SELECT SUM(amount) FROM sql_101_transactions_ext WHERE transaction_date > '2024-06-01'",
+     [("sum", "amount")], [], AFTER_JUNE),
+    ("MIN/MAX/AVG/COUNT after June 1 (cells 9-13)",
+     """SELECT MIN(tot_spent), MAX(tot_spent), AVG(tot_spent), COUNT(*)
+FROM sql_101_transactions_ext WHERE transaction_date > '2024-06-01'""",
+     [("min", "tot_spent"), ("max", "tot_spent"), ("avg", "tot_spent"), ("count", "*")], [], AFTER_JUNE),
+    ("Spaghetti N5 stats (cell 18)",
+     """SELECT MIN(tot_spent), MAX(tot_spent), AVG(tot_spent), SUM(tot_spent)
+FROM sql_101_transactions_ext WHERE product_name = 'Spaghetti N5'""",
+     [("min", "tot_spent"), ("max", "tot_spent"), ("avg", "tot_spent"), ("sum", "tot_spent")], [],
+     [("product_name", "=", "Spaghetti N5")]),
+    ("GROUP BY brand, category (cell 23)",
+     """SELECT brand, category, COUNT(*), SUM(tot_spent), AVG(price_per_unit), AVG(tot_spent),
+       MAX(transaction_date)
+FROM sql_101_transactions_ext GROUP BY brand, category ORDER BY brand, category""",
+     [("count", "*"), ("sum", "tot_spent"), ("avg", "price_per_unit"), ("avg", "tot_spent"),
+      ("max", "transaction_date")], ["brand", "category"], []),
+    ("GROUP BY store_name (cell 26)",
+     """SELECT store_name, COUNT(*), AVG(price_per_unit), AVG(tot_spent), MAX(transaction_date)
+FROM sql_101_transactions_ext GROUP BY store_name ORDER BY store_name""",
+     [("count", "*"), ("avg", "price_per_unit"), ("avg", "tot_spent"), ("max", "transaction_date")],
+     ["store_name"], []),
+    ("GROUP BY brand, product_name from June 1 (cell 31)",
+     """SELECT brand, product_name, MAX(transaction_date), SUM(tot_spent)
+FROM sql_101_transactions_ext WHERE transaction_date >= '2024-06-01'
+GROUP BY brand, product_name ORDER BY brand, product_name""",
+     [("max", "transaction_date"), ("sum", "tot_spent")], ["brand", "product_name"],
+     [("transaction_date", ">=", "2024-06-01")]),
+]
+
+
+def identical(a, b):
+    """Same rows, same values and same Python types (int vs float) in every cell."""
+    return a == b and all(type(x) is type(y) for ra, rb in zip(a, b) for x, y in zip(ra, rb))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed, args.reuse)
+    conn = connect(path)
+    if not ext.is_managed(conn):
+        ext.rebuild(conn)
+
+    started = time.perf_counter()
+    store = ColumnStore.from_sqlite(conn)
+    print(f"Loaded {store.n_rows:,} rows into NumPy in {time.perf_counter() - started:.1f}s\n")
+
+    rows = []
+    for label, sql, aggregates, group_by, where in QUERIES:
+        sqlite = time_query(conn, sql, repeat=args.repeat)
+        numpy = time_call(lambda: store.aggregate(aggregates, group_by, where), repeat=args.repeat)
+        same = identical(conn.execute(sql).fetchall(), numpy["result"])
+        rows.append([label, format_ms(sqlite["median"]), format_ms(numpy["median"]),
+                     f"{sqlite['median'] / numpy['median']:,.1f}x", "yes" if same else "NO"])
+    conn.close()
+    print_table(["query", "SQLite", "NumPy", "speedup", "identical"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""A daily customer feed with `sql101.customers` vs the lesson's row-wise DML.
+
+Loads --customers customers (2% without an email) into a keyed
+hkt_sql_customers, then syncs a feed of the same size: 95% known
+customers (5% of them with changes) and 5% new ones, in one transaction.
+Then compares cell 45's email backfill with and without the partial
+index, and cells 42-46's statement-per-row style (UPDATE by id, INSERT
+when nothing matched, DELETE by id on the unkeyed table) on a sample of
+the feed.
+
+    python -m sql101.benchmarks.customers --customers 5000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from .. import customers
+from ..timing import format_ms
+from . import connect, print_table
+
+NAIVE_SAMPLE = 20
+
+
+def customer(customer_id, seed):
+    """The same row for the same id and seed; 2% of them without an email."""
+    # A multiplicative hash rather than a Random per row, to keep the feed cheap
+    bucket = (customer_id * 2654435761 + seed) % 100
+    email = None if bucket < 2 else f"c{customer_id}@example.com"
+    return (customer_id, f"Customer {customer_id}", 18 + customer_id % 60, email)
+
+
+def feed(n, seed):
+    """n feed rows: 95% known ids (1 in 20 of them changed), then 5% new ones."""
+    rng = random.Random(seed)
+    known = n - n // 20
+    for customer_id in range(1, known + 1):
+        row = customer(customer_id, seed)
+        if rng.random() < 0.05:
+            row = row[:2] + (row[2] + 1, f"new{customer_id}@example.com")
+        yield row
+    for customer_id in range(n + 1, n + n // 20 + 1):
+        yield customer(customer_id, seed)
+
+
+def seconds(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def naive_upsert(conn, table, rows):
+    """Cells 42-45: UPDATE the row by id, INSERT it when nothing matched."""
+    for row in rows:
+        if not conn.execute(f"UPDATE {table} SET customer_name = ?, customer_age = ?, customer_email = ? "
+                            f"WHERE customer_id = ?", row[1:] + row[:1]).rowcount:
+            conn.execute(f"INSERT INTO {table} VALUES (?, ?, ?, ?)", row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)create, defaults to a temp file")
+    parser.add_argument("--customers", type=int, default=5_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join(tempfile.gettempdir(), "sql101_customers.db")
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    n = args.customers
+
+    customers.prepare(conn)
+    load = customers.sync(conn, (customer(i, args.seed) for i in range(1, n + 1)))
+    daily = customers.sync(conn, feed(n, args.seed))
+    rows = [
+        ["initial load", f"{load['rows']:,}", f"{load['inserted']:,}", f"{load['updated']:,}",
+         f"{load['unchanged']:,}", format_ms(load["seconds"]), f"{load['rows'] / load['seconds']:,.0f}"],
+        ["daily feed", f"{daily['rows']:,}", f"{daily['inserted']:,}", f"{daily['updated']:,}",
+         f"{daily['unchanged']:,}", format_ms(daily["seconds"]), f"{daily['rows'] / daily['seconds']:,.0f}"],
+    ]
+    print_table(["sync", "rows", "inserted", "updated", "unchanged", "time", "rows/s"], rows)
+
+    # A backfill job: find a batch of incomplete rows, then cell 45's UPDATE.
+    # With the partial index, then without it (dropped inside the transaction);
+    # both are rolled back.
+    find = f"SELECT customer_id FROM {customers.TABLE} WHERE customer_email IS NULL LIMIT 1000"
+    update = f"UPDATE {customers.TABLE} SET customer_email = ? WHERE customer_email IS NULL"
+    backfill = []
+    for label in ["partial index", "table scan"]:
+        conn.execute("BEGIN")
+        if label == "table scan":
+            conn.execute(f"DROP INDEX {customers.MISSING_EMAIL_INDEX}")
+        found, _ = seconds(lambda: conn.execute(find).fetchall())
+        updated, count = seconds(lambda: conn.execute(update, (customers.DEFAULT_EMAIL,)).rowcount)
+        conn.rollback()
+        backfill.append([label, format_ms(found), f"{count:,}", format_ms(updated)])
+    print()
+    print_table(["backfill", "first 1,000 ids", "rows updated", "UPDATE ... WHERE email IS NULL"], backfill)
+
+    # The lesson's unkeyed table, one statement per row
+    naive_table = "hkt_sql_customers_naive"
+    with conn:
+        conn.execute(f"CREATE TABLE {naive_table} AS SELECT * FROM {customers.TABLE}")
+    sample = [row for row, _ in zip(feed(n, args.seed + 1), range(NAIVE_SAMPLE))]
+    naive, _ = seconds(lambda: naive_upsert(conn, naive_table, sample))
+    conn.rollback()
+    keyed, _ = seconds(lambda: naive_upsert(conn, customers.TABLE, sample))
+    conn.rollback()
+    ids = [row[0] for row in sample]
+    naive_delete, _ = seconds(lambda: conn.executemany(f"DELETE FROM {naive_table} WHERE customer_id = ?",
+                                                       [(i,) for i in ids]))
+    conn.rollback()
+    keyed_delete, _ = seconds(lambda: conn.executemany(f"DELETE FROM {customers.TABLE} WHERE customer_id = ?",
+                                                       [(i,) for i in ids]))
+    conn.rollback()
+    def per_row(total, count=NAIVE_SAMPLE):
+        return f"{total / count * 1e6:,.1f} us"
+
+    print(f"\nPer feed row ({NAIVE_SAMPLE} sampled for the statement-per-row runs):")
+    print_table(["method", "per row", f"{n:,} rows"], [
+        ["UPDATE/INSERT per row, no key", per_row(naive), f"{naive / NAIVE_SAMPLE * n / 3600:,.1f} h"],
+        ["UPDATE/INSERT per row, keyed", per_row(keyed), f"{keyed / NAIVE_SAMPLE * n:,.1f} s"],
+        ["customers.sync", per_row(daily["seconds"], daily["rows"]), f"{daily['seconds']:,.1f} s"],
+        ["DELETE by id, no key", per_row(naive_delete), ""],
+        ["DELETE by id, keyed", per_row(keyed_delete), ""],
+    ])
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
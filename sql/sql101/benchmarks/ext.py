@@ -0,0 +1,63 @@
+"""Full rebuild vs incremental refresh of sql_101_transactions_ext.
+
+    python -m sql101.benchmarks.ext --scale 1000
+"""
+
+import argparse
+import time
+
+from .. import ext
+from ..datagen import iter_transactions, insert_rows
+from ..indexes import apply
+from ..schema import COLUMNS
+from ..timing import format_ms
+from . import connect, print_table, scaled_db
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--new-rows", type=int, default=1000, help="transactions appended before the refresh")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed)
+    conn = connect(path)
+    apply(conn)
+
+    rows = []
+    seconds, result = timed(lambda: ext.rebuild(conn))
+    rows.append(["full rebuild (2_Join cell 26)", result["rows"], format_ms(seconds)])
+
+    # Append a day's worth of new transactions after the current high-water mark
+    list_prices = [r[0] for r in conn.execute("SELECT list_price FROM sql_101_product ORDER BY sku_id")]
+    n_stores = conn.execute("SELECT COUNT(*) FROM sql_101_store").fetchone()[0]
+    first_id = ext.high_water(conn) + 1
+    conn.isolation_level = None
+    insert_rows(conn, "sql_101_transactions", COLUMNS["sql_101_transactions"],
+                iter_transactions(args.new_rows, list_prices, n_stores, seed=args.seed + 1, first_id=first_id))
+    conn.isolation_level = ""
+    seconds, result = timed(lambda: ext.refresh(conn))
+    rows.append([f"refresh after {args.new_rows:,} new transactions", result["appended"], format_ms(seconds)])
+
+    # A brand correction on a mid-popularity SKU
+    with conn:
+        conn.execute("UPDATE sql_101_product SET brand = brand || ' (fixed)' WHERE sku_id = 50")
+    seconds, result = timed(lambda: ext.refresh(conn))
+    rows.append(["refresh after a brand fix on sku_id 50", result["rederived"], format_ms(seconds)])
+
+    seconds, result = timed(lambda: ext.check(conn))
+    rows.append([f"consistency check (ok={result['ok']})", result["ext_rows"], format_ms(seconds)])
+    conn.close()
+    print_table(["operation", "rows", "time"], rows)
+
+
+if __name__ == "__main__":
+    main()
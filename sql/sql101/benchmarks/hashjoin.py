@@ -0,0 +1,101 @@
+"""SQLite joins vs the NumPy broadcast hash join.
+
+Runs 2_Join cell 11 (transactions x product x store, all rows fetched),
+its LEFT JOIN version and the cell 26 CREATE TABLE ... AS on a scaled
+database, once in SQLite and once with `sql101.hashjoin`, and checks
+that both give the same rows.
+
+    python -m sql101.benchmarks.hashjoin --scale 1000
+"""
+
+import argparse
+
+from .. import hashjoin
+from ..timing import format_ms, time_call
+from . import connect, print_table, scaled_db
+
+FACT_SQL = "SELECT * FROM sql_101_transactions"
+EXT_FACT_SQL = "SELECT t.*, t.amount * t.price_per_unit AS tot_spent FROM sql_101_transactions t"
+PRODUCT_COLUMNS = ["brand", "category", "list_price", "product_name"]
+STORE_COLUMNS = ["store_location", "store_name"]
+
+# 2_Join cell 11
+JOIN_SQL = """SELECT t.*, p.brand, p.category, p.list_price, p.product_name, s.store_location, s.store_name
+FROM sql_101_transactions t
+{join} sql_101_product p ON t.sku_id = p.sku_id
+{join} sql_101_store s ON t.store_id = s.store_id"""
+
+# 2_Join cell 26
+CTAS_SQL = """CREATE TABLE {table} AS
+SELECT t.*, t.amount * t.price_per_unit AS tot_spent,
+  p.brand, p.category, p.list_price, p.product_name, s.store_location, s.store_name
+FROM sql_101_transactions t
+JOIN sql_101_product p ON t.sku_id = p.sku_id
+JOIN sql_101_store s ON t.store_id = s.store_id"""
+
+
+def dimensions(conn):
+    product = hashjoin.Dimension.from_sqlite(conn, "sql_101_product", "sku_id", PRODUCT_COLUMNS)
+    store = hashjoin.Dimension.from_sqlite(conn, "sql_101_store", "store_id", STORE_COLUMNS)
+    return product, store
+
+
+def sqlite_ctas(conn, table):
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(CTAS_SQL.format(table=table))
+
+
+def hashjoin_ctas(conn, table):
+    product, store = dimensions(conn)
+    with conn:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    hashjoin.create_table_as(conn, table, EXT_FACT_SQL, [("sku_id", product, "inner"), ("store_id", store, "inner")])
+
+
+def same_table(conn, a, b):
+    differences = conn.execute(f"SELECT COUNT(*) FROM (SELECT * FROM {a} EXCEPT SELECT * FROM {b})").fetchone()[0]
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in (a, b)]
+    return differences == 0 and counts[0] == counts[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    conn = connect(scaled_db(args.db, args.scale, args.seed))
+    rows = []
+    for label, join, how in (("cell 11: INNER JOIN", "JOIN", "inner"), ("cell 11 as LEFT JOIN", "LEFT JOIN", "left")):
+        sql = JOIN_SQL.format(join=join)
+        sqlite = time_call(lambda: conn.execute(sql).fetchall(), repeat=args.repeat)
+
+        def python_join():
+            product, store = dimensions(conn)
+            return hashjoin.join_rows(conn, FACT_SQL, [("sku_id", product, how), ("store_id", store, how)],
+                                      chunk_size=args.chunk_size)[1]
+
+        numpy = time_call(python_join, repeat=args.repeat)
+        same = sqlite["result"] == numpy["result"]
+        sqlite["result"] = numpy["result"] = None
+        rows.append([label, format_ms(sqlite["median"]), format_ms(numpy["median"]),
+                     f"{sqlite['median'] / numpy['median']:,.2f}x", "yes" if same else "NO"])
+
+    sqlite = time_call(lambda: sqlite_ctas(conn, "sql101_bench_ext_sqlite"), repeat=args.repeat)
+    numpy = time_call(lambda: hashjoin_ctas(conn, "sql101_bench_ext_hashjoin"), repeat=args.repeat)
+    same = same_table(conn, "sql101_bench_ext_sqlite", "sql101_bench_ext_hashjoin")
+    rows.append(["cell 26: CREATE TABLE AS", format_ms(sqlite["median"]), format_ms(numpy["median"]),
+                 f"{sqlite['median'] / numpy['median']:,.2f}x", "yes" if same else "NO"])
+    with conn:
+        conn.execute("DROP TABLE sql101_bench_ext_sqlite")
+        conn.execute("DROP TABLE sql101_bench_ext_hashjoin")
+    print_table(["query", "SQLite", "hash join", "speedup", "same rows"], rows)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Lesson query timings without and with `sql101.indexes`.
+
+    python -m sql101.benchmarks.indexes --scale 1000
+"""
+
+import argparse
+
+from ..indexes import apply, drop_indexes
+from ..timing import format_ms, time_query
+from . import connect, print_table, scaled_db
+
+# (label, query) pairs taken from the lessons
+QUERIES = [
+    ("1_Select c21 date BETWEEN", """SELECT * FROM sql_101_transactions
+WHERE transaction_date BETWEEN '2024-06-01' AND '2024-06-30'"""),
+    ("1_Select c23 customer_id = 101", """SELECT transaction_date, customer_id, amount,
+       amount * price_per_unit AS total_price
+FROM sql_101_transactions WHERE customer_id = 101"""),
+    ("1_Select c28 DISTINCT sku_id", "SELECT DISTINCT sku_id FROM sql_101_transactions"),
+    ("1_Select c29 DISTINCT customer, sku", """SELECT DISTINCT customer_id, sku_id
+FROM sql_101_transactions ORDER BY customer_id, sku_id"""),
+    ("1_Select c31 DISTINCT customer sku=1", """SELECT DISTINCT customer_id
+FROM sql_101_transactions WHERE sku_id = 1"""),
+    ("2_Join c18 sku_id = 6", "SELECT * FROM sql_101_transactions WHERE sku_id = 6"),
+    ("2_Join c19 product sku_id = 6", "SELECT * FROM sql_101_product WHERE sku_id = 6"),
+    ("2_Join c20 join sku_id = 6", """SELECT * FROM sql_101_transactions t
+JOIN sql_101_product p ON t.sku_id = p.sku_id
+WHERE t.sku_id = 6 ORDER BY t.transaction_date"""),
+    ("2_Join c11 three-way join, 1 month", """SELECT t.*, p.brand, p.category, p.list_price, p.product_name,
+       s.store_location, s.store_name
+FROM sql_101_transactions t
+JOIN sql_101_product p ON t.sku_id = p.sku_id
+JOIN sql_101_store s ON t.store_id = s.store_id
+WHERE t.transaction_date BETWEEN '2024-06-01' AND '2024-06-30'"""),
+]
+
+
+def run(conn, repeat):
+    return {label: time_query(conn, sql, repeat=repeat) for label, sql in QUERIES}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="reuse --db if it exists")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed, args.reuse)
+    conn = connect(path)
+    drop_indexes(conn)
+    before = run(conn, args.repeat)
+    apply(conn)
+    after = run(conn, args.repeat)
+    conn.close()
+
+    rows = []
+    for label, _sql in QUERIES:
+        b, a = before[label]["median"], after[label]["median"]
+        rows.append([label, before[label]["result"], format_ms(b), format_ms(a), f"{b / a:,.1f}x"])
+    print_table(["query", "rows", "no index", "keys + indexes", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Every lesson query, timed at several scale factors.
+
+Replays the %%sql cells of 1_Select, 2_Join and 3_Group (read from the
+jupytext exports in `sql/py/`, see `sql101.lessons`) on a copy of a
+generated database, for each scale factor. Statements that only read
+(SELECT / WITH) are timed with warmup and repeats. The others (CREATE,
+INSERT, DROP, ...) are timed inside a SAVEPOINT that is rolled back
+after each run (so the timings leave out the commit), then run once more
+on the replay itself, in lesson order, so every statement sees the
+tables the lesson built before it. Peak Python memory of each read (tracemalloc: what the Python
+side allocates for the rows, not SQLite's page cache or sorts) is
+measured in a separate, untimed run.
+
+The results (median and p95 latency, rows, peak memory per statement and
+scale) go to a JSON file or, for a .db path, to the
+`sql101_bench_results` table, where runs accumulate. `compare` checks a
+run against a baseline and exits with status 1 on regressions, so the
+lesson curriculum has a standing performance baseline:
+
+    python -m sql101.benchmarks.lessons run --scales 1 1000 --out baseline.json
+    python -m sql101.benchmarks.lessons run --scales 1 1000 --out current.json
+    python -m sql101.benchmarks.lessons compare baseline.json current.json --threshold 0.2
+
+(`--scales 1 1000 20000` is 1K, 1M and 20M transactions.)
+"""
+
+import argparse
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from ..cache import normalize
+from ..lessons import QUERY_LESSONS, lesson_path, sql_cells
+from ..schema import split_statements
+from ..timing import format_ms, percentile, time_query
+from . import print_table, scaled_db
+
+RESULTS_DDL = """CREATE TABLE IF NOT EXISTS sql101_bench_results (
+    run TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    scale REAL NOT NULL,
+    lesson TEXT NOT NULL,
+    cell INT,
+    statement_no INT NOT NULL,   -- position of the statement within the cell
+    sql TEXT NOT NULL,
+    rows INT,
+    median_ms REAL,
+    p95_ms REAL,
+    peak_kb REAL                 -- Python allocations only (tracemalloc), reads only
+)"""
+
+FIELDS = ["scale", "lesson", "cell", "statement_no", "sql", "rows", "median_ms", "p95_ms", "peak_kb"]
+
+
+def is_read(sql):
+    return normalize(sql).split(" ", 1)[0].upper() in ("SELECT", "WITH")
+
+
+def time_write(conn, sql, repeat=5):
+    """Time `sql` `repeat` times on `conn`, rolling each run back to a savepoint.
+
+    `conn` must be in autocommit mode (isolation_level=None) and outside a
+    transaction. Returns the median and p95 seconds and the rows changed
+    (None for DDL), like `time_query`; the database is left unchanged.
+    """
+    timings = []
+    changed = None
+    for _ in range(repeat):
+        conn.execute("SAVEPOINT sql101_time_write")
+        try:
+            started = time.perf_counter()
+            changed = conn.execute(sql).rowcount
+            timings.append(time.perf_counter() - started)
+        finally:
+            conn.execute("ROLLBACK TO sql101_time_write")
+            conn.execute("RELEASE sql101_time_write")
+    return {"median": statistics.median(timings), "p95": percentile(timings, 95),
+            "result": changed if changed >= 0 else None}
+
+
+def peak_kb(conn, sql):
+    """Peak Python memory (KB) of an execute + fetchall of `sql`, as tracemalloc sees it.
+
+    Only Python allocations (the fetched rows): SQLite's own memory isn't traced.
+    """
+    tracemalloc.start()
+    conn.execute(sql).fetchall()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def replay(db_path, scale, lessons=QUERY_LESSONS, repeat=5, warmup=1, progress=print):
+    """Replay the lessons on `db_path`, timing every statement; returns one result dict per statement."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    results = []
+    try:
+        for lesson in lessons:
+            for cell, text in sql_cells(lesson_path(lesson)):
+                for number, sql in enumerate(split_statements(text), 1):
+                    result = {"scale": scale, "lesson": lesson, "cell": cell, "statement_no": number,
+                              "sql": normalize(sql), "rows": None, "median_ms": None, "p95_ms": None,
+                              "peak_kb": None}
+                    if is_read(sql):
+                        timing = time_query(conn, sql, repeat=repeat, warmup=warmup)
+                        result.update(rows=timing["result"], median_ms=timing["median"] * 1000,
+                                      p95_ms=timing["p95"] * 1000, peak_kb=peak_kb(conn, sql))
+                        progress(f"  {lesson} cell {cell}: {format_ms(timing['median'])}")
+                    else:
+                        timing = time_write(conn, sql, repeat)
+                        result.update(rows=timing["result"], median_ms=timing["median"] * 1000,
+                                      p95_ms=timing["p95"] * 1000)
+                        progress(f"  {lesson} cell {cell}: {format_ms(timing['median'])} (write)")
+                        conn.execute(sql)
+                    results.append(result)
+    finally:
+        conn.close()
+    return results
+
+
+def run(scales, lessons=QUERY_LESSONS, repeat=5, warmup=1, seed=0, reuse=False, indexes=False):
+    """Generate (or reuse) a database per scale factor and replay the lessons on a copy of it."""
+    results = []
+    for scale in scales:
+        source = scaled_db(None, scale, seed, reuse=reuse, indexes=indexes)
+        directory = tempfile.mkdtemp(prefix="sql101_lessons_")
+        copy = os.path.join(directory, os.path.basename(source))
+        shutil.copyfile(source, copy)
+        print(f"Replaying {', '.join(lessons)} at scale {scale:g}")
+        try:
+            results += replay(copy, scale, lessons, repeat, warmup)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def save(path, run_name, results):
+    """Write the results to `path`: a JSON file, or appended to sql101_bench_results for .db files."""
+    recorded_at = datetime.datetime.now().isoformat(timespec="seconds")
+    if not path.endswith(".db"):
+        with open(path, "w") as f:
+            json.dump({"run": run_name, "recorded_at": recorded_at, "results": results}, f, indent=1)
+        return
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(RESULTS_DDL)
+        conn.executemany(
+            f"INSERT INTO sql101_bench_results (run, recorded_at, {', '.join(FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(FIELDS))})",
+            [(run_name, recorded_at, *(result[field] for field in FIELDS)) for result in results],
+        )
+    conn.close()
+
+
+def db_runs(path):
+    """The run names stored in a results database, oldest first."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(RESULTS_DDL)
+        return [row[0] for row in conn.execute(
+            "SELECT run FROM sql101_bench_results GROUP BY run ORDER BY MIN(rowid)")]
+    finally:
+        conn.close()
+
+
+def load(path, run_name=None):
+    """The results of a JSON file, or of one run (default: the latest) in a results database."""
+    if not path.endswith(".db"):
+        with open(path) as f:
+            return json.load(f)["results"]
+    run_name = run_name or (db_runs(path) or [None])[-1]
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.execute(f"SELECT {', '.join(FIELDS)} FROM sql101_bench_results WHERE run = ?", (run_name,))
+        return [dict(zip(FIELDS, row)) for row in cursor]
+    finally:
+        conn.close()
+
+
+def compare(baseline, current, threshold=0.2, min_ms=1.0):
+    """Statements whose median got more than `threshold` (0.2 = 20%) slower.
+
+    Statements under `min_ms` in both runs are ignored: at that size the
+    noise is larger than any change. Returns [(baseline row, current row, ratio)].
+    """
+    def key(result):
+        return result["scale"], result["lesson"], result["cell"], result["statement_no"]
+
+    before = {key(result): result for result in baseline if result["median_ms"] is not None}
+    regressions = []
+    for result in current:
+        old = before.get(key(result))
+        if old is None or result["median_ms"] is None or max(old["median_ms"], result["median_ms"]) < min_ms:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append((old, result, ratio))
+    return sorted(regressions, key=lambda regression: -regression[2])
+
+
+def print_summary(results):
+    rows = [[f"{r['scale']:g}", r["lesson"], r["cell"], f"{r['rows']:,}" if r["rows"] is not None else "",
+             f"{r['median_ms']:,.2f}",
+             f"{r['p95_ms']:,.2f}", f"{r['peak_kb']:,.0f}" if r["peak_kb"] is not None else "", r["sql"][:50]]
+            for r in results if r["median_ms"] is not None]
+    print_table(["scale", "lesson", "cell", "rows", "median ms", "p95 ms", "Python peak KB", "statement"], rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time the lesson queries")
+    run_parser.add_argument("--scales", type=float, nargs="+", default=[1, 1000])
+    run_parser.add_argument("--lessons", nargs="+", default=QUERY_LESSONS)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--indexes", action="store_true", help="generate with the sql101.indexes workload indexes")
+    run_parser.add_argument("--reuse", action="store_true", help="reuse generated databases from earlier runs")
+    run_parser.add_argument("--out", help="results file (.json, or .db to keep every run)")
+    run_parser.add_argument("--name", help="run name (default: the current time)")
+    compare_parser = commands.add_parser("compare", help="exit with status 1 on regressions")
+    compare_parser.add_argument("baseline", help="results file; for a .db alone, its previous run")
+    compare_parser.add_argument("current", nargs="?", help="results file (default: the latest run of baseline.db)")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0, help="ignore statements faster than this")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.scales, args.lessons, args.repeat, args.warmup, args.seed, args.reuse, args.indexes)
+        print()
+        print_summary(results)
+        if args.out:
+            save(args.out, args.name or datetime.datetime.now().isoformat(timespec="seconds"), results)
+            print(f"\nResults written to {args.out}")
+        return
+
+    if args.current:
+        baseline, current = load(args.baseline), load(args.current)
+    else:
+        runs = db_runs(args.baseline) if args.baseline.endswith(".db") else []
+        if len(runs) < 2:
+            parser.error("compare needs two results files, or a .db holding at least two runs")
+        baseline, current = load(args.baseline, runs[-2]), load(args.baseline, runs[-1])
+    regressions = compare(baseline, current, args.threshold, args.min_ms)
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%} ({len(current):,} statements compared)")
+        return
+    print_table(["scale", "lesson", "cell", "baseline ms", "current ms", "slowdown", "statement"],
+                [[f"{new['scale']:g}", new["lesson"], new["cell"], f"{old['median_ms']:,.2f}",
+                  f"{new['median_ms']:,.2f}", f"{ratio:,.2f}x", new["sql"][:50]] for old, new, ratio in regressions])
+    raise SystemExit(f"\n{len(regressions)} statement(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Bulk loading a CSV export of sql_101_transactions.
+
+Exports the generated transactions to CSV (and Parquet, when pyarrow is
+installed), then loads them into a fresh keyed and indexed table: once
+with a plain csv.reader + executemany per chunk, once with
+`sql101.loader`. Reports rows/s, then the loader's peak Python memory
+at two chunk sizes.
+
+    python -m sql101.benchmarks.loader --scale 1000
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+import tracemalloc
+
+from .. import loader
+from ..indexes import create_indexes
+from ..schema import COLUMNS, create_tables
+from . import connect, print_table, scaled_db
+
+TABLE = "sql_101_transactions"
+
+
+def export(conn, directory):
+    """Write the transactions to CSV (and Parquet if possible); returns the paths."""
+    csv_path = os.path.join(directory, "sql101_transactions.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS[TABLE])
+        writer.writerows(conn.execute(f"SELECT * FROM {TABLE}"))
+    paths = [csv_path]
+    try:
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        return paths
+    parquet_path = os.path.join(directory, "sql101_transactions.parquet")
+    pyarrow.parquet.write_table(pyarrow.csv.read_csv(csv_path), parquet_path)
+    return paths + [parquet_path]
+
+
+def fresh_target(path):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    create_tables(conn, keys=True)
+    conn.commit()
+    create_indexes(conn, include_ext=False, analyze=False)
+    return conn
+
+
+def naive_load(conn, path, chunk_size=100_000):
+    """csv.reader + executemany, one commit per chunk, indexes maintained row by row."""
+    insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(COLUMNS[TABLE]))})"
+    rows = 0
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        while chunk := list(itertools.islice(reader, chunk_size)):
+            with conn:
+                conn.executemany(insert, chunk)
+            rows += len(chunk)
+    return rows
+
+
+def timed(func):
+    started = time.perf_counter()
+    rows = func()
+    return rows, time.perf_counter() - started
+
+
+def peak_memory(func):
+    """Peak Python memory (bytes) allocated while running func()."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    source = connect(scaled_db(args.db, args.scale, args.seed))
+    directory = tempfile.gettempdir()
+    files = export(source, directory)
+    source.close()
+    target_path = os.path.join(directory, "sql101_load_target.db")
+
+    runs = [("csv.reader + executemany", lambda conn: naive_load(conn, files[0], args.chunk_size))]
+    for path in files:
+        runs.append((f"sql101.loader ({os.path.splitext(path)[1][1:]})",
+                     lambda conn, path=path: loader.load(conn, TABLE, path, chunk_size=args.chunk_size)["rows"]))
+    rows = []
+    for label, func in runs:
+        conn = fresh_target(target_path)
+        loaded, seconds = timed(lambda: func(conn))
+        conn.close()
+        rows.append([label, f"{loaded:,}", f"{seconds:,.2f}s", f"{loaded / seconds:,.0f}"])
+    print_table(["loader", "rows", "time", "rows/s"], rows)
+
+    # Memory follows the chunk size, not the file size (traced separately: tracing slows the load)
+    print()
+    rows = []
+    for chunk_size in (10_000, 100_000):
+        conn = fresh_target(target_path)
+        peak = peak_memory(lambda: loader.load(conn, TABLE, files[0], chunk_size=chunk_size))
+        conn.close()
+        rows.append([f"{chunk_size:,}", f"{peak / 2**20:,.1f} MB"])
+    print_table(["chunk size", "peak Python memory"], rows)
+    for path in files + [target_path]:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Point lookups as pasted literal SQL vs parameterized with `sql101.lookups`.
+
+Generates a keyed, indexed database and builds sql_101_transactions_ext,
+then looks up the same keys four ways for the three lesson lookups
+(sku_id on sql_101_product, customer_id on sql_101_transactions,
+product_name on sql_101_transactions_ext):
+
+- literal: one new SQL text per key, parsed and planned every time
+- query(): the literal text run through `lookups.query`, which
+  parameterizes it so every key reuses one compiled statement
+- lookup(): one parameterized statement per key
+- lookup_many(): all keys in batches of `IN (?, ...)`
+
+    python -m sql101.benchmarks.lookups --scale 1000
+"""
+
+import argparse
+import random
+
+from .. import ext, lookups
+from ..indexes import create_indexes
+from ..timing import format_ms, time_call
+from . import print_table, scaled_db
+
+# (table, key column, SQL that lists the candidate keys)
+WORKLOADS = [
+    ("sql_101_product", "sku_id", "SELECT sku_id FROM sql_101_product"),
+    ("sql_101_transactions", "customer_id", "SELECT DISTINCT customer_id FROM sql_101_transactions"),
+    ("sql_101_transactions_ext", "product_name", "SELECT DISTINCT product_name FROM sql_101_product"),
+]
+
+
+def _literal(key):
+    return f"'{key}'" if isinstance(key, str) else str(key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keys", type=int, default=2000, help="keys looked up per table")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed, keys=True, indexes=True)
+    conn = lookups.connect(path)
+    ext.rebuild(conn)
+    create_indexes(conn)
+    rng = random.Random(args.seed)
+
+    rows = []
+    for table, column, keys_sql in WORKLOADS:
+        candidates = [row[0] for row in conn.execute(keys_sql)]
+        keys = rng.sample(candidates, min(args.keys, len(candidates)))
+        texts = [f"SELECT * FROM {table} WHERE {column} = {_literal(key)}" for key in keys]
+        runs = [
+            ("literal", len(keys), lambda: [conn.execute(sql).fetchall() for sql in texts]),
+            ("query()", len(keys), lambda: [lookups.query(conn, sql) for sql in texts]),
+            ("lookup()", len(keys), lambda: [lookups.lookup(conn, table, column, key) for key in keys]),
+            ("lookup_many()", -(-len(keys) // lookups.DEFAULT_BATCH_SIZE),
+             lambda: lookups.lookup_many(conn, table, column, keys)),
+        ]
+        baseline = None
+        for name, statements, func in runs:
+            run = time_call(func, repeat=args.repeat)
+            found = (sum(map(len, run["result"].values())) if isinstance(run["result"], dict)
+                     else sum(map(len, run["result"])))
+            baseline = baseline or run["median"]
+            rows.append([f"{table}.{column}", name, len(keys), statements, found, format_ms(run["median"]),
+                         f"{statements / run['median']:,.0f}", f"{len(keys) / run['median']:,.0f}",
+                         f"{baseline / run['median']:,.2f}x"])
+    conn.close()
+    print_table(["lookup", "method", "keys", "statements", "rows", "median", "statements/s", "keys/s",
+                 "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Working in memory with `sql101.memdb` vs working on the file.
+
+Two databases: a copy of the lessons' my_database.db, and a generated
+one (--scale) with sql_101_transactions_ext built. On each:
+
+- the lessons' writes (the CREATE/INSERT/UPDATE/DELETE/DROP cells of
+  1_Select and 2_Join, autocommitted one by one like the %sql magic
+  does) on the file vs in memory,
+- resetting afterwards: re-running 0_Tables' cells (lesson database) or
+  copying the pristine file back (generated one) vs `restore()`,
+- loading the file into memory, a `checkpoint()` back to disk and the
+  peak RSS of the process.
+
+    python -m sql101.benchmarks.memdb --scale 1000
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sqlite3
+import time
+
+from .. import DEFAULT_DB, ext
+from ..lessons import lesson_path, sql_cells
+from ..memdb import MemoryDB
+from ..schema import split_statements
+from ..timing import format_ms
+from . import connect, print_table, scaled_db
+
+WRITE_LESSONS = ["1_Select", "2_Join"]
+
+
+def write_statements(lessons):
+    """Every statement of `lessons` that isn't a query, in lesson order."""
+    statements = []
+    for lesson in lessons:
+        for _cell, sql in sql_cells(lesson_path(lesson)):
+            statements += [s for s in split_statements(sql)
+                           if not s.lstrip().upper().startswith(("SELECT", "WITH", "PRAGMA"))]
+    return statements
+
+
+def replay(conn, statements):
+    """Run `statements` one by one in autocommit mode; returns (seconds, errors)."""
+    conn.isolation_level = None
+    errors = 0
+    started = time.perf_counter()
+    for sql in statements:
+        try:
+            conn.execute(sql)
+        except sqlite3.Error:
+            errors += 1
+    seconds = time.perf_counter() - started
+    conn.isolation_level = ""
+    return seconds, errors
+
+
+def seconds(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(label, pristine, work_path, reset):
+    """One database: the lesson writes on disk and in memory, resets, load and checkpoint."""
+    statements = write_statements(WRITE_LESSONS)
+    shutil.copyfile(pristine, work_path)
+
+    conn = connect(work_path)
+    on_disk, disk_errors = replay(conn, statements)
+    conn.close()
+    disk_reset = seconds(lambda: reset(work_path))
+
+    shutil.copyfile(pristine, work_path)
+    rss_before = peak_rss_mb()
+    load = time.perf_counter()
+    work = MemoryDB(work_path)
+    load = time.perf_counter() - load
+    in_memory, memory_errors = replay(work.conn, statements)
+    restore = work.restore()
+    checkpoint = work.checkpoint()
+    rss = peak_rss_mb() - rss_before
+    work.close()
+
+    size_kb = os.path.getsize(pristine) / 1024
+    print(f"\n{label} ({size_kb:,.0f} KB, {len(statements)} write statements, "
+          f"{disk_errors} / {memory_errors} failed on disk / in memory):")
+    print_table(["step", "on the file", "in memory"], [
+        ["lesson writes", format_ms(on_disk), format_ms(in_memory)],
+        ["reset", format_ms(disk_reset), format_ms(restore)],
+        ["load into memory", "", format_ms(load)],
+        ["checkpoint to disk", "", format_ms(checkpoint)],
+        ["peak RSS growth", "", f"{rss:,.0f} MB"],
+    ])
+
+
+def rerun_tables(path):
+    """Reset the lesson database the notebook way: 0_Tables' statements, autocommitted."""
+    conn = connect(path)
+    replay(conn, write_statements(["0_Tables"]))
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--lesson-db", default=DEFAULT_DB, help="the lessons' database (only copied)")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reuse", action="store_true", help="reuse the generated database")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed, reuse=args.reuse)
+    conn = connect(path)
+    if not ext.is_managed(conn):
+        print("Building sql_101_transactions_ext ...")
+        ext.rebuild(conn)
+    conn.close()
+
+    lesson_work = f"{os.path.splitext(path)[0]}_lessons_work.db"
+    measure("my_database.db", args.lesson_db, lesson_work, rerun_tables)
+    work = f"{os.path.splitext(path)[0]}_work.db"
+    measure(f"scale {args.scale:g}", path, work, lambda target: shutil.copyfile(path, target))
+    for leftover in (lesson_work, work):
+        os.remove(leftover)
+
+
+if __name__ == "__main__":
+    main()
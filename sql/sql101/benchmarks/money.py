@@ -0,0 +1,60 @@
+"""Aggregates over REAL money columns vs integer cents.
+
+Times the same aggregates on sql_101_transactions before and after
+`sql101.money.migrate`, and shows how far the float totals drift from the
+exact ones (and that `money.exact_sums` gets the exact total through the
+view).
+
+    python -m sql101.benchmarks.money --scale 10000
+"""
+
+import argparse
+
+from .. import money
+from ..timing import format_ms, time_query
+from . import connect, print_table, scaled_db
+
+# (label, on REAL columns, on integer cents)
+QUERIES = [
+    ("SUM(amount * price)",
+     "SELECT SUM(amount * price_per_unit) FROM sql_101_transactions",
+     "SELECT SUM(amount * price_per_unit_cents) FROM sql_101_transactions_cents"),
+    ("ROUND(AVG(price), 2)",
+     "SELECT ROUND(AVG(price_per_unit), 2) FROM sql_101_transactions",
+     f"SELECT {money.exact_avg_cents('price_per_unit_cents')} FROM sql_101_transactions_cents"),
+    ("revenue by store",
+     "SELECT store_id, SUM(amount * price_per_unit) FROM sql_101_transactions GROUP BY store_id",
+     "SELECT store_id, SUM(amount * price_per_unit_cents) FROM sql_101_transactions_cents GROUP BY store_id"),
+    ("price = 2.20 (equality)",
+     "SELECT COUNT(*) FROM sql_101_transactions WHERE price_per_unit = 2.2",
+     "SELECT COUNT(*) FROM sql_101_transactions_cents WHERE price_per_unit_cents = 220"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    conn = connect(scaled_db(args.db, args.scale, args.seed))
+    real = [time_query(conn, sql, repeat=args.repeat)["median"] for _, sql, _ in QUERIES]
+    real_total = conn.execute(QUERIES[0][1]).fetchone()[0]
+    money.migrate(conn, "sql_101_transactions", allow_rounding=True)
+    cents = [time_query(conn, sql, repeat=args.repeat)["median"] for _, _, sql in QUERIES]
+    exact_total = conn.execute(QUERIES[0][2]).fetchone()[0]
+    view_total = conn.execute(money.exact_sums(QUERIES[0][1])).fetchone()[0]
+
+    rows = [[label, format_ms(r), format_ms(c), f"{r / c:,.2f}x"]
+            for (label, _, _), r, c in zip(QUERIES, real, cents)]
+    print_table(["aggregate", "REAL", "integer cents", "speedup"], rows)
+    print(f"\nSUM over REAL:          {real_total!r}\nexact_sums on the view: {view_total!r}"
+          f"\nexact total:            {money.format_cents(exact_total)}")
+    money.revert(conn, "sql_101_transactions")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Big SELECTs: fetchall (what %%sql does) vs a ResultPager.
+
+Reports the time until the first rows can be shown and the peak Python
+memory while going through the whole result.
+
+    python -m sql101.benchmarks.paging --scale 1000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from ..paging import ResultPager
+from ..timing import format_ms
+from . import connect, print_table, scaled_db
+
+QUERIES = [
+    ("SELECT * (2_Join cell 10)", "SELECT * FROM sql_101_transactions"),
+    ("ORDER BY total_price DESC (1_Select cell 26)",
+     "SELECT *, amount * price_per_unit AS total_price FROM sql_101_transactions ORDER BY total_price DESC"),
+]
+
+
+def _measure(func):
+    """(seconds to first rows, seconds in total, peak traced bytes) of func(mark_first_rows)."""
+    first = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(lambda: first.append(time.perf_counter() - started))
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first[0], total, peak
+
+
+def fetch_all(conn, sql):
+    def run(mark_first_rows):
+        rows = conn.execute(sql).fetchall()
+        mark_first_rows()
+        return len(rows)
+    return run
+
+
+def paged(conn, sql, page_size):
+    def run(mark_first_rows):
+        pager = ResultPager(conn, sql, page_size=page_size)
+        mark_first_rows()
+        for _ in pager.pages():
+            pass
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    conn = connect(scaled_db(args.db, args.scale, args.seed))
+    rows = []
+    for label, sql in QUERIES:
+        for mode, func in (("fetchall", fetch_all(conn, sql)),
+                           (f"pages of {args.page_size}", paged(conn, sql, args.page_size))):
+            first, total, peak = _measure(func)
+            rows.append([label, mode, format_ms(first), format_ms(total), f"{peak / 1024:,.0f} KB"])
+    print_table(["query", "mode", "first rows", "all rows", "peak memory"], rows)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
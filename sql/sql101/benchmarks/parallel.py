@@ -0,0 +1,70 @@
+"""3_Group aggregates on one SQLite connection vs the process pool.
+
+Builds sql_101_transactions_ext on a scaled database (the request's
+50M-row dataset is `--scale 50000`), then runs the GROUP BY store_name
+and GROUP BY brand, category metrics of 3_Group cells 26 and 28 as one
+SQLite query and with `sql101.parallel` at 1, 2, 4, ... workers up to the
+core count, checking that the results agree.
+
+    python -m sql101.benchmarks.parallel --scale 1000
+"""
+
+import argparse
+import math
+import os
+
+from .. import ext, parallel
+from ..timing import format_ms, time_call
+from . import connect, print_table, scaled_db
+
+AGGREGATES = [("count", "*"), ("sum", "amount"), ("avg", "price_per_unit"),
+              ("sum", "tot_spent"), ("avg", "tot_spent"), ("max", "transaction_date")]
+SQL_AGGREGATES = ("COUNT(*), SUM(amount), AVG(price_per_unit), SUM(tot_spent), AVG(tot_spent), "
+                  "MAX(transaction_date)")
+GROUPINGS = [["store_name"], ["brand", "category"]]
+
+
+def sqlite_sql(group_by):
+    keys = ", ".join(group_by)
+    return f"SELECT {keys}, {SQL_AGGREGATES} FROM sql_101_transactions_ext GROUP BY {keys} ORDER BY {keys}"
+
+
+def same(a, b):
+    """Equal rows, allowing float sums added in another order to differ in the last digits."""
+    return len(a) == len(b) and all(
+        x == y or (isinstance(x, float) and math.isclose(x, y, rel_tol=1e-9))
+        for ra, rb in zip(a, b) for x, y in zip(ra, rb))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--shard-by", choices=parallel.SHARDINGS, default="rowid")
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed)
+    conn = connect(path)
+    ext.rebuild(conn)
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, cores} | {2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores} | {2})
+    print(f"{cores} core(s)")
+
+    rows = []
+    for group_by in GROUPINGS:
+        label = f"GROUP BY {', '.join(group_by)}"
+        base = time_call(lambda: conn.execute(sqlite_sql(group_by)).fetchall(), repeat=args.repeat)
+        rows.append([label, "SQLite", format_ms(base["median"]), "1.00x", ""])
+        for workers in worker_counts:
+            run = time_call(lambda: parallel.aggregate(path, AGGREGATES, group_by, shard_by=args.shard_by,
+                                                       workers=workers), repeat=args.repeat)
+            rows.append([label, f"{workers} worker(s)", format_ms(run["median"]),
+                         f"{base['median'] / run['median']:,.2f}x", "yes" if same(base["result"], run["result"]) else "NO"])
+    conn.close()
+    print_table(["query", "engine", "median", "speedup", "same result"], rows)
+
+
+if __name__ == "__main__":
+    main()
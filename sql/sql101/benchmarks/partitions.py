@@ -0,0 +1,84 @@
+"""Month-aligned date filters: one big table vs pruned monthly partitions.
+
+Generates five years of transactions (2020-2024) and times the
+lesson-style date filters on the plain table. Then partitions it by month
+and times them again on the view that replaces the table, as is (every
+partition scanned) and routed (only the matching months). Finally
+compares removing the oldest month with a DELETE on the plain table
+(rolled back) and with `drop_partition`.
+
+    python -m sql101.benchmarks.partitions --scale 1000
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+
+from .. import partitions
+from ..timing import format_ms, time_call, time_query
+from . import connect, print_table, scaled_db
+
+TABLE = partitions.SOURCE_TABLE
+
+QUERIES = [
+    (">= '2024-06-01' (1_Select cell 8)",
+     "SELECT COUNT(*), SUM(amount * price_per_unit) FROM {table} WHERE transaction_date >= '2024-06-01'"),
+    ("BETWEEN June 2024 (1_Select cell 21)",
+     "SELECT * FROM {table} WHERE transaction_date BETWEEN '2024-06-01' AND '2024-06-30'"),
+    ("> '2024-06-01', by store (3_Group)",
+     "SELECT store_id, COUNT(*), SUM(amount) FROM {table} WHERE transaction_date > '2024-06-01' GROUP BY store_id"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed,
+                     start_date=datetime.date(2020, 1, 1), end_date=datetime.date(2024, 12, 31))
+    conn = connect(path)
+    plain = {}
+    for label, sql in QUERIES:
+        plain[label] = time_query(conn, sql.format(table=TABLE), repeat=args.repeat)
+        plain[label]["rows"] = sorted(conn.execute(sql.format(table=TABLE)).fetchall())
+    oldest = conn.execute(f"SELECT MIN(substr(transaction_date, 1, 7)) FROM {TABLE}").fetchone()[0]
+    delete = time_call(lambda: conn.execute(
+        f"DELETE FROM {TABLE} WHERE transaction_date >= ? AND transaction_date < ?",
+        (oldest, partitions.next_month(oldest))).rowcount, repeat=1, warmup=0)
+    conn.rollback()
+
+    counts = partitions.partition(conn)
+    print(f"{len(counts)} monthly partitions")
+    rows = []
+    for label, sql in QUERIES:
+        view = time_query(conn, sql.format(table=TABLE), repeat=args.repeat)
+        routed_sql, months = partitions.route(conn, sql.format(table=TABLE))
+        routed = time_query(conn, routed_sql, repeat=args.repeat)
+        same = plain[label]["rows"] == sorted(conn.execute(routed_sql).fetchall())
+        rows.append([label, f"{len(months)}/{len(counts)}", format_ms(plain[label]["median"]),
+                     format_ms(view["median"]), format_ms(routed["median"]),
+                     f"{plain[label]['median'] / routed['median']:,.1f}x", same])
+    print_table(["query", "partitions read", "one table", "view, unpruned", "routed", "speedup", "same rows"], rows)
+
+    print()
+    archive_path = os.path.join(tempfile.gettempdir(), "sql101_archive.db")
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+    second = partitions.partitions(conn)[1][0]
+    drop = time_call(lambda: partitions.drop_partition(conn, oldest), repeat=1, warmup=0)
+    archive = time_call(lambda: partitions.archive_partition(conn, second, archive_path), repeat=1, warmup=0)
+    print_table(["remove a month", "rows", "time"], [
+        [f"DELETE {oldest} from the plain table", delete["result"], format_ms(delete["median"])],
+        [f"drop_partition({oldest!r})", counts[oldest], format_ms(drop["median"])],
+        [f"archive_partition({second!r})", archive["result"], format_ms(archive["median"])],
+    ])
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
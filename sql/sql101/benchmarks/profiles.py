@@ -0,0 +1,213 @@
+"""The Select/Join/Group lesson queries under each `sql101.profiles` profile.
+
+Generates (or, with --reuse, reuses) a scaled database and builds
+sql_101_transactions_ext, so at the default scale of 10000 (10M
+transactions) the file is about 2 GB. Every profile whose page size
+differs from the file's gets its own copy with that page size.
+
+Each profile (plus SQLite's defaults) then runs in a fresh Python
+process, so memory and I/O counters are its own. The process runs every
+read-only query of 1_Select, 2_Join and 3_Group once cold (after
+dropping the OS page cache, with --cold, which needs root) and
+--repeat more times warm. Queries on tables the lessons create
+themselves (hkt_sql_customers, ...) are skipped. Reported per profile:
+
+- cold and warm time per pass and warm queries/s (rows are fetched
+  and dropped),
+- peak RSS (memory-mapped pages the process touched count too),
+- bytes read with read() calls (rchar), bytes the kernel read from disk
+  (read_bytes) and major page faults (how mmap reads show up).
+
+Then, for the write side, each profile loads the first --load
+transactions into a new keyed database with the workload indexes
+(one INSERT ... SELECT from the generated file) and reports rows/s.
+
+    python -m sql101.benchmarks.profiles --scale 10000 --cold
+"""
+
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .. import ext, profiles
+from ..aio import lesson_queries
+from ..indexes import create_indexes
+from ..lessons import QUERY_LESSONS
+from ..profiles import PROFILES
+from ..schema import create_tables
+from . import connect, print_table, scaled_db
+
+# The package's parent folder, where `python -m sql101...` works
+SQL_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def io_counters():
+    """rchar and read_bytes of this process from /proc/self/io (zeros where unavailable)."""
+    counters = {"rchar": 0, "read_bytes": 0}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                name, value = line.split(":")
+                if name in counters:
+                    counters[name] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def drop_os_cache():
+    """Ask Linux to drop the page cache; False if we may not."""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def worker(db_path, profile, repeat):
+    """Run the lesson queries under `profile` ("default": no PRAGMAs); returns the measurements."""
+    if profile == "default":
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    else:
+        conn = profiles.connect(db_path, profile, readonly=True)
+    queries = [sql for lesson in QUERY_LESSONS for sql in lesson_queries(lesson).values()]
+    io_before = io_counters()
+    faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_majflt
+    passes, skipped = [], set()
+    for _ in range(1 + repeat):
+        started = time.perf_counter()
+        for number, sql in enumerate(queries):
+            if number in skipped:
+                continue
+            try:
+                # Rows are read and dropped: SELECT * over the fact table won't fit in memory
+                cursor = conn.execute(sql)
+                while cursor.fetchmany(10_000):
+                    pass
+            except sqlite3.Error:
+                skipped.add(number)
+        passes.append(time.perf_counter() - started)
+    io_after = io_counters()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    conn.close()
+    return {
+        "queries": len(queries) - len(skipped),
+        "cold_s": passes[0],
+        "warm_s": statistics.median(passes[1:]) if repeat else None,
+        "max_rss_mb": usage.ru_maxrss / 1024,
+        "rchar_mb": (io_after["rchar"] - io_before["rchar"]) / 2**20,
+        "read_mb": (io_after["read_bytes"] - io_before["read_bytes"]) / 2**20,
+        "major_faults": usage.ru_majflt - faults_before,
+    }
+
+
+def load(source, profile, rows):
+    """Seconds to copy `rows` transactions from `source` into a new indexed database under `profile`."""
+    target = os.path.join(tempfile.gettempdir(), f"sql101_profile_load_{os.getpid()}.db")
+    if os.path.exists(target):
+        os.remove(target)
+    conn = sqlite3.connect(target) if profile == "default" else profiles.connect(target, profile)
+    try:
+        create_tables(conn, keys=True)
+        create_indexes(conn, include_ext=False, analyze=False)
+        conn.execute("ATTACH DATABASE ? AS source", (source,))
+        started = time.perf_counter()
+        with conn:
+            conn.execute("INSERT INTO main.sql_101_transactions "
+                         "SELECT * FROM source.sql_101_transactions ORDER BY transaction_id LIMIT ?", (rows,))
+        return time.perf_counter() - started
+    finally:
+        conn.close()
+        os.remove(target)
+
+
+def run_profile(db_path, profile, repeat, cold):
+    if cold and not drop_os_cache():
+        print("  (can't drop the OS page cache without root: the first pass is not cold)")
+    out = subprocess.run(
+        [sys.executable, "-m", "sql101.benchmarks.profiles", "--worker", profile, "--db", db_path,
+         "--repeat", str(repeat)],
+        cwd=SQL_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def page_size_of(path):
+    conn = connect(path)
+    try:
+        return conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=2, help="warm passes after the cold one")
+    parser.add_argument("--reuse", action="store_true", help="reuse the generated database and copies")
+    parser.add_argument("--cold", action="store_true", help="drop the OS page cache before each profile")
+    parser.add_argument("--load", type=int, default=2_000_000, help="transactions to load per profile (0: skip)")
+    parser.add_argument("--profiles", nargs="+", default=["default"] + list(PROFILES),
+                        choices=["default"] + list(PROFILES))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.db, args.worker, args.repeat)))
+        return
+
+    path = scaled_db(args.db, args.scale, args.seed, reuse=args.reuse)
+    conn = connect(path)
+    if not ext.is_managed(conn):
+        print("Building sql_101_transactions_ext ...")
+        ext.rebuild(conn)
+    conn.close()
+    base_page_size = page_size_of(path)
+
+    rows = []
+    for profile in args.profiles:
+        db_path = path
+        page_size = PROFILES[profile]["page_size"] if profile != "default" else base_page_size
+        if page_size != base_page_size:
+            db_path = f"{os.path.splitext(path)[0]}_{page_size // 1024}k.db"
+            if not (args.reuse and os.path.exists(db_path)):
+                if os.path.exists(db_path):
+                    os.remove(db_path)
+                print(f"Copying {path} with {page_size}-byte pages ...")
+                profiles.copy_with_page_size(path, db_path, page_size)
+        print(f"Running the lesson queries with the {profile} profile ...")
+        result = run_profile(db_path, profile, args.repeat, args.cold)
+        warm = result["warm_s"]
+        rows.append([profile, f"{page_size // 1024} KB", result["queries"], f"{result['cold_s']:,.1f} s",
+                     f"{warm:,.1f} s" if warm else "", f"{result['queries'] / warm:,.2f}" if warm else "",
+                     f"{result['max_rss_mb']:,.0f} MB", f"{result['rchar_mb']:,.0f} MB",
+                     f"{result['read_mb']:,.0f} MB", f"{result['major_faults']:,}"])
+    size_gb = os.path.getsize(path) / 2**30
+    print(f"\n{size_gb:,.1f} GB database, {os.cpu_count()} core(s)")
+    print_table(["profile", "pages", "queries", "cold pass", "warm pass", "queries/s", "peak RSS",
+                 "read() bytes", "disk reads", "major faults"], rows)
+
+    if args.load:
+        print()
+        loads = []
+        for profile in args.profiles:
+            print(f"Loading {args.load:,} transactions with the {profile} profile ...")
+            seconds = load(path, profile, args.load)
+            loads.append([profile, f"{seconds:,.1f} s", f"{args.load / seconds:,.0f}"])
+        print(f"\nLoading {args.load:,} transactions into a keyed, indexed table:")
+        print_table(["profile", "time", "rows/s"], loads)
+
+
+if __name__ == "__main__":
+    main()
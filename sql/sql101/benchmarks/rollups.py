@@ -0,0 +1,72 @@
+"""3_Group metrics: full scans of sql_101_transactions_ext vs rollup lookups.
+
+    python -m sql101.benchmarks.rollups --scale 1000
+"""
+
+import argparse
+
+from .. import ext, rollups
+from ..indexes import apply
+from ..timing import format_ms, time_call, time_query
+from . import connect, print_table, scaled_db
+
+# (label, 3_Group query, rollup name, rollup start date)
+QUERIES = [
+    ("brand, category (cell 23)", """SELECT brand, category, COUNT(*) AS nr_transactions,
+       SUM(tot_spent) AS sum_tot, ROUND(AVG(price_per_unit), 2) AS avg_unit_price,
+       ROUND(AVG(tot_spent), 2) AS avg_tot_spent, MAX(transaction_date) AS last_transaction
+FROM sql_101_transactions_ext GROUP BY brand, category ORDER BY brand, category""",
+     "brand_category", None),
+    ("store_name (cell 26)", """SELECT store_name, COUNT(*) AS nr_transactions,
+       ROUND(AVG(price_per_unit), 2) AS avg_unit_price, ROUND(AVG(tot_spent), 2) AS avg_tot_spent,
+       MAX(transaction_date) AS last_transaction
+FROM sql_101_transactions_ext GROUP BY store_name ORDER BY store_name""",
+     "store", None),
+    ("brand, product >= 2024-06-01 (cell 31)", """SELECT brand, product_name,
+       MAX(transaction_date) AS last_purchase_date, SUM(tot_spent) AS revenue
+FROM sql_101_transactions_ext WHERE transaction_date >= '2024-06-01'
+GROUP BY brand, product_name ORDER BY brand""",
+     "product", "2024-06-01"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed)
+    conn = connect(path)
+    apply(conn)
+    ext.rebuild(conn)
+    rollups.enable(conn)
+
+    rows = []
+    for label, sql, name, start in QUERIES:
+        scan = time_query(conn, sql, repeat=args.repeat)
+        lookup = time_call(lambda: len(rollups.metrics(conn, name, start)), repeat=args.repeat)
+        rows.append([label, scan["result"], format_ms(scan["median"]), format_ms(lookup["median"]),
+                     f"{scan['median'] / lookup['median']:,.0f}x"])
+    print_table(["3_Group query", "groups", "ext scan", "rollup", "speedup"], rows)
+
+    # What the triggers cost on the write side
+    print()
+    rows = []
+    for label, enabled in (("without rollups", False), ("with rollups", True)):
+        if enabled:
+            rollups.enable(conn)
+        else:
+            rollups.disable(conn)
+        with conn:
+            conn.execute("UPDATE sql_101_product SET list_price = list_price + 0.01 WHERE sku_id <= 5")
+        result = time_call(lambda: ext.refresh(conn)["rederived"], repeat=1, warmup=0)
+        rows.append([f"refresh after a price fix on 5 SKUs, {label}", result["result"], format_ms(result["median"])])
+    print_table(["write", "rows", "time"], rows)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Full-text search with `sql101.search` vs LIKE '%...%' scans.
+
+Builds a product catalog of --products SKUs (1M by default, far beyond
+what datagen generates for a scale) and a scaled database with
+sql_101_transactions_ext, indexes both with FTS5 and runs the same
+searches as `search.search` and as a LIKE per term over product_name,
+brand and category. Also times the index builds and the cost of the
+triggers on inserts into the catalog.
+
+The two don't match exactly the same rows (FTS5 matches whole words or
+word prefixes, LIKE any substring), so the match counts are shown too.
+
+    python -m sql101.benchmarks.search --scale 1000 --products 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from .. import ext, search
+from ..datagen import insert_rows, iter_products
+from ..schema import COLUMNS, create_tables
+from ..timing import format_ms, time_call
+from . import connect, print_table, scaled_db
+
+QUERIES = ["Fusill*", "Berillo pasta", "Spaghetti N5", "De Cocco sauces", "N123456"]
+
+NEW_PRODUCTS = 10_000
+
+
+def like_sql(table, text, select):
+    """`select` from `table` where every term of `text` is a substring of name, brand or category."""
+    terms = [term.rstrip("*") for term in text.split()]
+    where = " AND ".join(["(product_name || ' ' || brand || ' ' || category) LIKE ?"] * len(terms))
+    return f"SELECT {select} FROM {table} WHERE {where}", [f"%{term}%" for term in terms]
+
+
+def build_catalog(path, n_products, seed):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    create_tables(conn, keys=True)
+    insert_rows(conn, "sql_101_product", COLUMNS["sql_101_product"], iter_products(n_products, seed))
+    return conn
+
+
+def insert_seconds(conn, first_sku):
+    """Seconds to insert NEW_PRODUCTS products row by row and in one INSERT ... SELECT (both rolled back)."""
+    rows = [(first_sku + i, f"Orecchiette N{first_sku + i}", "pasta", "short cut", "Berillo", 1.9)
+            for i in range(NEW_PRODUCTS)]
+    started = time.perf_counter()
+    conn.executemany(f"INSERT INTO sql_101_product VALUES ({', '.join('?' * 6)})", rows)
+    row_by_row = time.perf_counter() - started
+    conn.rollback()
+    started = time.perf_counter()
+    conn.execute("INSERT INTO sql_101_product SELECT sku_id + ?, product_name, category, sub_category, brand, "
+                 "list_price FROM sql_101_product WHERE sku_id <= ?", (first_sku, NEW_PRODUCTS))
+    bulk = time.perf_counter() - started
+    conn.rollback()
+    return row_by_row, bulk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--products", type=int, default=1_000_000, help="SKUs in the search catalog")
+    args = parser.parse_args(argv)
+
+    catalog_path = os.path.join(tempfile.gettempdir(), f"sql101_catalog_{args.products}_seed{args.seed}.db")
+    print(f"Generating {args.products:,} products into {catalog_path} ...")
+    catalog = build_catalog(catalog_path, args.products, args.seed)
+    plain_insert = insert_seconds(catalog, args.products + 1)
+    started = time.perf_counter()
+    search.enable(catalog, ["product"])
+    product_build = time.perf_counter() - started
+    fts_insert = insert_seconds(catalog, args.products + 1)
+
+    path = scaled_db(args.db, args.scale, args.seed, keys=True)
+    conn = connect(path)
+    ext.rebuild(conn)
+    started = time.perf_counter()
+    search.enable(conn, ["ext"])
+    ext_build = time.perf_counter() - started
+
+    print(f"FTS5 index build: {args.products:,} products {format_ms(product_build)}, "
+          f"ext table {format_ms(ext_build)}")
+    for label, before, after in zip(["row by row", "one INSERT ... SELECT"], plain_insert, fts_insert):
+        print(f"Inserting {NEW_PRODUCTS:,} products {label}: {format_ms(before)} without the index, "
+              f"{format_ms(after)} with its triggers")
+    print()
+
+    rows = []
+    for label, db, name, table in [("catalog", catalog, "product", "sql_101_product"),
+                                   ("ext", conn, "ext", ext.EXT_TABLE)]:
+        key = search.INDEXES[name][1]
+        for text in QUERIES:
+            sql, params = like_sql(table, text, key)
+            like = time_call(lambda: [row[0] for row in db.execute(sql, params)], repeat=args.repeat)
+            fts = time_call(lambda: search.search(db, text, name), repeat=args.repeat)
+            first = time_call(lambda: search.search(db, text, name, limit=20), repeat=args.repeat)
+            rows.append([label, text, f"{len(like['result']):,}", format_ms(like["median"]),
+                         f"{len(fts['result']):,}", format_ms(fts["median"]), format_ms(first["median"]),
+                         f"{like['median'] / fts['median']:,.0f}x"])
+    catalog.close()
+    conn.close()
+    print_table(["table", "query", "LIKE rows", "LIKE", "FTS5 rows", "FTS5", "FTS5 first 20", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Exact DISTINCT counts vs HyperLogLog sketch estimates.
+
+Builds the `sql101.sketches` sketches on a scaled database, then times
+the distinct counts of 1_Select cells 28, 29 and 32 (plus a per-store and
+a one-month count) exactly and from the sketches, with the estimation
+error. Finally times inserting rows with and without the sketch trigger.
+
+    python -m sql101.benchmarks.sketches --scale 1000
+"""
+
+import argparse
+
+from .. import sketches
+from ..timing import format_ms, time_call
+from . import connect, print_table, scaled_db
+
+# (label, estimate arguments: metric, dimension, keys, start, end)
+COUNTS = [
+    ("cell 28: DISTINCT sku_id", ("skus",)),
+    ("cell 29: DISTINCT customer_id, sku_id", ("customer_skus",)),
+    ("cell 32: DISTINCT customer_id, sku 1", ("customers", "sku", [1])),
+    ("DISTINCT customer_id, store 1", ("customers", "store", [1])),
+    ("DISTINCT customer_id, June 2024", ("customers", "day", None, "2024-06-01", "2024-06-30")),
+]
+
+INSERT = ("INSERT INTO sql_101_transactions (transaction_id, customer_id, sku_id, store_id, "
+          "transaction_date, amount, price_per_unit) VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def insert_rows(conn, first_id, n):
+    rows = [(first_id + i, i % 5000, 1 + i % 10, 1 + i % 2, "2025-01-01", 1, 1.6) for i in range(n)]
+    with conn:
+        conn.executemany(INSERT, rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--precision", type=int, default=sketches.DEFAULT_PRECISION)
+    args = parser.parse_args(argv)
+
+    conn = connect(scaled_db(args.db, args.scale, args.seed))
+    max_id = conn.execute("SELECT MAX(transaction_id) FROM sql_101_transactions").fetchone()[0]
+
+    # Insert cost first, before and after the trigger exists
+    n = 100_000
+    plain = time_call(lambda: insert_rows(conn, max_id + 1, n), repeat=1, warmup=0)["median"]
+    conn.execute("DELETE FROM sql_101_transactions WHERE transaction_id > ?", (max_id,))
+    conn.commit()
+    build = time_call(lambda: sketches.build(conn, args.precision), repeat=1, warmup=0)["median"]
+    print(f"Sketches built in {build:,.2f}s "
+          f"({conn.execute('SELECT SUM(length(registers)) FROM sql101_hll').fetchone()[0] / 2**20:,.1f} MB)")
+    queued = time_call(lambda: insert_rows(conn, max_id + 1, n), repeat=1, warmup=0)["median"]
+    folded = time_call(lambda: sketches.refresh(conn), repeat=1, warmup=0)["median"]
+    conn.execute("DELETE FROM sql_101_transactions WHERE transaction_id > ?", (max_id,))
+    conn.commit()
+    sketches.build(conn, args.precision)
+
+    rows = []
+    for label, estimate_args in COUNTS:
+        exact = time_call(lambda: sketches.estimate(conn, *estimate_args, exact=True), repeat=args.repeat)
+        approx = time_call(lambda: sketches.estimate(conn, *estimate_args), repeat=args.repeat)
+        true_count, estimated = exact["result"]["estimate"], approx["result"]["estimate"]
+        rows.append([label, format_ms(exact["median"]), format_ms(approx["median"]),
+                     f"{exact['median'] / approx['median']:,.1f}x", f"{true_count:,}", f"{estimated:,}",
+                     f"{(estimated - true_count) / true_count:+.2%}"])
+    print()
+    print_table(["count", "exact", "sketch", "speedup", "exact value", "estimate", "error"], rows)
+    print(f"\nStandard error at precision {args.precision}: {sketches.relative_error(args.precision):.2%}")
+    print(f"\nInserting {n:,} rows: {plain:,.2f}s without the trigger, {queued:,.2f}s with it "
+          f"(+ {folded:,.2f}s to fold them into the sketches)")
+    sketches.drop(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
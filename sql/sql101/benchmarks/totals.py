@@ -0,0 +1,70 @@
+"""amount * price_per_unit filters and sorts, with and without an index.
+
+Times 1_Select cell 34 (`WHERE amount * price_per_unit > 10`, and a more
+selective > 20) and cell 26 (`ORDER BY total_price DESC`, in full and its
+top 10) on a scaled database: as the lessons run them on the plain table, with the
+`sql101.totals` expression index, and rewritten to use a STORED
+tot_spent column with its index.
+
+    python -m sql101.benchmarks.totals --scale 1000
+"""
+
+import argparse
+
+from .. import totals
+from ..timing import format_ms, time_query
+from . import connect, print_table, scaled_db
+
+QUERIES = [
+    ("cell 34: WHERE total > 10",
+     "SELECT *, amount * price_per_unit AS total_price FROM sql_101_transactions "
+     "WHERE amount * price_per_unit > 10"),
+    ("cell 34, total > 20 (selective)",
+     "SELECT *, amount * price_per_unit AS total_price FROM sql_101_transactions "
+     "WHERE amount * price_per_unit > 20"),
+    ("cell 26: ORDER BY total DESC",
+     "SELECT *, amount * price_per_unit AS total_price FROM sql_101_transactions ORDER BY total_price DESC"),
+    ("cell 26, top 10",
+     "SELECT *, amount * price_per_unit AS total_price FROM sql_101_transactions "
+     "ORDER BY total_price DESC LIMIT 10"),
+]
+
+
+def timings(conn, repeat, rewrite=False):
+    results = []
+    for _, sql in QUERIES:
+        if rewrite:
+            sql = totals.rewrite(sql)
+        result = time_query(conn, sql, repeat=repeat)
+        results.append((result["median"], result["result"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    conn = connect(scaled_db(args.db, args.scale, args.seed))
+    plain = timings(conn, args.repeat)
+    totals.add_index(conn)
+    conn.execute("ANALYZE")
+    expression = timings(conn, args.repeat)
+    totals.drop(conn)
+    totals.add_column(conn)
+    conn.execute("ANALYZE")
+    column = timings(conn, args.repeat, rewrite=True)
+
+    rows = []
+    for (label, _), (p, n), (e, _), (c, _) in zip(QUERIES, plain, expression, column):
+        rows.append([label, f"{n:,}", format_ms(p), format_ms(e), format_ms(c), f"{p / min(e, c):,.1f}x"])
+    print_table(["query", "rows", "no index", "expression index", "stored column", "best speedup"], rows)
+    totals.drop(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Concurrent notebooks: rollback journal vs WAL.
+
+N reader processes loop over the 3_Group queries while one writer process
+appends transactions and refreshes sql_101_transactions_ext, for a fixed
+time, once per journal mode. Reports queries/s, p50/p99 latency and
+"database is locked" errors on both sides.
+
+    python -m sql101.benchmarks.wal --scale 100 --readers 4 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import time
+
+from .. import ext, wal
+from ..datagen import iter_transactions
+from ..indexes import apply
+from ..schema import COLUMNS
+from ..timing import format_ms, percentile
+from . import connect, print_table, scaled_db
+from .rollups import QUERIES
+
+
+def reader(path, start_at, seconds, results):
+    conn = wal.connect(path, readonly=True)
+    latencies, errors = [], 0
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + seconds
+    i = 0
+    while time.time() < deadline:
+        sql = QUERIES[i % len(QUERIES)][1]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.execute(sql).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put(("reader", latencies, errors))
+
+
+def writer(path, start_at, seconds, batch, results):
+    conn = wal.connect(path)
+    list_prices = [r[0] for r in conn.execute("SELECT list_price FROM sql_101_product ORDER BY sku_id")]
+    n_stores = conn.execute("SELECT COUNT(*) FROM sql_101_store").fetchone()[0]
+    insert = (f"INSERT INTO sql_101_transactions ({', '.join(COLUMNS['sql_101_transactions'])}) "
+              f"VALUES ({', '.join('?' * len(COLUMNS['sql_101_transactions']))})")
+    latencies, errors = [], 0
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + seconds
+    seed = 1
+    while time.time() < deadline:
+        first_id = conn.execute("SELECT MAX(transaction_id) FROM sql_101_transactions").fetchone()[0] + 1
+        rows = list(iter_transactions(batch, list_prices, n_stores, seed=seed, first_id=first_id))
+        seed += 1
+        started = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(insert, rows)
+            ext.refresh(conn)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put(("writer", latencies, errors))
+
+
+def run(path, readers, seconds, batch):
+    """Run one round; returns {"reader"/"writer": (latencies, errors)}."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    start_at = time.time() + 2  # give the processes time to start
+    procs = [ctx.Process(target=reader, args=(path, start_at, seconds, results)) for _ in range(readers)]
+    procs.append(ctx.Process(target=writer, args=(path, start_at, seconds, batch, results)))
+    for proc in procs:
+        proc.start()
+    totals = {"reader": ([], 0), "writer": ([], 0)}
+    for _ in procs:
+        role, latencies, errors = results.get()
+        totals[role] = (totals[role][0] + latencies, totals[role][1] + errors)
+    for proc in procs:
+        proc.join()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database to (re)generate, defaults to a temp file")
+    parser.add_argument("--scale", type=float, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=1000, help="transactions per writer commit")
+    parser.add_argument("--checkpoint-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    path = scaled_db(args.db, args.scale, args.seed)
+    conn = connect(path)
+    apply(conn)
+    ext.rebuild(conn)
+    conn.close()
+
+    rows = []
+    for mode in ("DELETE", "WAL"):
+        # Each round starts from the same copy, so both see the same table sizes
+        round_path = f"{path}.{mode.lower()}"
+        shutil.copyfile(path, round_path)
+        checkpointer = None
+        if mode == "WAL":
+            wal.enable(round_path)
+            checkpointer = wal.Checkpointer(round_path, interval=args.checkpoint_interval).start()
+        totals = run(round_path, args.readers, args.seconds, args.batch)
+        if checkpointer:
+            checkpointer.stop()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(round_path + suffix):
+                os.remove(round_path + suffix)
+        for role, (latencies, errors) in totals.items():
+            rows.append([
+                mode.lower(), role, f"{len(latencies) / args.seconds:,.1f}/s",
+                format_ms(statistics.median(latencies)) if latencies else "-",
+                format_ms(percentile(latencies, 99)) if latencies else "-",
+                errors,
+            ])
+    print_table(["journal", "role", "throughput", "p50", "p99", "locked errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
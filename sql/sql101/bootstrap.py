@@ -0,0 +1,156 @@
+"""One-call notebook setup, replacing cell 2 of every SQL lesson.
+
+Each lesson starts with
+
+    !pip -q install ipython-sql
+    %load_ext sql
+    %sql sqlite:///my_database.db
+
+and the `pip install` alone costs seconds on every kernel start, even when
+the package is already there. `setup()` does the same three steps, but:
+
+- it only calls pip when ipython-sql can't be imported,
+- it doesn't reload the extension or reconnect if this kernel already did,
+- it applies the connection PRAGMAs once, and
+- it reports how long each step took.
+
+It also keeps one process-wide sqlite3 connection (`connection()`) for the
+other sql101 tools, so they don't each open their own.
+
+In a notebook opened from the `sql/` folder:
+
+    from sql101.bootstrap import setup
+    setup()
+"""
+
+import importlib.util
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from . import DEFAULT_DB
+
+# Applied once per connection: keep sorts and temp B-trees in memory and
+# give the page cache 64 MB instead of the default 2 MB
+DEFAULT_PRAGMAS = {
+    "temp_store": "MEMORY",
+    "cache_size": -64_000,
+}
+
+_lock = threading.Lock()
+_connections = {}  # (absolute db path, pragmas) -> sqlite3 connection
+_magic_connected = set()  # db paths whose %sql connection already has the PRAGMAs
+
+
+def _resolve(db_path):
+    """An absolute path, so every working directory means the same file; URIs stay as they are."""
+    if db_path == ":memory:" or db_path.startswith("file:"):
+        return db_path
+    return os.path.abspath(db_path)
+
+
+def _magic_database():
+    """The database the %sql magic points at now (None before its first connection)."""
+    try:
+        from sql.connection import Connection
+    except ImportError:
+        return None
+    current = Connection.current
+    return current.url.database if current is not None else None
+
+
+def _pragma_key(pragmas):
+    return tuple(sorted((pragmas or {}).items()))
+
+
+def apply_pragmas(conn, pragmas):
+    """Run `PRAGMA name = value` for each item (on a sqlite3 connection)."""
+    for name, value in (pragmas or {}).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def connection(db_path=DEFAULT_DB, pragmas=None):
+    """The process-wide sqlite3 connection for `db_path`, created (and tuned) on first use.
+
+    `pragmas` defaults to `DEFAULT_PRAGMAS`. The connection can be used
+    from any thread of the kernel; serialize access yourself if you share
+    it between threads.
+    """
+    pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    db_path = _resolve(db_path)
+    key = (db_path, _pragma_key(pragmas))
+    with _lock:
+        conn = _connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, uri=db_path.startswith("file:"))
+            apply_pragmas(conn, pragmas)
+            _connections[key] = conn
+        return conn
+
+
+def close_all():
+    """Close every connection opened by `connection()`."""
+    with _lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
+
+
+def ipython_sql_installed():
+    """True if ipython-sql can be imported, without importing it."""
+    return importlib.util.find_spec("sql") is not None and importlib.util.find_spec("sql.magic") is not None
+
+
+def setup(db_path=DEFAULT_DB, pragmas=None, ip=None, quiet=False):
+    """Make `%%sql` ready on `db_path` in the current IPython kernel, as cheaply as possible.
+
+    Relative paths are resolved against the working directory, so the
+    magic and `connection()` always open the same file. If a later `%sql`
+    switched the magic to another database, calling this again switches
+    it back. Returns a dict of step -> seconds (plus "total"), which is
+    also printed unless `quiet` is set.
+    """
+    if ip is None:
+        from IPython import get_ipython
+        ip = get_ipython()
+    pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+    db_path = _resolve(db_path)
+    timings = {}
+    started = time.perf_counter()
+
+    step = time.perf_counter()
+    if not ipython_sql_installed():
+        subprocess.run([sys.executable, "-m", "pip", "-q", "install", "ipython-sql"], check=True)
+        importlib.invalidate_caches()
+        timings["pip install"] = time.perf_counter() - step
+    else:
+        timings["find ipython-sql"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    if "sql" not in ip.extension_manager.loaded:
+        ip.run_line_magic("load_ext", "sql")
+        timings["load_ext sql"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    # Connection.current, not our own bookkeeping: the user may have run %sql since
+    if _magic_database() != db_path.split("?")[0]:
+        ip.run_line_magic("sql", f"sqlite:///{db_path}")
+        if db_path not in _magic_connected:
+            # The magic's own connection gets the same PRAGMAs, once
+            for name, value in pragmas.items():
+                ip.run_line_magic("sql", f"PRAGMA {name} = {value}")
+            _magic_connected.add(db_path)
+        timings["connect"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    connection(db_path, pragmas)
+    timings["sqlite3 connection"] = time.perf_counter() - step
+
+    timings["total"] = time.perf_counter() - started
+    if not quiet:
+        steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items() if name != "total")
+        print(f"SQL ready in {timings['total']:.2f}s ({steps})")
+    return timings
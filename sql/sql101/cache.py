@@ -0,0 +1,366 @@
+"""Result cache for repeated SELECTs (and for %%sql cells).
+
+The lessons run the same SELECTs again and again: `SELECT * FROM
+sql_101_product` shows up in 0_Tables, 2_Join and elsewhere, and the
+sql_101_transactions_ext queries repeat across 3_Group. This module keeps
+their results and hands them back until the data they read changes.
+
+- Keys are the *normalized* statement: comments such as
+  `-- Selecting all the columns` are dropped and whitespace collapsed
+  (string literals are left alone), so cosmetic edits still hit.
+- The tables a statement reads are found with SQLite's authorizer while
+  the statement is compiled, so views and subqueries are resolved to the
+  real tables. Statements that write, run DDL or call non-deterministic
+  functions (random(), changes(), date('now'), ...) are never cached.
+- Freshness: every entry remembers `PRAGMA data_version` (bumped when
+  another connection commits), our own `total_changes()` and `PRAGMA
+  schema_version`. If all three are unchanged the entry is served without
+  further checks. If something changed and `track_tables` installed
+  per-table change counters, only entries reading a changed table are
+  dropped; without counters, any change clears the cache. DDL always
+  clears it.
+- Entries are evicted least-recently-used first, within both an entry
+  count and a rough memory budget.
+
+Two ways to use it:
+
+    cache = QueryCache(sqlite3.connect("my_database.db"))
+    rows = cache.execute("SELECT * FROM sql_101_product")
+
+or, in a notebook after `%load_ext sql`, put the cache in front of the
+%%sql magic:
+
+    from sql101.cache import install_magic
+    install_magic("my_database.db")
+"""
+
+import collections
+import re
+import sqlite3
+import sys
+
+from .schema import run_script
+
+# Authorizer actions that only read
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+
+# Functions whose result changes between runs over the same data
+VOLATILE_FUNCTIONS = {"random", "randomblob", "changes", "total_changes", "last_insert_rowid",
+                      "current_date", "current_time", "current_timestamp"}
+
+# Date/time functions: volatile only when they read the clock ('now', or no time value)
+DATE_FUNCTIONS = {"date", "time", "datetime", "julianday", "strftime", "unixepoch"}
+
+# Tokens for finding date/time calls and their arguments
+_CALL_TOKENS = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|[?:@$]\w*|\w+|\S""")
+
+# Comments and string/identifier literals, in the order SQLite tokenizes them
+_TOKENS = re.compile(r"""
+    (?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<space>\s+)
+""", re.VERBOSE | re.DOTALL)
+
+
+def normalize(sql):
+    """Drop comments, collapse whitespace and trailing semicolons, keep literals as they are."""
+    parts = []
+    position = 0
+    for match in _TOKENS.finditer(sql):
+        if match.start() > position:
+            parts.append(sql[position:match.start()])
+        if match.group("literal"):
+            parts.append(match.group("literal"))
+        elif not parts or parts[-1] != " ":
+            parts.append(" ")
+        position = match.end()
+    parts.append(sql[position:])
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def reads_clock(sql):
+    """True if a date/time function in `sql` reads the current time.
+
+    That is a call with 'now' or a bound parameter as an argument, or
+    without a time value at all (`date()`, `strftime('%Y')`).
+    """
+    tokens = _CALL_TOKENS.findall(normalize(sql))
+    for i, token in enumerate(tokens):
+        name = token.lower()
+        if name not in DATE_FUNCTIONS or tokens[i + 1:i + 2] != ["("]:
+            continue
+        args, depth = [[]], 0
+        for token in tokens[i + 2:]:
+            if token == ")" and depth == 0:
+                break
+            if token == "," and depth == 0:
+                args.append([])
+                continue
+            depth += {"(": 1, ")": -1}.get(token, 0)
+            args[-1].append(token)
+        if args == [[]] or (name == "strftime" and len(args) < 2):
+            return True
+        if any(len(arg) == 1 and (arg[0].lower() == "'now'" or arg[0][0] in "?:@$") for arg in args):
+            return True
+    return False
+
+
+def analyze_statement(conn, sql, params=()):
+    """Compile `sql` without running it and report what it touches.
+
+    Returns (read_tables, volatile): the set of tables the statement reads
+    and whether its result can't be reused, because it writes, changes the
+    schema or calls a non-deterministic function (see VOLATILE_FUNCTIONS
+    and `reads_clock`). `params` are only bound so that EXPLAIN can run.
+    Raises sqlite3 errors for invalid SQL (including more than one
+    statement).
+    """
+    read_tables = set()
+    volatile = []
+    clock_sources = set()  # where date/time functions are called: None for `sql`, else a view name
+
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if action == sqlite3.SQLITE_READ:
+            if not arg1.startswith("sqlite_"):
+                read_tables.add(arg1)
+        elif action == sqlite3.SQLITE_FUNCTION and arg2 in VOLATILE_FUNCTIONS:
+            volatile.append(action)
+        elif action == sqlite3.SQLITE_FUNCTION and arg2 in DATE_FUNCTIONS:
+            clock_sources.add(trigger)
+        elif action not in READ_ACTIONS:
+            volatile.append(action)
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorizer)
+    try:
+        # EXPLAIN compiles the statement (running the authorizer) but doesn't execute it
+        conn.execute(f"EXPLAIN {sql}", params).fetchall()
+    finally:
+        conn.set_authorizer(None)
+    for source in clock_sources:
+        if source is None:
+            texts = [sql]
+        else:
+            texts = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = ? UNION ALL "
+                "SELECT sql FROM sqlite_temp_master WHERE name = ?", (source, source))]
+        if any(reads_clock(text) for text in texts):
+            volatile.append(sqlite3.SQLITE_FUNCTION)
+    return read_tables, bool(volatile)
+
+
+def _estimate_bytes(rows):
+    """Rough memory footprint of a result set, extrapolated from up to 100 rows."""
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[:100]
+    per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row) for row in sample) / len(sample)
+    return int(sys.getsizeof(rows) + per_row * len(rows))
+
+
+def track_tables(conn, tables):
+    """Install per-table change counters, bumped by triggers on every INSERT/UPDATE/DELETE.
+
+    With counters in place, a write to one table only invalidates cached
+    results that read that table. Each written row pays for one extra
+    UPDATE, so track the tables you query, not bulk-load targets.
+    """
+    script = ["CREATE TABLE IF NOT EXISTS sql101_table_versions "
+              "(name TEXT PRIMARY KEY, version INT NOT NULL DEFAULT 0);"]
+    for table in tables:
+        script.append(f"INSERT OR IGNORE INTO sql101_table_versions (name) VALUES ('{table}');")
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            script.append(
+                f"CREATE TRIGGER IF NOT EXISTS sql101_version_{table}_{op.lower()} AFTER {op} ON {table}\n"
+                f"BEGIN\n    UPDATE sql101_table_versions SET version = version + 1 WHERE name = '{table}';\nEND;")
+    with conn:
+        run_script(conn, "\n".join(script))
+
+
+def untrack_tables(conn, tables):
+    """Remove the counters installed by `track_tables`."""
+    with conn:
+        for table in tables:
+            for op in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS sql101_version_{table}_{op}")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sql101_table_versions'").fetchone():
+                conn.execute("DELETE FROM sql101_table_versions WHERE name = ?", (table,))
+
+
+class CacheEntry:
+    def __init__(self, result, tables, stamp, versions, size):
+        self.result = result
+        self.tables = tables
+        self.stamp = stamp
+        self.versions = versions
+        self.size = size
+
+
+class QueryCache:
+    """LRU cache of SELECT results, validated against `conn` (see the module docstring).
+
+    `conn` is the connection used to check freshness (and, for `execute`,
+    to run queries). Writes may happen on any connection to the same file.
+    """
+
+    def __init__(self, conn, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.conn = conn
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._stamp = None
+        self._plans = {}  # normalized sql -> (tables, volatile)
+
+    # Freshness
+
+    def stamp(self):
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        schema_version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+        return (data_version, self.conn.total_changes, schema_version)
+
+    def table_versions(self, tables):
+        """Current change counter of each tracked table, None for untracked ones."""
+        try:
+            rows = dict(self.conn.execute("SELECT name, version FROM sql101_table_versions"))
+        except sqlite3.OperationalError:
+            return None
+        return {table: rows.get(table) for table in tables}
+
+    def _validate(self):
+        """Drop whatever the changes since the last call could have made stale."""
+        stamp = self.stamp()
+        if stamp == self._stamp:
+            return
+        if self._stamp is not None and stamp[2] != self._stamp[2]:
+            # Schema change: tables may have been dropped and recreated without their triggers
+            self.clear()
+        self._stamp = stamp
+        current = None
+        for key, entry in list(self.entries.items()):
+            if entry.stamp == stamp:
+                continue
+            if entry.versions and current is None:
+                current = self.table_versions(set().union(*(e.tables for e in self.entries.values()))) or {}
+            versions = {table: current.get(table) for table in entry.tables} if entry.versions else None
+            if versions is not None and None not in versions.values() and versions == entry.versions:
+                entry.stamp = stamp
+            else:
+                self._drop(key)
+
+    # Storage
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def get(self, sql, params=()):
+        """Cached result for `sql`/`params`, or None."""
+        self._validate()
+        key = (normalize(sql), tuple(params))
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry.result
+
+    def plan(self, sql, params=()):
+        """(tables read, volatile?) for `sql`, or None if it can't be cached (e.g. several statements)."""
+        key = normalize(sql)
+        if key not in self._plans:
+            try:
+                self._plans[key] = analyze_statement(self.conn, key, params)
+            except (sqlite3.Error, sqlite3.Warning):
+                self._plans[key] = None
+        return self._plans[key]
+
+    def snapshot(self, sql, params=()):
+        """Freshness markers to take *before* running `sql`, to pass to `put` afterwards.
+
+        Taking them first means a commit that lands while the query runs
+        makes the entry look stale rather than fresh.
+        """
+        plan = self.plan(sql, params)
+        tables = plan[0] if plan else set()
+        return self.stamp(), self.table_versions(tables)
+
+    def put(self, sql, params, result, snapshot, rows=None):
+        """Store `result` if `sql` is a cacheable SELECT within budget. Returns True if stored.
+
+        `snapshot` comes from `snapshot(sql)` taken before the query ran;
+        `rows` is what to measure for the memory budget (default: `result`).
+        """
+        plan = self.plan(sql, params)
+        if plan is None or plan[1]:
+            return False
+        size = _estimate_bytes(list(rows if rows is not None else result))
+        if size > self.max_bytes // 4:
+            return False
+        self._validate()
+        key = (normalize(sql), tuple(params))
+        if key in self.entries:
+            self._drop(key)
+        stamp, versions = snapshot
+        self.entries[key] = CacheEntry(result, plan[0], stamp, versions, size)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._drop(next(iter(self.entries)))
+        return True
+
+    def execute(self, sql, params=()):
+        """Run `sql` on the cache's connection, serving (and storing) SELECT results from the cache."""
+        result = self.get(sql, params)
+        if result is not None:
+            return result
+        snapshot = self.snapshot(sql, params)
+        result = self.conn.execute(sql, params).fetchall()
+        self.put(sql, params, result, snapshot)
+        return result
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+def install_magic(db_path, cache=None, ip=None, **cache_options):
+    """Put a `QueryCache` in front of the ipython-sql %%sql cell magic.
+
+    Cells are still executed by ipython-sql (so connection strings,
+    variables and result display keep working); the cache only skips the
+    execution when an identical, still-valid SELECT already ran. The cache
+    checks freshness through its own read-only connection to `db_path`,
+    which sees commits made by the magic's connection via data_version.
+    Returns the cache.
+    """
+    if ip is None:
+        from IPython import get_ipython
+        ip = get_ipython()
+    if cache is None:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        cache = QueryCache(conn, **cache_options)
+    original = ip.magics_manager.magics["cell"]["sql"]
+    original = getattr(original, "__wrapped_sql101__", original)
+
+    def sql(line, cell="", local_ns=None):
+        # Only plain cells: a connection string or `<<` on the magic line changes what runs
+        if line.strip():
+            return original(line, cell, local_ns=local_ns)
+        result = cache.get(cell)
+        if result is None:
+            snapshot = cache.snapshot(cell)
+            result = original(line, cell, local_ns=local_ns)
+            if isinstance(result, list):
+                cache.put(cell, (), result, snapshot)
+        return result
+
+    sql.needs_local_scope = True
+    sql.__wrapped_sql101__ = original
+    ip.register_magic_function(sql, "cell", "sql")
+    return cache
@@ -0,0 +1,282 @@
+"""Change-data capture for the sql_101_* tables.
+
+Nothing records what changed in sql_101_product, sql_101_store or
+sql_101_transactions, so everything derived from them (the ext table,
+the rollups, Python-side caches) has to rescan whole tables to catch
+up. This module logs every change with triggers instead:
+
+- `sql101_cdc_log` gets one row per changed row: `seq` (increasing,
+  never reused), the table ('product', 'store' or 'transactions'), the
+  operation ('I', 'U' or 'D'), the row's id, and its old and new values
+  as JSON arrays in column order (NULL where there is none). JSON has
+  no bytes, so a BLOB value is logged as {"blob": "<hex>"}, and JSON
+  numbers keep only 15 digits, so a REAL is logged as {"real": "<17
+  digits>"}; `read` turns both back into the exact bytes and floats.
+  UPDATEs that change nothing are not logged.
+- A consumer `subscribe`s under a name, `poll`s the changes after the
+  last sequence number it acknowledged, applies them and `ack`s the
+  last one it handled. `read` gives the changes after any seq.
+- `compact` deletes what every subscriber has acknowledged (everything,
+  when there are no subscribers), so the log only holds unread changes.
+
+The triggers belong to the tables: `indexes.apply` (whose `add_keys`
+rebuilds the tables) carries them over, but dropping a table drops them.
+
+Changes are logged in the writer's transaction, so a rolled-back write
+leaves no entry and a consumer never sees half of a transaction that
+later fails. Each logged row costs one extra insert into the log: see
+`python -m sql101.benchmarks.cdc` for what that means for bulk loads.
+
+    cdc.enable(conn)
+    cdc.subscribe(conn, "cache")
+    changes = cdc.poll(conn, "cache")
+    ...                                  # apply them
+    if changes:
+        cdc.ack(conn, "cache", changes[-1]["seq"])
+
+Usage from the `sql/` folder:
+
+    python -m sql101.cdc enable --db my_database.db
+    python -m sql101.cdc tail --since 0
+    python -m sql101.cdc compact
+"""
+
+import argparse
+import json
+import sqlite3
+
+from . import DEFAULT_DB
+from .indexes import table_exists
+from .schema import COLUMNS, KEY_COLUMNS, run_script
+
+LOG_TABLE = "sql101_cdc_log"
+SUBSCRIBERS_TABLE = "sql101_cdc_subscribers"
+
+# Table -> the short name written to the log
+TABLES = {
+    "sql_101_product": "product",
+    "sql_101_store": "store",
+    "sql_101_transactions": "transactions",
+}
+
+SETUP = f"""
+CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- AUTOINCREMENT: never reused after a compact
+    tbl TEXT NOT NULL,
+    op TEXT NOT NULL,  -- 'I', 'U' or 'D'
+    key INT,
+    old TEXT,  -- JSON array of the old values, in column order
+    new TEXT   -- JSON array of the new values
+);
+CREATE TABLE IF NOT EXISTS {SUBSCRIBERS_TABLE} (
+    name TEXT PRIMARY KEY,
+    acked INT NOT NULL  -- last seq the subscriber has handled
+);
+"""
+
+
+def _json_value(value):
+    # json_array() refuses BLOBs and rounds REALs to 15 digits: log them as {"blob": hex}
+    # and {"real": text with enough digits to give the same double back}
+    return (f"CASE typeof({value}) WHEN 'blob' THEN json_object('blob', hex({value})) "
+            f"WHEN 'real' THEN json_object('real', printf('%!.17g', {value})) ELSE {value} END")
+
+
+def _triggers(table):
+    short = TABLES[table]
+    key = KEY_COLUMNS[table]
+    old = f"json_array({', '.join(_json_value(f'OLD.{column}') for column in COLUMNS[table])})"
+    new = f"json_array({', '.join(_json_value(f'NEW.{column}') for column in COLUMNS[table])})"
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in COLUMNS[table])
+    prefix = f"sql101_cdc_{short}"
+    return f"""
+CREATE TRIGGER IF NOT EXISTS {prefix}_ins AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO {LOG_TABLE} (tbl, op, key, new) VALUES ('{short}', 'I', NEW.{key}, {new});
+END;
+CREATE TRIGGER IF NOT EXISTS {prefix}_upd AFTER UPDATE ON {table}
+WHEN {changed}
+BEGIN
+    INSERT INTO {LOG_TABLE} (tbl, op, key, old, new) VALUES ('{short}', 'U', NEW.{key}, {old}, {new});
+END;
+CREATE TRIGGER IF NOT EXISTS {prefix}_del AFTER DELETE ON {table}
+BEGIN
+    INSERT INTO {LOG_TABLE} (tbl, op, key, old) VALUES ('{short}', 'D', OLD.{key}, {old});
+END;
+"""
+
+
+def _trigger_names(table):
+    return [f"sql101_cdc_{TABLES[table]}_{op}" for op in ("ins", "upd", "del")]
+
+
+def is_enabled(conn):
+    """True if the log exists and every table that exists has its triggers."""
+    if not table_exists(conn, LOG_TABLE):
+        return False
+    found = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return all(set(_trigger_names(table)) <= found for table in TABLES if table_exists(conn, table))
+
+
+def enable(conn):
+    """Create the log, the subscriber table and the triggers (skipping tables that don't exist).
+
+    Safe to call again, e.g. after 0_Tables dropped and recreated the
+    tables (and their triggers with them), or to replace the triggers of
+    an older version. Existing rows are not logged.
+    """
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        run_script(conn, SETUP)
+        for table in TABLES:
+            if table_exists(conn, table):
+                for name in _trigger_names(table):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                run_script(conn, _triggers(table))
+
+
+def disable(conn):
+    """Drop the triggers, the log and the subscribers."""
+    with conn:
+        for table in TABLES:
+            for name in _trigger_names(table):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"DROP TABLE IF EXISTS {LOG_TABLE}")
+        conn.execute(f"DROP TABLE IF EXISTS {SUBSCRIBERS_TABLE}")
+
+
+def last_seq(conn):
+    """The seq of the newest change ever logged (0 if none)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (LOG_TABLE,)).fetchone()
+    return row[0] if row else 0
+
+
+def _value(value):
+    if not isinstance(value, dict):
+        return value
+    return bytes.fromhex(value["blob"]) if "blob" in value else float(value["real"])
+
+
+def _values(text):
+    return [_value(value) for value in json.loads(text)]
+
+
+def _change(row):
+    seq, short, op, key, old, new = row
+    columns = COLUMNS[f"sql_101_{short}"]
+    return {
+        "seq": seq,
+        "table": f"sql_101_{short}",
+        "op": op,
+        "key": key,
+        "old": dict(zip(columns, _values(old))) if old is not None else None,
+        "new": dict(zip(columns, _values(new))) if new is not None else None,
+    }
+
+
+def read(conn, since=0, limit=10_000, tables=None):
+    """Up to `limit` changes with seq > `since`, oldest first, as dicts.
+
+    Each change has seq, table, op, key, and old/new as {column: value}
+    (None for inserts and deletes respectively). `tables` restricts the
+    result to some of the sql_101_* tables.
+    """
+    sql = f"SELECT seq, tbl, op, key, old, new FROM {LOG_TABLE} WHERE seq > ?"
+    params = [since]
+    if tables:
+        sql += f" AND tbl IN ({', '.join('?' * len(tables))})"
+        params += [TABLES[table] for table in tables]
+    sql += " ORDER BY seq LIMIT ?"
+    params.append(limit)
+    return [_change(row) for row in conn.execute(sql, params)]
+
+
+def subscribe(conn, name, from_start=False):
+    """Register consumer `name`, starting after the newest change (or at the oldest kept one).
+
+    Subscribing again keeps the consumer's position. Returns the last
+    seq it has acknowledged.
+    """
+    with conn:
+        conn.execute(f"INSERT OR IGNORE INTO {SUBSCRIBERS_TABLE} (name, acked) VALUES (?, ?)",
+                     (name, 0 if from_start else last_seq(conn)))
+    return acked(conn, name)
+
+
+def unsubscribe(conn, name):
+    """Forget consumer `name`; the changes only it still needed can then be compacted."""
+    with conn:
+        conn.execute(f"DELETE FROM {SUBSCRIBERS_TABLE} WHERE name = ?", (name,))
+
+
+def acked(conn, name):
+    """The last seq consumer `name` acknowledged."""
+    row = conn.execute(f"SELECT acked FROM {SUBSCRIBERS_TABLE} WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise KeyError(f"no CDC subscriber named {name!r}")
+    return row[0]
+
+
+def poll(conn, name, limit=10_000, tables=None):
+    """The next changes for consumer `name` (after its last ack); see `read`."""
+    return read(conn, acked(conn, name), limit, tables)
+
+
+def ack(conn, name, seq):
+    """Record that consumer `name` has handled every change up to `seq` (never moves back)."""
+    with conn:
+        updated = conn.execute(f"UPDATE {SUBSCRIBERS_TABLE} SET acked = max(acked, ?) WHERE name = ?",
+                               (seq, name)).rowcount
+    if not updated:
+        raise KeyError(f"no CDC subscriber named {name!r}")
+
+
+def compact(conn):
+    """Delete the changes every subscriber has acknowledged. Returns the number deleted."""
+    with conn:
+        horizon = conn.execute(f"SELECT min(acked) FROM {SUBSCRIBERS_TABLE}").fetchone()[0]
+        if horizon is None:
+            return conn.execute(f"DELETE FROM {LOG_TABLE}").rowcount
+        return conn.execute(f"DELETE FROM {LOG_TABLE} WHERE seq <= ?", (horizon,)).rowcount
+
+
+def stats(conn):
+    """{"changes": kept rows, "last_seq": newest seq, "subscribers": {name: acked}}."""
+    return {
+        "changes": conn.execute(f"SELECT COUNT(*) FROM {LOG_TABLE}").fetchone()[0],
+        "last_seq": last_seq(conn),
+        "subscribers": dict(conn.execute(f"SELECT name, acked FROM {SUBSCRIBERS_TABLE} ORDER BY name")),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change-data capture for the sql_101_* tables.")
+    parser.add_argument("command", choices=["enable", "disable", "status", "tail", "compact"])
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--since", type=int, help="tail: show changes after this seq (default: the last 20)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "enable":
+            enable(conn)
+            print(f"CDC enabled on {', '.join(t for t in TABLES if table_exists(conn, t))}")
+        elif args.command == "disable":
+            disable(conn)
+            print("CDC triggers and log dropped")
+        elif args.command == "status":
+            print(stats(conn))
+        elif args.command == "tail":
+            since = args.since if args.since is not None else max(0, last_seq(conn) - args.limit)
+            for change in read(conn, since, args.limit):
+                print(change)
+        else:
+            print(f"Deleted {compact(conn):,} acknowledged changes")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""NumPy columnar engine for 3_Group-style aggregates.
+
+SQLite executes the 3_Group queries one row at a time. This module loads
+a table (sql_101_transactions_ext by default) into typed NumPy columns
+once, then answers "filter on a few columns, GROUP BY one or more keys,
+SUM/MIN/MAX/AVG/COUNT" with vectorized bincount and ufunc reductions.
+
+How columns are stored:
+
+- Numbers become a float64 array plus, for columns that mix INTEGER and
+  REAL values (price_per_unit does: 2.00 is stored as the integer 2), a
+  mask of which rows were REAL. SQLite returns an INTEGER from SUM, MIN
+  and MAX when every input is an integer, and so do we.
+- Text (brand, store_name, transaction_date, ...) is dictionary-encoded
+  into int32 codes. The dictionary is sorted, so comparing codes is the
+  same as comparing strings: date ranges and ORDER BY work on the codes.
+- NULL is a separate mask (numbers) or code -1 (text), and is skipped by
+  the aggregates like SQLite does.
+
+Results come back as a list of tuples in the same shape and order as the
+SQL: group keys first (sorted, NULL first), then one value per aggregate.
+Integers, strings and counts match SQLite exactly: integer columns are
+also kept as int64, so SUM of integers is exact beyond 2**53 (and raises
+OverflowError past 64 bits, where SQLite reports "integer overflow").
+Sums involving REAL values are added in table order, in float64. That is
+what SQLite before 3.43 does for a plain scan, so there they match to
+the last bit. SQLite 3.43 and later add REALs with Kahan-Babuska-Neumaier
+compensation, so results can differ by ~1e-15 relative, as they do when
+SQLite picks another scan order.
+
+Filters follow SQLite's comparison affinity, which comes from the
+column's declared type: a string compared with a numeric column is
+converted when it looks like a number (`'2.5'`), and otherwise sorts
+after every number; a number compared with a TEXT column is compared as
+its text. Text stored in a column of NUMERIC affinity (the ext table's
+transaction_date: CREATE TABLE AS turns DATE into NUM) sorts after any
+number, so `transaction_date > '2024'` holds for every date, as in SQLite.
+
+Needs NumPy (`pip install numpy`).
+
+    from sql101.columnar import ColumnStore
+    store = ColumnStore.from_sqlite(conn)
+    store.aggregate([("count", "*"), ("sum", "tot_spent")],
+                    group_by=["brand", "category"],
+                    where=[("transaction_date", ">", "2024-06-01")])
+"""
+
+import math
+import operator
+import re
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError("sql101.columnar needs NumPy: pip install numpy") from exc
+
+EXT_TABLE = "sql_101_transactions_ext"
+
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+
+COMPARISONS = {
+    "=": operator.eq, "!=": operator.ne, "<>": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+# Text that SQLite's numeric affinity turns into a number
+_NUMERIC_TEXT = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$")
+
+# Above this many possible groups we compact the group ids with np.unique
+# instead of allocating one bincount slot per combination
+DENSE_GROUP_LIMIT = 1 << 24
+
+
+class NumericColumn:
+    """float64 values plus NULL and REAL masks (None when a mask would be all False).
+
+    `ints` holds the INTEGER values as int64 (0 elsewhere), for exact sums;
+    None when the column has no INTEGER value.
+    """
+
+    def __init__(self, values, nulls=None, reals=None, ints=None):
+        self.values = values
+        self.nulls = nulls
+        self.reals = reals
+        self.ints = ints
+
+
+class TextColumn:
+    """int32 codes into a sorted list of distinct strings, -1 for NULL.
+
+    `affinity` is "text", "numeric" or "blob" (none), from the declared type.
+    """
+
+    def __init__(self, codes, dictionary, affinity="text"):
+        self.codes = codes
+        self.dictionary = dictionary
+        self.affinity = affinity
+
+    @property
+    def nulls(self):
+        return self.codes < 0
+
+
+def _affinity(declared):
+    """SQLite's column affinity rules, folded to what comparisons need."""
+    declared = declared.upper()
+    if "INT" in declared:
+        return "numeric"
+    if any(word in declared for word in ("CHAR", "CLOB", "TEXT")):
+        return "text"
+    if "BLOB" in declared or not declared:
+        return "blob"
+    return "numeric"
+
+
+class _ColumnBuilder:
+    """Encodes one column chunk by chunk, so only one chunk of Python objects is alive at a time.
+
+    The column's kind (text or numeric) is fixed by its first non-NULL
+    value; NULLs seen before that are kept as a count.
+    """
+
+    def __init__(self, name, affinity="text"):
+        self.name = name
+        self.affinity = affinity
+        self.kind = None
+        self.leading_nulls = 0
+        self.parts = []  # numeric: (values, nulls, reals, ints) per chunk, text: codes per chunk
+        self.lookup = {}
+
+    def add(self, chunk):
+        kinds = {str if type(v) is str else float for v in chunk if v is not None}
+        if len(kinds) > 1 or (self.kind and kinds and kinds != {self.kind}):
+            raise TypeError(f"column {self.name} mixes text and numbers")
+        if self.kind is None:
+            if not kinds:
+                self.leading_nulls += len(chunk)
+                return
+            self.kind = kinds.pop()
+        if self.kind is str:
+            lookup = self.lookup
+            self.parts.append(np.array([-1 if v is None else lookup.setdefault(v, len(lookup)) for v in chunk],
+                                       dtype=np.int32))
+        else:
+            nulls = np.fromiter((v is None for v in chunk), dtype=bool, count=len(chunk))
+            reals = np.fromiter((type(v) is float for v in chunk), dtype=bool, count=len(chunk))
+            ints = np.fromiter((v if type(v) is int else 0 for v in chunk), dtype=np.int64, count=len(chunk))
+            if nulls.any():
+                chunk = [math.nan if v is None else v for v in chunk]
+            self.parts.append((np.array(chunk, dtype=np.float64), nulls, reals, ints))
+
+    def finish(self):
+        if self.kind is str:
+            codes = np.concatenate([np.full(self.leading_nulls, -1, dtype=np.int32)] + self.parts)
+            # Sort the dictionary (Python str order is SQLite's BINARY collation) and remap the codes
+            dictionary = sorted(self.lookup)
+            remap = np.empty(len(dictionary) + 1, dtype=np.int32)
+            remap[-1] = -1  # codes of -1 index the last slot
+            for new_code, value in enumerate(dictionary):
+                remap[self.lookup[value]] = new_code
+            return TextColumn(remap[codes], dictionary, self.affinity)
+
+        lead = self.leading_nulls
+        values = np.concatenate([np.full(lead, math.nan)] + [part[0] for part in self.parts])
+        nulls = np.concatenate([np.ones(lead, dtype=bool)] + [part[1] for part in self.parts])
+        reals = np.concatenate([np.zeros(lead, dtype=bool)] + [part[2] for part in self.parts])
+        ints = None
+        if not (reals | nulls).all():
+            ints = np.concatenate([np.zeros(lead, dtype=np.int64)] + [part[3] for part in self.parts])
+        return NumericColumn(values, nulls if nulls.any() else None, reals if reals.any() else None, ints)
+
+
+class ColumnStore:
+    """A table held as NumPy columns, see the module docstring."""
+
+    def __init__(self, columns, n_rows):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_sqlite(cls, conn, table=EXT_TABLE, columns=None, chunk_size=200_000):
+        """Load `columns` (default: all) of `table`, fetching `chunk_size` rows at a time.
+
+        A column is text if its values are strings, numeric otherwise;
+        a column mixing both raises TypeError.
+        """
+        declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+        columns = columns or list(declared)
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+        builders = [_ColumnBuilder(name, _affinity(declared.get(name, ""))) for name in columns]
+        n_rows = 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            n_rows += len(rows)
+            for builder, values in zip(builders, zip(*rows)):
+                builder.add(values)
+        return cls({builder.name: builder.finish() for builder in builders}, n_rows)
+
+    # Filtering
+
+    def _compare(self, name, op, value):
+        column = self.columns[name]
+        if op not in COMPARISONS:
+            raise ValueError(f"unsupported operator {op!r}")
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(f"can only compare {name} with a string or a number, not {value!r}")
+        if isinstance(column, TextColumn):
+            if isinstance(value, str) and column.affinity == "numeric" and _NUMERIC_TEXT.match(value):
+                # NUMERIC affinity turns the string into a number
+                value = float(value)
+            if not isinstance(value, str):
+                if column.affinity != "text":
+                    # No conversion: every stored string sorts after the number
+                    valid = column.codes >= 0
+                    return valid if op in (">", ">=", "!=", "<>") else np.zeros(self.n_rows, dtype=bool)
+                # TEXT affinity: the number is compared as its text
+                value = str(value)
+            data = column.codes
+            # Turn the string into a position in the sorted dictionary
+            left = np.searchsorted(column.dictionary, value, side="left")
+            right = np.searchsorted(column.dictionary, value, side="right")
+            found = right > left
+            valid = data >= 0
+            if op == "=":
+                return (data == left) & valid if found else np.zeros(self.n_rows, dtype=bool)
+            if op in ("!=", "<>"):
+                return (data != left) & valid if found else valid
+            if op == "<":
+                return (data < left) & valid
+            if op == "<=":
+                return (data < right) & valid
+            if op == ">":
+                return data >= right
+            if op == ">=":
+                return data >= left
+        else:
+            data = column.values
+            valid = ~column.nulls if column.nulls is not None else np.ones(self.n_rows, dtype=bool)
+            if isinstance(value, str):
+                if not _NUMERIC_TEXT.match(value):
+                    # Every number sorts before every string
+                    return valid.copy() if op in ("<", "<=", "!=", "<>") else np.zeros(self.n_rows, dtype=bool)
+                value = float(value)
+            with np.errstate(invalid="ignore"):
+                return COMPARISONS[op](data, value) & valid
+
+    def mask(self, where=()):
+        """Boolean row mask for a list of (column, op, value) conditions, ANDed together.
+
+        Supported ops: = != <> < <= > >=, "between" (value is a (low, high)
+        pair, inclusive) and "in" (value is a list).
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        for name, op, value in where:
+            op = op.lower()
+            if op == "between":
+                low, high = value
+                mask &= self._compare(name, ">=", low) & self._compare(name, "<=", high)
+            elif op == "in":
+                hit = np.zeros(self.n_rows, dtype=bool)
+                for item in value:
+                    hit |= self._compare(name, "=", item)
+                mask &= hit
+            else:
+                mask &= self._compare(name, op, value)
+        return mask
+
+    # Grouping
+
+    def _group_ids(self, group_by, rows, n_selected):
+        """Dense group id per selected row, plus the key tuple of each group, in key order."""
+        if not group_by:
+            return np.zeros(n_selected, dtype=np.int64), [()]
+        gid = np.zeros(n_selected, dtype=np.int64)
+        sizes = []
+        for name in group_by:
+            column = self.columns[name]
+            if not isinstance(column, TextColumn):
+                raise TypeError(f"can only group by text columns, {name} is numeric")
+            size = len(column.dictionary) + 1
+            # +1 so NULL (-1) becomes 0 and sorts first, like in SQLite
+            gid = gid * size + (column.codes[rows].astype(np.int64) + 1)
+            sizes.append(size)
+        if math.prod(sizes) <= DENSE_GROUP_LIMIT:
+            present = np.flatnonzero(np.bincount(gid, minlength=math.prod(sizes)))
+            dense = np.full(math.prod(sizes), -1, dtype=np.int64)
+            dense[present] = np.arange(len(present))
+            gid, keys = dense[gid], present
+        else:
+            keys, gid = np.unique(gid, return_inverse=True)
+
+        # Decode the combined ids back into one key per column
+        decoded = []
+        for name, size in reversed(list(zip(group_by, sizes))):
+            dictionary = self.columns[name].dictionary
+            decoded.append([None if code == 0 else dictionary[code - 1] for code in (keys % size).tolist()])
+            keys = keys // size
+        return gid, list(zip(*reversed(decoded)))
+
+    def _text_extreme(self, func, column, rows, gid, valid, n_groups):
+        """MIN/MAX code per group for a text column."""
+        codes = column.codes[rows]
+        if valid is not None:
+            codes, gid = codes[valid], gid[valid]
+        size = len(column.dictionary)
+        if n_groups * size <= DENSE_GROUP_LIMIT:
+            # Small dictionaries (dates, brands): mark which codes each group
+            # has, then take the first/last one, no per-row Python or ufunc.at
+            seen = np.bincount(gid * size + codes, minlength=n_groups * size).reshape(n_groups, size) > 0
+            if func == "max":
+                return size - 1 - np.argmax(seen[:, ::-1], axis=1)
+            return np.argmax(seen, axis=1)
+        out = np.full(n_groups, -1 if func == "max" else size, dtype=np.int64)
+        (np.maximum if func == "max" else np.minimum).at(out, gid, codes)
+        return out
+
+    def _reduce(self, func, name, rows, gid, counts):
+        n_groups = len(counts)
+        if func == "count" and name == "*":
+            return counts.tolist()
+        column = self.columns[name]
+        nulls = column.nulls
+        valid = None
+        n_valid = counts
+        if nulls is not None and nulls.any():
+            valid = ~nulls[rows]
+            n_valid = np.bincount(gid, weights=valid, minlength=n_groups).astype(np.int64)
+        if func == "count":
+            return n_valid.tolist()
+
+        if isinstance(column, TextColumn):
+            if func not in ("min", "max"):
+                raise TypeError(f"{func.upper()} of the text column {name} is not supported")
+            out = self._text_extreme(func, column, rows, gid, valid, n_groups)
+            return [column.dictionary[c] if n else None for c, n in zip(out.tolist(), n_valid.tolist())]
+
+        values = column.values[rows]
+        reals = column.reals[rows] if column.reals is not None else None
+        if valid is not None:
+            values, gid = values[valid], gid[valid]
+            reals = reals[valid] if reals is not None else None
+
+        if func in ("sum", "avg"):
+            sums = np.bincount(gid, weights=values, minlength=n_groups)
+            if func == "avg":
+                return [s / n if n else None for s, n in zip(sums.tolist(), n_valid.tolist())]
+            if reals is not None:
+                has_real = np.bincount(gid, weights=reals, minlength=n_groups) > 0
+            else:
+                has_real = np.zeros(n_groups, dtype=bool)
+            int_sums = [0] * n_groups
+            if column.ints is not None and not has_real.all():
+                ints = column.ints[rows]
+                if valid is not None:
+                    ints = ints[valid]
+                exact = np.zeros(n_groups, dtype=np.int64)
+                np.add.at(exact, gid, ints)
+                int_sums = exact.tolist()
+                # int64 wraps silently; the float sums show when it must have
+                for total, approx, real in zip(int_sums, sums.tolist(), has_real.tolist()):
+                    if not real and abs(approx - total) > 2.0 ** 62:
+                        raise OverflowError(f"integer overflow in SUM({name})")
+            return [None if not n else (s if real else exact_sum)
+                    for s, exact_sum, n, real in zip(sums.tolist(), int_sums, n_valid.tolist(), has_real.tolist())]
+
+        ufunc = np.maximum if func == "max" else np.minimum
+        out = np.full(n_groups, -np.inf if func == "max" else np.inf)
+        ufunc.at(out, gid, values)
+        # The extreme value keeps its own storage class, like in SQLite
+        if reals is not None:
+            real_out = np.full(n_groups, -np.inf if func == "max" else np.inf)
+            ufunc.at(real_out, gid[reals], values[reals])
+            is_real = real_out == out
+        else:
+            is_real = np.zeros(n_groups, dtype=bool)
+        return [None if not n else (v if real else int(v))
+                for v, n, real in zip(out.tolist(), n_valid.tolist(), is_real.tolist())]
+
+    def aggregate(self, aggregates, group_by=(), where=()):
+        """Run a grouped aggregate and return SQLite-shaped rows.
+
+        - `aggregates`: list of (function, column) with function one of
+          count/sum/avg/min/max; ("count", "*") is COUNT(*).
+        - `group_by`: text columns to group on; results are ordered by them.
+        - `where`: conditions for `mask`.
+
+        Without `group_by` this returns a single row, like SQLite does even
+        when no row matches.
+        """
+        for func, _name in aggregates:
+            if func not in AGGREGATES:
+                raise ValueError(f"unknown aggregate {func!r}, expected one of {AGGREGATES}")
+        mask = self.mask(where)
+        n_selected = int(mask.sum())
+        if group_by and not n_selected:
+            return []
+        # Without a filter, a slice keeps every column a view instead of a copy
+        rows = slice(None) if n_selected == self.n_rows else np.flatnonzero(mask)
+        gid, keys = self._group_ids(list(group_by), rows, n_selected)
+        counts = np.bincount(gid, minlength=len(keys))
+        columns = [self._reduce(func, name, rows, gid, counts) for func, name in aggregates]
+        return [key + tuple(values) for key, values in zip(keys, zip(*columns))]
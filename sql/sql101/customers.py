@@ -0,0 +1,185 @@
+"""Bulk maintenance of hkt_sql_customers with upserts.
+
+1_Select cells 40-47 keep the customer table up to date one statement at
+a time: INSERT ... VALUES per customer, `UPDATE ... WHERE customer_email
+IS NULL` and `DELETE ... WHERE customer_id = 103`. The table has no key
+and no index, so every update and delete scans it. This module keeps it
+keyed and syncs whole feeds instead:
+
+- `prepare` gives the table a customer_id INTEGER PRIMARY KEY (creating
+  it, or rebuilding the lesson's version) and a partial index holding
+  only the customers without an email.
+- `sync` upserts a feed of customer rows with INSERT ... ON CONFLICT DO
+  UPDATE, in one transaction, and reports how many rows were inserted,
+  updated or already up to date. Rows whose values haven't changed are
+  not rewritten. A feed that leaves out a column keeps its stored values.
+- `backfill_emails` and `missing_emails` only touch the partial index,
+  so a backfill job costs as much as the incomplete rows, not the table.
+- `delete` removes customers by id through the primary key.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.customers prepare --db my_database.db
+    python -m sql101.customers sync customers.csv --db my_database.db
+    python -m sql101.customers backfill --db my_database.db
+"""
+
+import argparse
+import csv
+import itertools
+import sqlite3
+import time
+
+from . import DEFAULT_DB
+from .indexes import duplicate_keys, has_primary_key, null_keys, rebuild_table, table_exists
+
+TABLE = "hkt_sql_customers"
+KEY = "customer_id"
+COLUMNS = ["customer_id", "customer_name", "customer_age", "customer_email"]
+MISSING_EMAIL_INDEX = "sql101_customers_missing_email"
+DEFAULT_EMAIL = "unknown@example.com"
+
+# The lesson's table (cells 40 and 43) with the id as primary key
+DDL = f"""CREATE TABLE {TABLE} (
+    customer_id INTEGER PRIMARY KEY,
+    customer_name TEXT,
+    customer_age INT,
+    customer_email TEXT
+)"""
+
+
+def prepare(conn):
+    """Create or rebuild hkt_sql_customers with a primary key, plus the missing-email index.
+
+    An existing table without a key is rebuilt, keeping its rows,
+    indexes, triggers and views (`indexes.rebuild_table`); if it
+    holds duplicate or NULL ids (which the primary key would quietly
+    number) nothing is changed and an IntegrityError names them.
+    """
+    rebuild = table_exists(conn, TABLE) and not has_primary_key(conn, TABLE)
+    if rebuild:
+        dupes = duplicate_keys(conn, TABLE, KEY)
+        if dupes:
+            raise sqlite3.IntegrityError(f"{TABLE} has duplicate {KEY} values (id, count): {dupes}")
+        nulls = null_keys(conn, TABLE, KEY)
+        if nulls:
+            raise sqlite3.IntegrityError(f"{TABLE} has {nulls:,} row(s) with a NULL {KEY}")
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        if rebuild:
+            # The table may predate cell 43's customer_email column
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})") if row[1] in COLUMNS]
+            rebuild_table(conn, TABLE, DDL, columns, order_by=KEY)
+        elif not table_exists(conn, TABLE):
+            conn.execute(DDL)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {MISSING_EMAIL_INDEX} ON {TABLE} ({KEY}) "
+                     f"WHERE customer_email IS NULL")
+
+
+def upsert_sql(columns=COLUMNS):
+    """The INSERT ... ON CONFLICT DO UPDATE for rows of `columns`, skipping rows that wouldn't change."""
+    if KEY not in columns:
+        raise ValueError(f"the feed needs a {KEY} column")
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"{TABLE} has no column(s) {', '.join(unknown)}")
+    insert = f"INSERT INTO {TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    values = [column for column in columns if column != KEY]
+    if not values:
+        return f"{insert} ON CONFLICT ({KEY}) DO NOTHING"
+    return (f"{insert} ON CONFLICT ({KEY}) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in values)
+            + " WHERE " + " OR ".join(f"{column} IS NOT excluded.{column}" for column in values))
+
+
+def _count(conn):
+    return conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+
+def sync(conn, rows, columns=COLUMNS, chunk_size=100_000):
+    """Upsert an iterable of customer rows (tuples in `columns` order) in one transaction.
+
+    When the feed repeats an id, its last row wins (and the earlier ones
+    count as inserted or updated). Returns a dict with the rows read and
+    how many were inserted, updated and unchanged, and the seconds taken.
+    """
+    sql = upsert_sql(list(columns))
+    started = time.perf_counter()
+    stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    rows = iter(rows)
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        before = _count(conn)
+        changed = 0
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            # executemany's rowcount adds up the rows each upsert wrote
+            changed += conn.executemany(sql, chunk).rowcount
+            stats["rows"] += len(chunk)
+        stats["inserted"] = _count(conn) - before
+    stats["updated"] = changed - stats["inserted"]
+    stats["unchanged"] = stats["rows"] - changed
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def missing_emails(conn, limit=None):
+    """customer_ids without an email (the planner reads them from the partial index)."""
+    sql = f"SELECT {KEY} FROM {TABLE} WHERE customer_email IS NULL"
+    if limit is not None:
+        return [row[0] for row in conn.execute(f"{sql} LIMIT ?", (limit,))]
+    return [row[0] for row in conn.execute(sql)]
+
+
+def backfill_emails(conn, email=DEFAULT_EMAIL):
+    """Cell 45's UPDATE, through the partial index. Returns the rows updated."""
+    with conn:
+        return conn.execute(f"UPDATE {TABLE} SET customer_email = ? WHERE customer_email IS NULL",
+                            (email,)).rowcount
+
+
+def delete(conn, ids):
+    """Delete customers by id. Returns the rows deleted."""
+    with conn:
+        return conn.executemany(f"DELETE FROM {TABLE} WHERE {KEY} = ?", ((i,) for i in ids)).rowcount
+
+
+def _csv_rows(reader):
+    # Empty fields are missing values, as in sql101.loader
+    for row in reader:
+        yield tuple(value if value != "" else None for value in row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep hkt_sql_customers in sync with bulk upserts.")
+    parser.add_argument("command", choices=["prepare", "sync", "backfill", "delete"])
+    parser.add_argument("args", nargs="*", help="sync: a CSV file with a header row; delete: customer_ids")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--email", default=DEFAULT_EMAIL, help="backfill value for missing emails")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        prepare(conn)
+        if args.command == "sync":
+            if len(args.args) != 1:
+                parser.error("sync needs one CSV file")
+            with open(args.args[0], newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                stats = sync(conn, _csv_rows(reader), header)
+            print(f"{stats['rows']:,} rows in {stats['seconds']}s: {stats['inserted']:,} inserted, "
+                  f"{stats['updated']:,} updated, {stats['unchanged']:,} unchanged")
+        elif args.command == "backfill":
+            print(f"{backfill_emails(conn, args.email):,} missing emails set to {args.email}")
+        elif args.command == "delete":
+            print(f"{delete(conn, [int(i) for i in args.args]):,} customers deleted")
+        else:
+            print(f"{TABLE} has its primary key and {MISSING_EMAIL_INDEX}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
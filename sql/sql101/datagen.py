@@ -0,0 +1,319 @@
+"""Scale-factor synthetic data for the sql_101_* star schema.
+
+0_Tables inserts 20 transactions by hand, which is fine for learning but
+useless for measuring anything. This module generates a bigger version of
+the same data:
+
+- `scale=1` means 1,000 transactions, `scale=100_000` means 100M.
+- Products and stores grow with the scale factor. The first 10 SKUs and
+  the first 2 stores are always the lesson ones, so every lesson query
+  still finds Spaghetti N5, the Downtown Store and friends.
+- SKU popularity follows a Zipf law, a few hot stores take most of the
+  traffic and daily volumes follow a yearly seasonal curve.
+- The same seed always produces exactly the same database.
+
+Rows are produced by generators and written with batched `executemany`
+calls inside large transactions, so memory stays flat at any scale.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.datagen --scale 1000 --seed 42 --db my_database.db
+"""
+
+import argparse
+import datetime
+import itertools
+import math
+import random
+import sqlite3
+import time
+
+from .indexes import create_indexes
+from .schema import COLUMNS, create_tables
+
+# The lesson catalog from 0_Tables, cell 5
+LESSON_PRODUCTS = [
+    (1, "Spaghetti N5", "pasta", "long cut", "Berillo", 1.60),
+    (2, "Just Penne", "pasta", "short cut", "De Cocco", 1.70),
+    (3, "Fusilloni", "pasta", "short cut", "Molisano", 1.80),
+    (4, "Tomatoni Sauce", "sauces", "red", "Motti", 2.50),
+    (5, "Presto Pesto Sauce", "sauces", "pesto", "Berillo", 3.00),
+    (6, "Cileni Ripieni", "bakery", "biscuits", "Berillo", 2.00),
+    (7, "Biskotti", "bakery", "biscuits", "Ferraro", 2.20),
+    (8, "Also Penne", "pasta", "short cut", "Berillo", 1.60),
+    (9, "Fusillonioni", "pasta", "short cut", "Berillo", 1.70),
+    (10, "Spaghetti N5000", "pasta", "long cut", "De Cocco", 2.00),
+]
+
+# The lesson stores from 0_Tables, cell 6
+LESSON_STORES = [
+    (1, "Downtown Store", "123 Main St, Cityville", "Alice Smith", "2020-01-15", "123-456-7890"),
+    (2, "Uptown Store", "456 High St, Cityville", "Bob Johnson", "2019-03-10", "123-555-7890"),
+]
+
+# (category, sub_category, name stem, base list price) used for extra SKUs
+PRODUCT_TEMPLATES = [
+    ("pasta", "long cut", "Spaghetti", 1.60),
+    ("pasta", "long cut", "Linguine", 1.70),
+    ("pasta", "short cut", "Penne", 1.70),
+    ("pasta", "short cut", "Fusilli", 1.80),
+    ("sauces", "red", "Tomato Sauce", 2.50),
+    ("sauces", "pesto", "Pesto Sauce", 3.00),
+    ("bakery", "biscuits", "Biscotti", 2.10),
+    ("bakery", "crackers", "Crackers", 1.90),
+]
+
+BRANDS = ["Berillo", "De Cocco", "Molisano", "Motti", "Ferraro"]
+CITIES = ["Cityville", "Townsburg", "Villagetown", "Portside", "Hillcrest"]
+STREETS = ["Main St", "High St", "Market St", "Station Rd", "Church Ln", "Park Ave"]
+MANAGERS = ["Alice", "Bob", "Carla", "Dario", "Elena", "Franco", "Giulia", "Hugo"]
+SURNAMES = ["Smith", "Johnson", "Rossi", "Bianchi", "Brown", "Ferri", "Conti"]
+
+
+def transactions_for_scale(scale):
+    """Number of transactions for a scale factor (1 -> 1,000)."""
+    return max(1, int(round(scale * 1000)))
+
+
+def products_for_scale(scale):
+    """Catalog size: the 10 lesson SKUs plus ~1 new SKU per 1,000 transactions, capped at 100K."""
+    return max(len(LESSON_PRODUCTS), min(100_000, transactions_for_scale(scale) // 1000))
+
+
+def stores_for_scale(scale):
+    """Store count: the 2 lesson stores plus ~1 per 100K transactions, capped at 2,000."""
+    return max(len(LESSON_STORES), min(2_000, transactions_for_scale(scale) // 100_000))
+
+
+class Skew:
+    """How unevenly the generated traffic is spread.
+
+    - `sku_zipf`: Zipf exponent for SKU popularity (0 = uniform).
+    - `hot_store_fraction` / `hot_store_share`: this fraction of the stores
+      takes this share of all transactions.
+    - `seasonality`: amplitude of the yearly cycle in daily volume
+      (0 = flat, 0.5 = peak days get 3x the quietest ones).
+    - `peak_day`: day of the year with the highest volume (default mid-December).
+    - `discount_rate`: share of transactions sold below list price.
+    """
+
+    def __init__(self, sku_zipf=1.1, hot_store_fraction=0.1, hot_store_share=0.5,
+                 seasonality=0.3, peak_day=350, discount_rate=0.1):
+        self.sku_zipf = sku_zipf
+        self.hot_store_fraction = hot_store_fraction
+        self.hot_store_share = hot_store_share
+        self.seasonality = seasonality
+        self.peak_day = peak_day
+        self.discount_rate = discount_rate
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def zipf_weights(n, s):
+    """Weights 1/k^s for ranks 1..n."""
+    return [1.0 / (k ** s) for k in range(1, n + 1)]
+
+
+def hot_store_weights(n, fraction, share):
+    """The first `fraction` of the stores get `share` of the weight, the rest split the remainder."""
+    hot = min(n, max(1, int(round(n * fraction))))
+    if hot == n:
+        return [1.0] * n
+    return [share / hot] * hot + [(1.0 - share) / (n - hot)] * (n - hot)
+
+
+def seasonal_day_counts(n, start, end, seasonality, peak_day):
+    """Split `n` transactions over the days in [start, end], following a yearly cosine.
+
+    Yields (date_string, count) in date order. Rounding is carried over from
+    day to day, so the counts always add up to exactly `n`.
+    """
+    days = (end - start).days + 1
+    weights = []
+    for offset in range(days):
+        day_of_year = (start + datetime.timedelta(days=offset)).timetuple().tm_yday
+        weights.append(1.0 + seasonality * math.cos(2 * math.pi * (day_of_year - peak_day) / 365.25))
+    total = sum(weights)
+    running = 0.0
+    assigned = 0
+    for offset, weight in enumerate(weights):
+        running += weight
+        target = int(round(n * running / total))
+        count = target - assigned
+        assigned = target
+        if count:
+            yield (start + datetime.timedelta(days=offset)).isoformat(), count
+
+
+def iter_products(n_products, seed=0):
+    """Yield sql_101_product rows: the lesson catalog first, then generated SKUs."""
+    rng = random.Random(f"{seed}-products")
+    for row in LESSON_PRODUCTS[:n_products]:
+        yield row
+    for sku_id in range(len(LESSON_PRODUCTS) + 1, n_products + 1):
+        category, sub_category, stem, base_price = rng.choice(PRODUCT_TEMPLATES)
+        brand = rng.choice(BRANDS)
+        list_price = round(base_price * rng.uniform(0.8, 1.4), 2)
+        yield (sku_id, f"{stem} N{sku_id}", category, sub_category, brand, list_price)
+
+
+def iter_stores(n_stores, seed=0):
+    """Yield sql_101_store rows: the lesson stores first, then generated ones."""
+    rng = random.Random(f"{seed}-stores")
+    for row in LESSON_STORES[:n_stores]:
+        yield row
+    for store_id in range(len(LESSON_STORES) + 1, n_stores + 1):
+        city = rng.choice(CITIES)
+        location = f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}"
+        manager = f"{rng.choice(MANAGERS)} {rng.choice(SURNAMES)}"
+        open_date = datetime.date(2010, 1, 1) + datetime.timedelta(days=rng.randint(0, 5000))
+        phone = f"{rng.randint(100, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+        yield (store_id, f"{city} Store {store_id}", location, manager, open_date.isoformat(), phone)
+
+
+def iter_transactions(n_transactions, list_prices, n_stores, seed=0, skew=None,
+                      start_date=datetime.date(2023, 1, 1), end_date=datetime.date(2024, 12, 31),
+                      first_id=1):
+    """Yield sql_101_transactions rows in transaction_id (and date) order.
+
+    `list_prices[i]` is the list price of sku_id i + 1; it drives
+    price_per_unit, which is the list price or, for a `discount_rate` share of
+    rows, a 10-30% discount on it.
+    """
+    skew = skew or Skew()
+    rng = random.Random(f"{seed}-transactions")
+    sku_ids = range(1, len(list_prices) + 1)
+    sku_cum = _cumulative(zipf_weights(len(list_prices), skew.sku_zipf))
+    store_ids = range(1, n_stores + 1)
+    store_cum = _cumulative(hot_store_weights(n_stores, skew.hot_store_fraction, skew.hot_store_share))
+    n_customers = max(20, n_transactions // 10)
+    transaction_id = first_id
+
+    for day, count in seasonal_day_counts(n_transactions, start_date, end_date,
+                                          skew.seasonality, skew.peak_day):
+        # Draw a whole day at once, rng.choices is much faster in bulk
+        skus = rng.choices(sku_ids, cum_weights=sku_cum, k=count)
+        stores = rng.choices(store_ids, cum_weights=store_cum, k=count)
+        for sku_id, store_id in zip(skus, stores):
+            price = list_prices[sku_id - 1]
+            if rng.random() < skew.discount_rate:
+                price = round(price * rng.uniform(0.7, 0.9), 2)
+            yield (transaction_id, day, 101 + rng.randrange(n_customers), rng.randint(1, 5),
+                   price, sku_id, store_id)
+            transaction_id += 1
+
+
+def insert_rows(conn, table, columns, rows, batch_size=50_000, rows_per_transaction=1_000_000):
+    """Stream `rows` into `table` with batched executemany, committing every `rows_per_transaction`.
+
+    Returns the number of rows written.
+    """
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    written = 0
+    in_transaction = 0
+    rows = iter(rows)
+    conn.execute("BEGIN")
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        conn.executemany(sql, batch)
+        written += len(batch)
+        in_transaction += len(batch)
+        if in_transaction >= rows_per_transaction:
+            conn.execute("COMMIT")
+            conn.execute("BEGIN")
+            in_transaction = 0
+    conn.execute("COMMIT")
+    return written
+
+
+def generate(db_path, scale=1, seed=0, skew=None,
+             start_date=datetime.date(2023, 1, 1), end_date=datetime.date(2024, 12, 31),
+             batch_size=50_000, rows_per_transaction=1_000_000, keys=False, indexes=False,
+             verbose=False):
+    """(Re)create the sql_101_* tables in `db_path` and fill them at the given scale.
+
+    `db_path` has no default: the tables it already holds are dropped, so
+    replacing the lesson database has to be asked for by name.
+
+    `keys=True` creates the tables with primary keys, `indexes=True` builds
+    the workload indexes from `sql101.indexes` once the data is in (much
+    faster than maintaining them row by row during the load).
+
+    Returns a dict with the row counts and the elapsed seconds.
+    """
+    n_transactions = transactions_for_scale(scale)
+    n_products = products_for_scale(scale)
+    n_stores = stores_for_scale(scale)
+
+    started = time.perf_counter()
+    # isolation_level=None: we manage BEGIN/COMMIT ourselves
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # Bulk-load settings: a crash mid-load just means re-running the generator
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_tables(conn, keys=keys)
+
+        products = list(iter_products(n_products, seed))
+        insert_rows(conn, "sql_101_product", COLUMNS["sql_101_product"], products, batch_size, rows_per_transaction)
+        insert_rows(conn, "sql_101_store", COLUMNS["sql_101_store"], iter_stores(n_stores, seed), batch_size, rows_per_transaction)
+
+        list_prices = [row[5] for row in products]
+        rows = iter_transactions(n_transactions, list_prices, n_stores, seed, skew, start_date, end_date)
+        if verbose:
+            rows = _progress(rows, n_transactions)
+        insert_rows(conn, "sql_101_transactions", COLUMNS["sql_101_transactions"], rows, batch_size, rows_per_transaction)
+        if indexes:
+            create_indexes(conn)
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+
+    return {
+        "transactions": n_transactions,
+        "products": n_products,
+        "stores": n_stores,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _progress(rows, total, every=1_000_000):
+    started = time.perf_counter()
+    for i, row in enumerate(rows, 1):
+        yield row
+        if i % every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"  {i:,}/{total:,} transactions ({i / elapsed:,.0f} rows/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a scaled sql_101_* dataset.")
+    parser.add_argument("--db", required=True,
+                        help="SQLite file to (re)create the tables in (its sql_101_* tables are replaced)")
+    parser.add_argument("--scale", type=float, default=1, help="1 = 1K transactions, 1000 = 1M, 100000 = 100M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sku-zipf", type=float, default=1.1, help="Zipf exponent for SKU popularity")
+    parser.add_argument("--hot-store-fraction", type=float, default=0.1)
+    parser.add_argument("--hot-store-share", type=float, default=0.5)
+    parser.add_argument("--seasonality", type=float, default=0.3)
+    parser.add_argument("--start-date", type=datetime.date.fromisoformat, default=datetime.date(2023, 1, 1))
+    parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=datetime.date(2024, 12, 31))
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--keys", action="store_true", help="create the tables with primary keys")
+    parser.add_argument("--indexes", action="store_true", help="build the workload indexes after the load")
+    args = parser.parse_args(argv)
+
+    skew = Skew(sku_zipf=args.sku_zipf, hot_store_fraction=args.hot_store_fraction,
+                hot_store_share=args.hot_store_share, seasonality=args.seasonality)
+    stats = generate(args.db, args.scale, args.seed, skew, args.start_date, args.end_date,
+                     batch_size=args.batch_size, keys=args.keys, indexes=args.indexes, verbose=True)
+    print(f"Wrote {stats['transactions']:,} transactions, {stats['products']:,} products and "
+          f"{stats['stores']:,} stores to {args.db} in {stats['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Incremental refresh of sql_101_transactions_ext.
+
+2_Join, cell 26 rebuilds sql_101_transactions_ext with a DROP + CREATE
+TABLE AS SELECT over the three-way join. That's fine for 20 rows, but on
+a real fact table it rewrites everything to pick up a handful of new
+transactions. `refresh` does the minimum instead:
+
+- New transactions: a high-water mark on transaction_id (stored in
+  `sql101_ext_state`) tells which fact rows were already joined, only the
+  rows above it are joined and appended.
+- Dimension changes: triggers on sql_101_product and sql_101_store log the
+  sku_id/store_id of every inserted, updated or deleted row in
+  `sql101_ext_changes`. On refresh, the ext rows for those keys are
+  deleted and re-derived, so a brand or list_price correction lands in
+  the ext table without a rebuild.
+- Late changes to fact rows below the high-water mark (updates, deletes,
+  back-filled inserts) are logged the same way by transaction_id.
+
+`rebuild` is the full DROP + CREATE fallback (used automatically the first
+time, or when the table was recreated outside this module, e.g. by
+re-running the lesson cell), and `check` compares the ext table with a
+fresh join. Rollups from `sql101.rollups` and the full-text index from
+`sql101.search` are rebuilt along with it.
+
+For the append to be a range scan rather than a table scan, the fact
+table wants its primary key (`sql101.indexes.add_keys`).
+
+Usage from the `sql/` folder:
+
+    python -m sql101.ext refresh --db my_database.db
+    python -m sql101.ext check --db my_database.db
+"""
+
+import argparse
+import sqlite3
+import time
+
+from . import DEFAULT_DB, rollups, search, totals
+from .indexes import table_exists
+from .schema import run_script
+
+EXT_TABLE = "sql_101_transactions_ext"
+
+# The join from 2_Join, cell 26
+EXT_SELECT = """SELECT
+  t.*,
+  t.amount * t.price_per_unit AS tot_spent,
+  p.brand, p.category, p.list_price, p.product_name,
+  s.store_location, s.store_name
+FROM sql_101_transactions t
+JOIN sql_101_product p ON t.sku_id = p.sku_id
+JOIN sql_101_store s ON t.store_id = s.store_id"""
+
+# Once the fact table has its own tot_spent column (sql101.totals), t.* returns it
+EXT_SELECT_WITH_TOT_SPENT = EXT_SELECT.replace("  t.amount * t.price_per_unit AS tot_spent,\n", "")
+
+# Indexes refresh needs to find the ext rows to replace. The first one also
+# marks the table as ours: if it's gone, the table was rebuilt elsewhere.
+EXT_REFRESH_INDEXES = [
+    ("sql101_ext_transaction_id", ["transaction_id"]),
+    ("sql101_ext_sku_id", ["sku_id"]),
+    ("sql101_ext_store_id", ["store_id"]),
+]
+
+SETUP = """
+CREATE TABLE IF NOT EXISTS sql101_ext_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    high_water INT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sql101_ext_changes (
+    kind TEXT NOT NULL,  -- 'sku', 'store' or 'transaction'
+    key INT
+);
+
+CREATE TRIGGER IF NOT EXISTS sql101_ext_product_ins AFTER INSERT ON sql_101_product
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('sku', NEW.sku_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_product_upd AFTER UPDATE ON sql_101_product
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('sku', OLD.sku_id), ('sku', NEW.sku_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_product_del AFTER DELETE ON sql_101_product
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('sku', OLD.sku_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sql101_ext_store_ins AFTER INSERT ON sql_101_store
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('store', NEW.store_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_store_upd AFTER UPDATE ON sql_101_store
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('store', OLD.store_id), ('store', NEW.store_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_store_del AFTER DELETE ON sql_101_store
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('store', OLD.store_id);
+END;
+
+-- Inserts above the high-water mark are picked up by the append, only
+-- back-filled ids need logging
+CREATE TRIGGER IF NOT EXISTS sql101_ext_transactions_ins AFTER INSERT ON sql_101_transactions
+WHEN NEW.transaction_id <= (SELECT high_water FROM sql101_ext_state)
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('transaction', NEW.transaction_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_transactions_upd AFTER UPDATE ON sql_101_transactions
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('transaction', OLD.transaction_id), ('transaction', NEW.transaction_id);
+END;
+CREATE TRIGGER IF NOT EXISTS sql101_ext_transactions_del AFTER DELETE ON sql_101_transactions
+BEGIN
+    INSERT INTO sql101_ext_changes VALUES ('transaction', OLD.transaction_id);
+END;
+"""
+
+TRIGGERS = [
+    "sql101_ext_product_ins", "sql101_ext_product_upd", "sql101_ext_product_del",
+    "sql101_ext_store_ins", "sql101_ext_store_upd", "sql101_ext_store_del",
+    "sql101_ext_transactions_ins", "sql101_ext_transactions_upd", "sql101_ext_transactions_del",
+]
+
+
+# How each kind of logged change maps to a column
+CHANGE_COLUMNS = [("sku", "sku_id"), ("store", "store_id"), ("transaction", "transaction_id")]
+
+
+def ext_select(conn):
+    """The join that builds the ext table, for this database's fact table."""
+    return EXT_SELECT_WITH_TOT_SPENT if totals.has_column(conn) else EXT_SELECT
+
+
+def _begin(conn):
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+
+
+def high_water(conn):
+    """The last transaction_id already joined into the ext table, or None."""
+    if not table_exists(conn, "sql101_ext_state"):
+        return None
+    row = conn.execute("SELECT high_water FROM sql101_ext_state WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def is_managed(conn):
+    """True if the ext table exists and was built by `rebuild` (not by re-running the lesson cell)."""
+    if not table_exists(conn, EXT_TABLE) or high_water(conn) is None:
+        return False
+    marker = EXT_REFRESH_INDEXES[0][0]
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                        (marker,)).fetchone() is not None
+
+
+def rebuild(conn):
+    """Full rebuild: DROP + CREATE AS SELECT, then reset the high-water mark and change log."""
+    with conn:
+        _begin(conn)
+        conn.execute(f"DROP TABLE IF EXISTS {EXT_TABLE}")
+        conn.execute(f"CREATE TABLE {EXT_TABLE} AS {ext_select(conn)}")
+        for name, columns in EXT_REFRESH_INDEXES:
+            conn.execute(f"CREATE INDEX {name} ON {EXT_TABLE} ({', '.join(columns)})")
+        run_script(conn, SETUP)
+        hw = conn.execute("SELECT COALESCE(MAX(transaction_id), 0) FROM sql_101_transactions").fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO sql101_ext_state (id, high_water) VALUES (1, ?)", (hw,))
+        conn.execute("DELETE FROM sql101_ext_changes")
+        rows = conn.execute(f"SELECT COUNT(*) FROM {EXT_TABLE}").fetchone()[0]
+    # Dropping the table dropped the rollup and full-text triggers too
+    if rollups.is_enabled(conn):
+        rollups.enable(conn)
+    if table_exists(conn, search.fts_table("ext")):
+        search.enable(conn, ["ext"])
+    return {"mode": "rebuild", "rows": rows, "high_water": hw}
+
+
+def refresh(conn, force_rebuild=False):
+    """Bring the ext table up to date, incrementally when possible.
+
+    Returns a dict describing what was done: the mode ("rebuild" or
+    "incremental"), the rows re-derived and appended, and the new
+    high-water mark.
+    """
+    if force_rebuild or not is_managed(conn):
+        return rebuild(conn)
+
+    select = ext_select(conn)
+    with conn:
+        _begin(conn)
+        hw = high_water(conn)
+        new_hw = conn.execute("SELECT COALESCE(MAX(transaction_id), 0) FROM sql_101_transactions").fetchone()[0]
+        new_hw = max(new_hw, hw)
+
+        # 1. Re-derive the rows touched by dimension or late fact changes.
+        # Collect their ids first, one indexed lookup per kind of change,
+        # from both sides: new matches in the fact table, stale ones in ext.
+        rederived = 0
+        if conn.execute("SELECT 1 FROM sql101_ext_changes LIMIT 1").fetchone():
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS sql101_ext_affected (transaction_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.sql101_ext_affected")
+            for source in ("sql_101_transactions", EXT_TABLE):
+                for kind, column in CHANGE_COLUMNS:
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO temp.sql101_ext_affected SELECT transaction_id FROM {source} "
+                        f"WHERE {column} IN (SELECT key FROM sql101_ext_changes WHERE kind = ?) "
+                        f"AND transaction_id <= ?",
+                        (kind, hw),
+                    )
+            conn.execute(f"DELETE FROM {EXT_TABLE} WHERE transaction_id IN "
+                         f"(SELECT transaction_id FROM temp.sql101_ext_affected)")
+            rederived = conn.execute(
+                f"INSERT INTO {EXT_TABLE} {select} WHERE t.transaction_id IN "
+                f"(SELECT transaction_id FROM temp.sql101_ext_affected)"
+            ).rowcount
+            conn.execute("DELETE FROM sql101_ext_changes")
+
+        # 2. Append everything above the high-water mark
+        appended = conn.execute(
+            f"INSERT INTO {EXT_TABLE} {select} WHERE t.transaction_id > ? AND t.transaction_id <= ?",
+            (hw, new_hw),
+        ).rowcount
+        conn.execute("UPDATE sql101_ext_state SET high_water = ? WHERE id = 1", (new_hw,))
+    return {"mode": "incremental", "rederived": rederived, "appended": appended, "high_water": new_hw}
+
+
+def check(conn):
+    """Compare the ext table with a fresh join.
+
+    Returns a dict with both row counts, the distinct rows missing from
+    the ext table and the extra ones it holds, plus `ok`. This reads both
+    sides in full, so it's meant for tests and nightly jobs rather than
+    every refresh.
+    """
+    select = ext_select(conn)
+    ext_rows = conn.execute(f"SELECT COUNT(*) FROM {EXT_TABLE}").fetchone()[0]
+    expected_rows = conn.execute(f"SELECT COUNT(*) FROM ({select})").fetchone()[0]
+    missing = conn.execute(f"SELECT COUNT(*) FROM ({select} EXCEPT SELECT * FROM {EXT_TABLE})").fetchone()[0]
+    extra = conn.execute(f"SELECT COUNT(*) FROM (SELECT * FROM {EXT_TABLE} EXCEPT {select})").fetchone()[0]
+    return {
+        "ext_rows": ext_rows,
+        "expected_rows": expected_rows,
+        "missing": missing,
+        "extra": extra,
+        "ok": ext_rows == expected_rows and missing == 0 and extra == 0,
+    }
+
+
+def disable(conn):
+    """Remove the change-logging triggers and bookkeeping tables (the ext table stays)."""
+    with conn:
+        for name in TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS sql101_ext_changes")
+        conn.execute("DROP TABLE IF EXISTS sql101_ext_state")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain sql_101_transactions_ext incrementally.")
+    parser.add_argument("command", choices=["refresh", "rebuild", "check", "disable"])
+    parser.add_argument("--db", default=DEFAULT_DB)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        started = time.perf_counter()
+        if args.command == "refresh":
+            result = refresh(conn)
+        elif args.command == "rebuild":
+            result = rebuild(conn)
+        elif args.command == "check":
+            result = check(conn)
+        else:
+            disable(conn)
+            result = {"disabled": True}
+        print(result, f"({time.perf_counter() - started:.3f}s)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Broadcast hash joins of the fact table with the small dimensions.
+
+Every 2_Join query joins the big sql_101_transactions table to the tiny
+sql_101_product and sql_101_store tables on integer ids. Here each
+dimension is loaded once into memory ("broadcast") and the fact table is
+streamed through it in chunks:
+
+- With unique, non-negative and fairly dense integer keys (sku_id and
+  store_id are 1..n) the dimension becomes a NumPy array from key to row
+  position, so a whole chunk of keys is looked up in one vectorized
+  indexing step.
+- Otherwise (sparse or text keys, duplicates) a dict from key to rows is
+  used, and a key with several dimension rows yields one output row per
+  match, like SQL.
+
+INNER joins drop fact rows without a match; LEFT joins keep them with
+NULLs in the dimension columns. A NULL key never matches. Output rows
+are the fact row followed by the chosen dimension columns, in fact-table
+order.
+
+    from sql101.hashjoin import Dimension, join_rows
+    product = Dimension.from_sqlite(conn, "sql_101_product", "sku_id", ["brand", "product_name"])
+    columns, rows = join_rows(conn, "SELECT * FROM sql_101_transactions", [("sku_id", product, "inner")])
+
+Needs NumPy (`pip install numpy`).
+"""
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError("sql101.hashjoin needs NumPy: pip install numpy") from exc
+
+JOIN_KINDS = ("inner", "left")
+
+# Dense lookup arrays are used while max(key) stays under this many slots per row
+DENSE_FACTOR = 4
+
+
+class Dimension:
+    """A small table held in memory, keyed by one column."""
+
+    def __init__(self, key, columns, rows, table=None):
+        """`rows` are (key, *columns) tuples; `table` is where they came from, if anywhere."""
+        self.table = table
+        self.key = key
+        self.columns = list(columns)
+        self.null_row = (None,) * len(self.columns)
+        self.rows = [tuple(row[1:]) for row in rows]
+        keys = [row[0] for row in rows]
+        self.index = {}
+        for position, key_value in enumerate(keys):
+            if key_value is not None:
+                self.index.setdefault(key_value, []).append(position)
+        self.unique = all(len(positions) == 1 for positions in self.index.values())
+        self.dense = None
+        if (self.unique and self.index and all(type(k) is int and k >= 0 for k in self.index)
+                and max(self.index) < DENSE_FACTOR * len(self.index) + 1024):
+            self.dense = np.full(max(self.index) + 1, -1, dtype=np.int64)
+            for key_value, (position,) in self.index.items():
+                self.dense[key_value] = position
+
+    @classmethod
+    def from_sqlite(cls, conn, table, key, columns=None):
+        """Load `columns` (default: all but the key) of `table`."""
+        if columns is None:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != key]
+        rows = conn.execute(f"SELECT {', '.join([key] + list(columns))} FROM {table}").fetchall()
+        return cls(key, columns, rows, table)
+
+    def positions(self, keys):
+        """Row position of each key (-1 if unmatched), or None if a key has several rows."""
+        if self.dense is not None and all(type(k) is int for k in keys):
+            keys = np.fromiter(keys, dtype=np.int64, count=len(keys))
+            positions = np.full(len(keys), -1, dtype=np.int64)
+            in_range = (keys >= 0) & (keys < len(self.dense))
+            positions[in_range] = self.dense[keys[in_range]]
+            return positions
+        if not self.unique:
+            return None
+        index = self.index
+        return np.fromiter((index[k][0] if k in index else -1 for k in keys), dtype=np.int64, count=len(keys))
+
+
+def _join_chunk(chunk, key_index, dimension, how):
+    """Join one chunk of rows (tuples) with a dimension."""
+    keys = [row[key_index] for row in chunk]
+    positions = dimension.positions(keys)
+    dim_rows = dimension.rows
+    if positions is None:
+        # Duplicate dimension keys: one output row per match
+        out = []
+        for row, key in zip(chunk, keys):
+            matches = dimension.index.get(key)
+            if matches:
+                out.extend(row + dim_rows[p] for p in matches)
+            elif how == "left":
+                out.append(row + dimension.null_row)
+        return out
+    matched = positions >= 0
+    if how == "inner" and not matched.all():
+        keep = np.flatnonzero(matched)
+        chunk = [chunk[i] for i in keep.tolist()]
+        positions = positions[keep]
+    # Unmatched rows (LEFT) take the NULL row kept at the end of the lookup list
+    lookup = dim_rows + [dimension.null_row]
+    return [row + lookup[p] for row, p in zip(chunk, positions.tolist())]
+
+
+def join_chunks(conn, fact_sql, joins, params=(), chunk_size=100_000):
+    """Stream `fact_sql` through the `joins`, yielding lists of output rows.
+
+    `joins` is a list of (fact key column, Dimension, "inner" or "left"),
+    applied in order. The first item yielded is the list of output column
+    names; chunks follow.
+    """
+    cursor = conn.execute(fact_sql, params)
+    columns = [description[0] for description in cursor.description]
+    plan = []
+    for fact_key, dimension, how in joins:
+        if how not in JOIN_KINDS:
+            raise ValueError(f"join kind must be one of {', '.join(JOIN_KINDS)}")
+        if fact_key not in columns:
+            raise ValueError(f"{fact_key} is not a column of the fact query")
+        plan.append((columns.index(fact_key), dimension, how))
+        columns = columns + dimension.columns
+    yield columns
+    while chunk := cursor.fetchmany(chunk_size):
+        for key_index, dimension, how in plan:
+            chunk = _join_chunk(chunk, key_index, dimension, how)
+        yield chunk
+
+
+def join_rows(conn, fact_sql, joins, params=(), chunk_size=100_000):
+    """(column names, every output row) of `join_chunks`."""
+    chunks = join_chunks(conn, fact_sql, joins, params, chunk_size)
+    columns = next(chunks)
+    return columns, [row for chunk in chunks for row in chunk]
+
+
+def create_table_as(conn, table, fact_sql, joins, params=(), chunk_size=100_000):
+    """CREATE TABLE `table` AS the join, streaming it in chunks. Returns the row count.
+
+    The new table gets the same column names and types SQLite's own
+    CREATE TABLE ... AS SELECT of the equivalent join would give it. It is
+    slower than that CTAS (every row goes out to Python and back), so it
+    only pays off when the rows need Python-side work on the way.
+    """
+    if any(dimension.table is None for _, dimension, _ in joins):
+        raise ValueError("create_table_as needs dimensions loaded with Dimension.from_sqlite")
+    chunks = join_chunks(conn, fact_sql, joins, params, chunk_size)
+    next(chunks)
+    # An empty CTAS over the same sources gives SQLite's own column names and types
+    select = ["f.*"] + [f"d{i}.{column}" for i, (_, dimension, _) in enumerate(joins)
+                        for column in dimension.columns]
+    sources = [f"({fact_sql}) f"] + [f"{dimension.table} d{i}" for i, (_, dimension, _) in enumerate(joins)]
+    rows = 0
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(f"CREATE TABLE {table} AS SELECT {', '.join(select)} FROM {', '.join(sources)} LIMIT 0",
+                     params)
+        width = len(conn.execute(f"SELECT * FROM {table} LIMIT 0").description)
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * width)})"
+        for chunk in chunks:
+            conn.executemany(insert, chunk)
+            rows += len(chunk)
+    return rows
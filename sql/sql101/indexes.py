@@ -0,0 +1,204 @@
+"""Primary keys and workload-driven secondary indexes for the lesson schema.
+
+The CREATE TABLE statements in 0_Tables declare no keys, so every lesson
+query is a full table scan. This module adds:
+
+- INTEGER PRIMARY KEY on store_id, sku_id and transaction_id. The id
+  becomes the rowid, so joins on it are a single B-tree search, and a
+  duplicate id (like the second sku_id 6 row in 2_Join, cell 17) is
+  rejected with an IntegrityError instead of silently fanning out joins.
+- Secondary indexes picked from the queries the lessons actually run
+  (see `WORKLOAD_INDEXES`).
+
+Existing tables can't get a primary key with ALTER TABLE, so `add_keys`
+rebuilds them (copy, drop, rename) inside one transaction with
+`rebuild_table`. Their indexes and triggers (e.g. those of sql101.search,
+sql101.cdc or sql101.sketches) are recreated on the new table, and views
+that read the table keep working.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.indexes --db my_database.db          # keys + indexes
+    python -m sql101.indexes --db my_database.db --drop   # back to no indexes
+"""
+
+import argparse
+import sqlite3
+
+from . import DEFAULT_DB
+from .schema import COLUMNS, KEY_COLUMNS, KEYED_TABLES
+
+# (index name, table, columns, unique), each one backing a lesson query
+WORKLOAD_INDEXES = [
+    # Joins and filters on sku_id (2_Join cells 18-20), narrowed by store and
+    # date: the composite covers WHERE sku_id = ?, sku_id + store_id and
+    # SELECT DISTINCT sku_id (1_Select cell 28) without touching the table
+    ("idx_sql_101_transactions_sku_store_date", "sql_101_transactions",
+     ["sku_id", "store_id", "transaction_date"], False),
+    # Month-aligned date ranges (1_Select cells 8 and 21)
+    ("idx_sql_101_transactions_date", "sql_101_transactions",
+     ["transaction_date"], False),
+    # Covering index for SELECT DISTINCT customer_id, sku_id ORDER BY
+    # customer_id, sku_id (1_Select cell 29) and WHERE customer_id = 101
+    # (1_Select cell 23): read in index order, no temp B-tree
+    ("idx_sql_101_transactions_customer_sku", "sql_101_transactions",
+     ["customer_id", "sku_id"], False),
+    # Covering index for SELECT DISTINCT customer_id WHERE sku_id = 1
+    # (1_Select cell 31)
+    ("idx_sql_101_transactions_sku_customer", "sql_101_transactions",
+     ["sku_id", "customer_id"], False),
+    # WHERE price_per_unit > 2 AND store_id = 1 (1_Select cell 13)
+    ("idx_sql_101_transactions_store_price", "sql_101_transactions",
+     ["store_id", "price_per_unit"], False),
+]
+
+# Indexes on the joined table built by 2_Join, cell 26, used by 3_Group
+EXT_INDEXES = [
+    # WHERE transaction_date > '2024-06-01' (3_Group cells 5-13, 31)
+    ("idx_sql_101_transactions_ext_date", "sql_101_transactions_ext",
+     ["transaction_date"], False),
+    # WHERE product_name = 'Spaghetti N5' (3_Group cells 17-18)
+    ("idx_sql_101_transactions_ext_product", "sql_101_transactions_ext",
+     ["product_name"], False),
+]
+
+
+def table_exists(conn, table):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+
+def has_primary_key(conn, table):
+    """True if `table` declares a primary key on any column."""
+    return any(row[5] for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def duplicate_keys(conn, table, column, limit=5):
+    """Return up to `limit` (key, count) pairs for ids that appear more than once."""
+    return conn.execute(
+        f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column} HAVING COUNT(*) > 1 LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def null_keys(conn, table, column):
+    """Number of rows whose id is NULL (an INTEGER PRIMARY KEY would quietly number them)."""
+    return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL").fetchone()[0]
+
+
+def rebuild_table(conn, table, create_sql, columns, order_by=None):
+    """Replace `table` with one created by `create_sql`, copying `columns` across.
+
+    `create_sql` is a CREATE TABLE statement for `table` itself. DROP
+    TABLE takes the table's indexes and triggers with it, so they are
+    recreated from their SQL after the rename. The rename runs with
+    legacy_alter_table, otherwise SQLite re-checks every view and trigger
+    that mentions the table and fails on the one just dropped. Call it
+    inside a transaction, so a failure leaves the old table in place.
+    """
+    staging = f"{table}__rebuild"
+    definition = create_sql.replace(f"CREATE TABLE {table}", f"CREATE TABLE {staging}", 1)
+    if definition == create_sql:
+        raise ValueError(f"expected a CREATE TABLE {table} statement")
+    columns = ", ".join(columns)
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL ORDER BY type", (table,))]
+    conn.execute(definition)
+    conn.execute(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table}"
+                 + (f" ORDER BY {order_by}" if order_by else ""))
+    conn.execute(f"DROP TABLE {table}")
+    legacy = conn.execute("PRAGMA legacy_alter_table").fetchone()[0]
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    finally:
+        conn.execute(f"PRAGMA legacy_alter_table = {legacy}")
+    for sql in dependents:
+        conn.execute(sql)
+
+
+def add_keys(conn, tables=None):
+    """Rebuild the sql_101_* tables with INTEGER PRIMARY KEY ids.
+
+    Tables that already have a key are left alone. If a table holds
+    duplicate or NULL ids, nothing is changed and an IntegrityError
+    names them. Indexes, triggers and views on the tables are kept (see
+    `rebuild_table`). Returns the list of rebuilt tables.
+    """
+    tables = tables or list(KEYED_TABLES)
+    rebuilt = []
+    for table in tables:
+        if not table_exists(conn, table) or has_primary_key(conn, table):
+            continue
+        dupes = duplicate_keys(conn, table, KEY_COLUMNS[table])
+        if dupes:
+            raise sqlite3.IntegrityError(
+                f"{table} has duplicate {KEY_COLUMNS[table]} values (id, count): {dupes}")
+        nulls = null_keys(conn, table, KEY_COLUMNS[table])
+        if nulls:
+            raise sqlite3.IntegrityError(f"{table} has {nulls:,} row(s) with a NULL {KEY_COLUMNS[table]}")
+        rebuilt.append(table)
+
+    if not rebuilt:
+        return rebuilt
+    with conn:
+        # Explicit BEGIN so the CREATE/DROP/RENAME steps are atomic too
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for table in rebuilt:
+            # ORDER BY the key so the new B-tree is built with sequential appends
+            rebuild_table(conn, table, KEYED_TABLES[table], COLUMNS[table], order_by=KEY_COLUMNS[table])
+    return rebuilt
+
+
+def create_indexes(conn, include_ext=True, analyze=True):
+    """Create the workload indexes (skipping tables that don't exist) and refresh planner stats."""
+    indexes = WORKLOAD_INDEXES + (EXT_INDEXES if include_ext else [])
+    created = []
+    with conn:
+        for name, table, columns, unique in indexes:
+            if not table_exists(conn, table):
+                continue
+            conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+                         f"ON {table} ({', '.join(columns)})")
+            created.append(name)
+    if analyze:
+        # Lets the planner choose between the overlapping sku_id indexes
+        conn.execute("ANALYZE")
+    return created
+
+
+def drop_indexes(conn):
+    """Drop every index created by `create_indexes`."""
+    with conn:
+        for name, _table, _columns, _unique in WORKLOAD_INDEXES + EXT_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def apply(conn):
+    """Add primary keys and workload indexes in one go."""
+    return add_keys(conn), create_indexes(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add keys and indexes to the sql_101_* tables.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--drop", action="store_true", help="drop the secondary indexes instead")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.drop:
+            drop_indexes(conn)
+            print(f"Dropped the sql101 indexes from {args.db}")
+        else:
+            rebuilt, created = apply(conn)
+            print(f"Primary keys added to: {', '.join(rebuilt) or 'nothing (already keyed)'}")
+            print(f"Indexes: {', '.join(created)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
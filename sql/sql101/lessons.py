@@ -0,0 +1,49 @@
+"""The %%sql cells of the lessons, read from the jupytext exports in `sql/py/`.
+
+Each lesson cell is exported as
+
+    # %% [cell 26]
+    get_ipython().run_cell_magic('sql', '', \"\"\"SELECT ... \"\"\")
+
+`sql_cells` pulls those bodies out (with the Python parser, so quoting
+and escapes are handled) so the sql101 tools can replay, time or profile
+the lessons outside a notebook.
+"""
+
+import ast
+import glob
+import os
+import re
+
+PY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py")
+
+# The lessons with queries worth timing (0_Tables only creates and fills the tables)
+QUERY_LESSONS = ["1_Select", "2_Join", "3_Group"]
+
+_CELL_MARKER = re.compile(r"^# %% \[cell (\d+)\]", re.MULTILINE)
+
+
+def lesson_path(name):
+    """'1_Select' -> the path of sql/py/1_Select.py."""
+    return os.path.join(PY_DIR, f"{name}.py")
+
+
+def lesson_names():
+    """Every exported SQL lesson, in order."""
+    return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(PY_DIR, "*.py")))
+
+
+def sql_cells(path):
+    """[(cell number, SQL text)] for every %%sql cell magic in a jupytext export."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    markers = [(source.count("\n", 0, m.start()) + 1, int(m.group(1))) for m in _CELL_MARKER.finditer(source)]
+    cells = []
+    for node in ast.walk(ast.parse(source)):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr == "run_cell_magic" and len(node.args) == 3
+                and all(isinstance(arg, ast.Constant) for arg in node.args)
+                and node.args[0].value == "sql" and not node.args[1].value.strip()):
+            cell = max((number for line, number in markers if line <= node.lineno), default=None)
+            cells.append((node.lineno, cell, node.args[2].value))
+    return [(cell, sql) for _, cell, sql in sorted(cells)]
@@ -0,0 +1,295 @@
+"""Streaming CSV/Parquet loader for the sql_101_* tables.
+
+0_Tables fills the tables with literal INSERT ... VALUES cells. To load
+real files instead:
+
+    python -m sql101.loader sql_101_transactions transactions.csv --db my_database.db
+
+The file is read in chunks of `chunk_size` rows, so memory depends on the
+chunk size, not on the file size. Each chunk:
+
+1. goes into a temporary staging table with the target's column types,
+   letting SQLite convert the text ('3' -> 3, '1.5' -> 1.5),
+2. is validated in SQL against the declared types: INT columns must hold
+   integers, DECIMAL/REAL ones numbers, DATE ones valid 'YYYY-MM-DD'
+   dates; empty fields become NULL,
+3. is copied into the table and committed: one transaction per chunk.
+
+Bad rows (wrong types, CSV lines with the wrong number of fields, or
+rows the table's constraints refuse: a repeated key, a NULL in a NOT
+NULL column) raise a `LoadError` naming the first offending lines, or
+the chunk for constraint violations (the chunk is rolled back, earlier
+chunks stay), or are skipped and counted with `errors="skip"`. Since
+chunks are committed as they go, the connection must not be in a
+transaction when the load starts. During the load the table's indexes
+are dropped (and rebuilt at the end, also after an error; UNIQUE ones
+are kept with `errors="skip"`, so that repeated keys are skipped) and
+the connection runs with
+synchronous=OFF and an in-memory rollback journal (WAL databases keep
+WAL); the previous settings are restored afterwards.
+
+CSV files need a header row with the table's column names (any order,
+missing columns load as NULL). Parquet files need `pyarrow`.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import time
+
+from . import DEFAULT_DB
+
+STAGE = "temp.sql101_load_stage"
+
+
+class LoadError(ValueError):
+    """Rows that don't fit the table (field count, declared types, UNIQUE indexes)."""
+
+    def __init__(self, message, loaded_rows=0):
+        super().__init__(message)
+        self.loaded_rows = loaded_rows
+
+
+def declared_types(conn, table):
+    """[(column, declared type)] of `table`, in order."""
+    columns = [(row[1], row[2].upper()) for row in conn.execute(f"PRAGMA table_info({table})")]
+    if not columns:
+        raise ValueError(f"no such table: {table}")
+    return columns
+
+
+def type_check(value, declared):
+    """SQL that is true when `value` fits the `declared` column type, or None if anything goes."""
+    if "INT" in declared:
+        return f"typeof({value}) IN ('integer', 'null')"
+    if "DATE" in declared or "TIME" in declared:
+        # date() with a modifier normalizes what it understands ('2020-02-30' -> '2020-03-01'):
+        # only canonical, real dates survive unchanged
+        return f"({value} IS NULL OR date({value}, '+0 days') IS {value})"
+    if any(word in declared for word in ("REAL", "FLOA", "DOUB", "DEC", "NUM")):
+        return f"typeof({value}) IN ('integer', 'real', 'null')"
+    return None
+
+
+def _invalid_condition(types):
+    checks = [check for column, declared in types if (check := type_check(column, declared))]
+    return " OR ".join(f"NOT {check}" for check in checks) if checks else None
+
+
+def _indexes(conn, table, unique=True):
+    """[(name, sql)] of the indexes created on `table`, without the UNIQUE ones if not `unique`."""
+    keep = {row[1] for row in conn.execute(f"PRAGMA index_list({table})") if unique or not row[2]}
+    return [tuple(row) for row in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))
+        if row[0] in keep]
+
+
+def _set_pragmas(conn):
+    """Bulk-load settings; returns what to restore."""
+    previous = {
+        "synchronous": conn.execute("PRAGMA synchronous").fetchone()[0],
+        "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0],
+        "cache_size": conn.execute("PRAGMA cache_size").fetchone()[0],
+    }
+    conn.execute("PRAGMA synchronous = OFF")
+    if previous["journal_mode"].lower() != "wal":
+        conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA cache_size = -200000")
+    return previous
+
+
+def _restore_pragmas(conn, previous):
+    conn.execute(f"PRAGMA journal_mode = {previous['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {previous['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {previous['cache_size']}")
+
+
+def _rebuild_indexes(conn, table, indexes):
+    """Recreate the dropped indexes in one transaction, or none of them.
+
+    A UNIQUE index fails when the loaded rows repeat a key: the error
+    names it, and the table is left without its indexes.
+    """
+    if not indexes:
+        return
+    conn.execute("BEGIN")
+    for name, sql in indexes:
+        try:
+            conn.execute(sql)
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK")
+            raise LoadError(f"could not rebuild index {name} on {table} after the load: {e}; "
+                            f"the rows stay loaded, the table's indexes are dropped") from e
+    conn.execute("COMMIT")
+
+
+def load_chunks(conn, table, columns, chunks, errors="raise", rebuild_indexes=True, tune=True):
+    """Load an iterable of row chunks (lists of tuples in `columns` order) into `table`.
+
+    The common part of `load_csv` and `load_parquet`. Returns a dict with
+    the rows loaded and skipped, the chunk count and the timings. Raises
+    sqlite3.OperationalError if `conn` has an open transaction (each chunk
+    is committed, which would commit the caller's changes with it).
+    """
+    if errors not in ("raise", "skip"):
+        raise ValueError("errors must be 'raise' or 'skip'")
+    types = dict(declared_types(conn, table))
+    unknown = [column for column in columns if column not in types]
+    if unknown:
+        raise ValueError(f"{table} has no column(s) {', '.join(unknown)}")
+    stage_types = [(column, types[column]) for column in columns]
+    invalid = _invalid_condition(stage_types)
+    # Empty strings (CSV's missing values) become NULL on the way in
+    placeholders = ", ".join(["NULLIF(?, '')"] * len(columns))
+    insert_stage = f"INSERT INTO {STAGE} VALUES ({placeholders})"
+    # Skipping rows the constraints refuse: OR IGNORE leaves them out, the rowcount tells how many
+    conflict = " OR IGNORE" if errors == "skip" else ""
+    copy = f"INSERT{conflict} INTO {table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {STAGE}"
+
+    if conn.in_transaction:
+        raise sqlite3.OperationalError("the loader commits chunk by chunk: commit or roll back the open "
+                                       "transaction before loading")
+
+    started = time.perf_counter()
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    previous = _set_pragmas(conn) if tune else None
+    indexes = _indexes(conn, table, unique=errors == "raise") if rebuild_indexes else []
+    stats = {"rows": 0, "skipped": 0, "chunks": 0}
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {STAGE}")
+        conn.execute(f"CREATE TABLE {STAGE} ({', '.join(f'{c} {t}' for c, t in stage_types)})")
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        line = 1
+        for chunk in chunks:
+            # Positions (in the chunk) of the rows with the right number of fields
+            kept = [i for i, row in enumerate(chunk) if len(row) == len(columns)]
+            if len(kept) < len(chunk):
+                short = [i for i, row in enumerate(chunk) if len(row) != len(columns)]
+                if errors == "raise":
+                    lines = ", ".join(str(line + i + 1) for i in short[:5])
+                    raise LoadError(f"rows without {len(columns)} fields at line(s) {lines}", stats["rows"])
+                stats["skipped"] += len(short)
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(insert_stage, (chunk[i] for i in kept))
+                # Staged rowids run 1..n, so rowid maps back to the file's line
+                if invalid:
+                    bad = conn.execute(f"SELECT rowid FROM {STAGE} WHERE {invalid} LIMIT 5").fetchall()
+                    if bad and errors == "raise":
+                        lines = ", ".join(str(line + kept[rowid - 1] + 1) for (rowid,) in bad)
+                        raise LoadError(f"rows not matching the types of {table} at line(s) {lines}",
+                                        stats["rows"])
+                    if bad:
+                        stats["skipped"] += conn.execute(f"DELETE FROM {STAGE} WHERE {invalid}").rowcount
+                if conflict:
+                    stats["skipped"] += conn.execute(f"SELECT COUNT(*) FROM {STAGE}").fetchone()[0]
+                try:
+                    copied = conn.execute(copy).rowcount
+                except sqlite3.IntegrityError as e:
+                    lines = f"{line + 1}-{line + len(chunk)}" if len(chunk) > 1 else str(line + 1)
+                    raise LoadError(f"rows breaking a constraint of {table} ({e}) in line(s) {lines}",
+                                    stats["rows"]) from e
+                stats["rows"] += copied
+                if conflict:
+                    stats["skipped"] -= copied
+                conn.execute(f"DELETE FROM {STAGE}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            line += len(chunk)
+            stats["chunks"] += 1
+        stats["load_seconds"] = time.perf_counter() - started
+    finally:
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {STAGE}")
+            index_started = time.perf_counter()
+            _rebuild_indexes(conn, table, indexes)
+            stats["index_seconds"] = time.perf_counter() - index_started
+        finally:
+            if previous:
+                _restore_pragmas(conn, previous)
+            conn.isolation_level = isolation_level
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def _csv_chunks(reader, chunk_size):
+    while True:
+        chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_csv(conn, table, path, chunk_size=100_000, delimiter=",", **options):
+    """Stream a CSV file with a header row into `table` (see `load_chunks` for the options)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        columns = [name.strip() for name in next(reader)]
+        return load_chunks(conn, table, columns, _csv_chunks(reader, chunk_size), **options)
+
+
+def _parquet_chunks(parquet_file, columns, chunk_size):
+    import pyarrow as pa
+
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        arrays = []
+        for array in batch.columns:
+            # Dates as 'YYYY-MM-DD' text and decimals as floats, like the lesson tables
+            if pa.types.is_date(array.type) or pa.types.is_timestamp(array.type):
+                array = array.cast(pa.string())
+            elif pa.types.is_decimal(array.type):
+                array = array.cast(pa.float64())
+            arrays.append(array.to_pylist())
+        yield list(zip(*arrays))
+
+
+def load_parquet(conn, table, path, chunk_size=100_000, **options):
+    """Stream a Parquet file into `table` (needs pyarrow; see `load_chunks` for the options)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet loading needs pyarrow: pip install pyarrow") from e
+    parquet_file = pq.ParquetFile(path)
+    columns = [name for name in parquet_file.schema_arrow.names if name in dict(declared_types(conn, table))]
+    return load_chunks(conn, table, columns, _parquet_chunks(parquet_file, columns, chunk_size), **options)
+
+
+def load(conn, table, path, **options):
+    """`load_parquet` for .parquet/.pq files, `load_csv` for anything else."""
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        return load_parquet(conn, table, path, **options)
+    return load_csv(conn, table, path, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream CSV/Parquet files into the sql_101_* tables.")
+    parser.add_argument("table")
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--skip-errors", action="store_true",
+                        help="skip rows that don't fit the column types or constraints")
+    parser.add_argument("--keep-indexes", action="store_true", help="maintain indexes during the load")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        stats = load(conn, args.table, args.path, chunk_size=args.chunk_size,
+                     errors="skip" if args.skip_errors else "raise", rebuild_indexes=not args.keep_indexes)
+    except LoadError as e:
+        raise SystemExit(f"{e} ({e.loaded_rows:,} rows loaded before it)")
+    finally:
+        conn.close()
+    print(f"Loaded {stats['rows']:,} rows into {args.table} ({stats['skipped']:,} skipped) in "
+          f"{stats['seconds']:.2f}s: {stats['rows_per_second']:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
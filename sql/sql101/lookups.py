@@ -0,0 +1,116 @@
+"""Parameterized point lookups that reuse compiled statements.
+
+The lessons paste keys into the SQL text: `WHERE sku_id = 6` (2_Join
+cells 18-19), `WHERE customer_id = 101` (1_Select cell 23),
+`WHERE product_name = 'Spaghetti N5'` (3_Group cell 17). Every key gives
+a new statement text, and SQLite parses and plans each one from scratch.
+
+Python's sqlite3 keeps an LRU cache of compiled statements per
+connection, keyed by the SQL text (`cached_statements`, 128 by default).
+It only helps when the text repeats, so this module keeps it repeating:
+
+- `query` runs SQL with `?` parameters; `parameterize` turns pasted
+  literals after a comparison (`= 6`, `> 2.5`, `LIKE 'S%'`) into
+  parameters, so every variant of a lesson query shares one statement.
+- `lookup` fetches the rows of one key, `lookup_many` thousands of keys
+  in batches of `WHERE column IN (?, ?, ...)`. Batches are always
+  `batch_size` keys long (the last one is padded by repeating a key), so
+  they all share one compiled statement too.
+- `connect` opens a connection with a bigger statement cache.
+
+    conn = lookups.connect("my_database.db")
+    lookups.lookup(conn, "sql_101_transactions", "sku_id", 6)
+    lookups.lookup_many(conn, "sql_101_transactions", "customer_id", range(100, 5000))
+"""
+
+import re
+import sqlite3
+
+from . import DEFAULT_DB
+
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_BATCH_SIZE = 500
+
+# Scanned left to right: quoted identifiers and comments are skipped whole,
+# a literal right after a comparison becomes a parameter, other strings stay
+# and an existing placeholder means the statement is parameterized already
+_COMPARED_LITERAL = re.compile(r"""
+    (?P<skip>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<placeholder>\?|[:@$][A-Za-z_])
+  | (?P<op>(?:<>|!=|<=|>=|=|<|>|\bLIKE\b|\bGLOB\b)\s*)
+    (?P<literal>'(?:[^']|'')*'|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\b)
+  | (?P<string>'(?:[^']|'')*')
+""", re.VERBOSE | re.IGNORECASE | re.DOTALL)
+
+
+def connect(db_path=DEFAULT_DB, cache_size=DEFAULT_CACHE_SIZE, **kwargs):
+    """sqlite3.connect with room for `cache_size` compiled statements."""
+    return sqlite3.connect(db_path, cached_statements=cache_size, **kwargs)
+
+
+def _literal_value(literal):
+    if literal.startswith("'"):
+        return literal[1:-1].replace("''", "'")
+    if re.fullmatch(r"[-+]?\d+", literal):
+        # Exact, like SQLite's integer literals; past 64 bits SQLite reads them as REAL too
+        number = int(literal)
+        return number if -2**63 <= number < 2**63 else float(literal)
+    return float(literal)
+
+
+def parameterize(sql):
+    """(SQL with ? placeholders, params) for the compared literals in `sql`.
+
+    Only literals right after =, <>, !=, <, <=, >, >=, LIKE or GLOB are
+    replaced; `LIMIT 10`, `ROUND(x, 2)` or `GROUP BY 1` stay in the text.
+    Statements that already use parameters are returned unchanged.
+    """
+    params = []
+
+    def replace(match):
+        if match.group("placeholder"):
+            # Marks the statement as already parameterized, see below
+            params.append(None)
+        elif match.group("literal"):
+            params.append(_literal_value(match.group("literal")))
+            return match.group("op") + "?"
+        return match.group()
+
+    parameterized = _COMPARED_LITERAL.sub(replace, sql)
+    if None in params:
+        return sql, ()
+    return parameterized, tuple(params)
+
+
+def query(conn, sql, params=None):
+    """Run `sql` and return its rows; without `params`, pasted literals are parameterized first."""
+    if params is None:
+        sql, params = parameterize(sql)
+    return conn.execute(sql, params).fetchall()
+
+
+def lookup(conn, table, column, key, columns="*"):
+    """Rows of `table` where `column` = `key`."""
+    return conn.execute(f"SELECT {columns} FROM {table} WHERE {column} = ?", (key,)).fetchall()
+
+
+def lookup_many(conn, table, column, keys, columns="*", batch_size=DEFAULT_BATCH_SIZE):
+    """{key: rows} for every key, fetched `batch_size` keys per statement.
+
+    Keys without rows map to an empty list. NULL keys never match, as in SQL.
+    """
+    keys = list(dict.fromkeys(keys))
+    results = {key: [] for key in keys}
+    wanted = [key for key in keys if key is not None]
+    if not wanted:
+        return results
+    size = min(batch_size, len(wanted))
+    sql = f"SELECT {column}, {columns} FROM {table} WHERE {column} IN ({', '.join('?' * size)})"
+    for start in range(0, len(wanted), size):
+        batch = wanted[start:start + size]
+        # Pad with a repeated key: same statement text, no extra rows
+        batch += [batch[-1]] * (size - len(batch))
+        for row in conn.execute(sql, batch):
+            if row[0] in results:
+                results[row[0]].append(row[1:])
+    return results
@@ -0,0 +1,187 @@
+"""An in-memory working copy of my_database.db, with snapshots.
+
+The lessons DROP, CREATE, INSERT and DELETE freely (hkt_sql_customers in
+1_Select, the duplicate sku 6 row in 2_Join, sql_101_transactions_ext),
+every write goes to disk, and undoing them means re-running 0_Tables.
+`MemoryDB` loads the file into memory once with SQLite's backup API and
+works there:
+
+- `conn` is a connection to the in-memory copy. It is a named shared
+  in-memory database, so other connections of the process (`connect()`,
+  or the %sql magic on `magic_url`) see the same data.
+- `checkpoint()` writes the whole copy back to the file (backup API
+  again); `start(interval)` does it every `interval` seconds from a
+  background thread, skipping moments when a write transaction is open.
+  Checkpoints, snapshots and restores go through a connection of their
+  own, never through `conn`, so they can't touch the user's transactions.
+- `snapshot(name)` keeps an in-memory copy of the current state;
+  `restore(name)` puts it back. A "pristine" snapshot of the file as it
+  was loaded is taken at startup, so resetting a lesson is
+  `restore()`, a memory-to-memory copy that takes milliseconds.
+
+Nothing reaches the file until a checkpoint: a crash loses the work since
+the last one.
+
+In a notebook opened from the `sql/` folder:
+
+    from sql101.memdb import MemoryDB
+    from sql101.bootstrap import setup
+    work = MemoryDB("my_database.db")
+    setup(work.magic_url)              # %%sql cells now run in memory
+    ...
+    work.restore()                     # back to the file as loaded
+    work.checkpoint()                  # or keep the changes
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+
+from . import DEFAULT_DB
+
+_names = itertools.count(1)
+
+
+class _Busy(Exception):
+    """Raised from a backup's progress callback to give up instead of waiting."""
+
+
+def _give_up_if_busy(status, remaining, total):
+    # sqlite3's backup() sleeps and retries SQLITE_BUSY / SQLITE_LOCKED forever
+    if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+        raise _Busy()
+
+
+def _copy(source, target):
+    """Backup `source` into `target` in one step, or raise _Busy if a transaction is in the way.
+
+    A one-step backup holds the shared cache's mutex from the first page
+    to the last, and refuses to start while any connection is writing:
+    no other connection can change the database halfway through the copy.
+    """
+    try:
+        source.backup(target, progress=_give_up_if_busy)
+    except sqlite3.OperationalError as e:
+        # A locked destination table is reported as an error rather than a status
+        raise _Busy() from e
+
+
+class MemoryDB:
+    """`db_path` loaded into a shared in-memory database."""
+
+    def __init__(self, db_path=DEFAULT_DB, name=None):
+        self.db_path = db_path
+        self.name = name or f"sql101_memdb_{next(_names)}"
+        self.uri = f"file:{self.name}?mode=memory&cache=shared"
+        # ipython-sql passes the URL to SQLAlchemy, whose sqlite driver honours uri=true
+        self.magic_url = f"{self.uri}&uri=true"
+        self.conn = self.connect()
+        # For checkpoints, snapshots and restores only
+        self._copier = self.connect()
+        self.snapshots = {}
+        self.checkpoints = 0
+        self.last_checkpoint = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        disk = sqlite3.connect(db_path)
+        try:
+            disk.backup(self._copier)
+        finally:
+            disk.close()
+        self.snapshot("pristine")
+
+    def connect(self):
+        """Another connection to the in-memory copy (the database lives while `conn` is open)."""
+        return sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+
+    def snapshot(self, name="pristine"):
+        """Keep a copy of the current state under `name` (replacing an older one).
+
+        Raises sqlite3.OperationalError while a connection is inside a
+        write transaction.
+        """
+        copy = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            with self._lock:
+                _copy(self._copier, copy)
+        except _Busy:
+            copy.close()
+            raise sqlite3.OperationalError("the in-memory database is being written to") from None
+        old = self.snapshots.pop(name, None)
+        if old is not None:
+            old.close()
+        self.snapshots[name] = copy
+
+    def restore(self, name="pristine"):
+        """Replace the working copy with snapshot `name`. Returns the seconds it took.
+
+        Uncommitted work on `conn` is rolled back first. Raises
+        sqlite3.OperationalError while another connection is reading or
+        writing (a %sql cell still running, an open transaction).
+        """
+        started = time.perf_counter()
+        if self.conn.in_transaction:
+            self.conn.rollback()
+        try:
+            with self._lock:
+                _copy(self.snapshots[name], self._copier)
+        except _Busy:
+            raise sqlite3.OperationalError("the in-memory database is in use by another connection") from None
+        return time.perf_counter() - started
+
+    def checkpoint(self, db_path=None):
+        """Write the working copy to `db_path` (default: the file it was loaded from).
+
+        Returns the seconds it took, or None when a connection is inside a
+        write transaction (its changes would be half-written). The check and
+        the copy are one step, so no write can start in between.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            disk = sqlite3.connect(db_path or self.db_path)
+            try:
+                _copy(self._copier, disk)
+            except _Busy:
+                return None
+            finally:
+                disk.close()
+        self.checkpoints += 1
+        self.last_checkpoint = time.perf_counter() - started
+        return self.last_checkpoint
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            self.checkpoint()
+
+    def start(self, interval=60.0):
+        """Checkpoint every `interval` seconds from a background thread."""
+        self.stop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="sql101-memdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self, checkpoint=False):
+        """Stop the timer, optionally write a last checkpoint, and free the memory."""
+        self.stop()
+        if checkpoint:
+            self.checkpoint()
+        for copy in self.snapshots.values():
+            copy.close()
+        self.snapshots.clear()
+        self._copier.close()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
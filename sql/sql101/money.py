@@ -0,0 +1,278 @@
+"""Money as integer cents.
+
+price_per_unit and list_price are declared DECIMAL(10, 2), but SQLite
+has no decimal type: they are stored as REAL, so `amount * price_per_unit`
+and `SUM(tot_spent)` run in binary floating point and need a ROUND to
+look right (the "monstrosity" in 3_Group, cell 12). `migrate` switches
+a table to integer-cents storage:
+
+- the rows move to `<table>_cents`, where each money column becomes an
+  INTEGER `<column>_cents` (1.5 -> 150),
+- `<table>` becomes a view with the original columns in their original
+  order (`price_per_unit_cents / 100.0 AS price_per_unit`), with INSTEAD
+  OF triggers so INSERT, UPDATE and DELETE on it keep working,
+- the table's indexes are recreated on the cents table.
+
+Queries on the view look exactly like before, and so do their results:
+the view hands out `cents / 100.0` REALs, so `SUM(tot_spent)` on it
+still adds up floats. Queries on the `_cents` tables aggregate integers:
+`SUM(amount * price_per_unit_cents)` is exact, and `exact_avg_cents`
+rounds an average to whole cents without going through floats.
+`exact_sums` rewrites a lesson query's SUM/TOTAL/AVG of a money column
+(`SUM(tot_spent)`, `SUM(amount * price_per_unit)`) into an integer sum
+of cents, so the same query on the view (or on the REAL tables) gets the
+exact total. `revert` goes back to the original tables.
+
+Lesson cells that DROP the tables (0_Tables, 2_Join cell 26) expect real
+tables, so revert before re-running them. Tables with triggers from other
+sql101 tools (ext, rollups, cache) are refused: disable those first.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.money migrate --db my_database.db
+    python -m sql101.money revert --db my_database.db
+"""
+
+import argparse
+import re
+import sqlite3
+
+from . import DEFAULT_DB
+from .indexes import table_exists
+from .schema import KEY_COLUMNS
+
+# Money columns per table (the ext table is the one built by 2_Join, cell 26)
+MONEY_COLUMNS = {
+    "sql_101_product": ["list_price"],
+    "sql_101_transactions": ["price_per_unit"],
+    "sql_101_transactions_ext": ["price_per_unit", "tot_spent", "list_price"],
+}
+
+# Aggregates `exact_sums` rewrites, with an argument without parentheses
+_AGGREGATE = re.compile(r"\b(SUM|TOTAL|AVG)\s*\(([^()]*)\)", re.IGNORECASE)
+_FACTOR = re.compile(r"(?:\w+\.)?[A-Za-z_]\w*|\d+")
+
+CATALOG = """CREATE TABLE IF NOT EXISTS sql101_money (
+    name TEXT PRIMARY KEY,
+    table_sql TEXT NOT NULL,
+    index_sql TEXT NOT NULL  -- the table's CREATE INDEX statements, ';'-separated
+)"""
+
+
+def cents_table(table):
+    return f"{table}_cents"
+
+
+def to_cents(expr):
+    """SQL turning a REAL amount into INTEGER cents (NULL stays NULL)."""
+    return f"CAST(ROUND({expr} * 100) AS INTEGER)"
+
+
+def exact_avg_cents(column):
+    """SQL for AVG(`column`) of integer cents, rounded half up to whole cents with integer math.
+
+    Meant for non-negative amounts such as prices and totals.
+    """
+    return f"((2 * SUM({column}) + COUNT({column})) / (2 * COUNT({column})))"
+
+
+def exact_sums(sql):
+    """`sql` with SUM/TOTAL/AVG(money column [* other columns]) computed on integer cents.
+
+    `SUM(amount * price_per_unit)` becomes
+    `(SUM(amount * CAST(ROUND(price_per_unit * 100) AS INTEGER)) / 100.0)`:
+    each value is turned back into its exact cents, the sum is an integer
+    one and only the final result is a REAL. Aggregates over anything
+    else (two money columns, `+`, DISTINCT, function calls) are left as
+    they are.
+    """
+    money = {column for columns in MONEY_COLUMNS.values() for column in columns}
+
+    def rewrite(match):
+        function, argument = match.groups()
+        factors = [factor.strip() for factor in argument.split("*")]
+        if not all(_FACTOR.fullmatch(factor) for factor in factors):
+            return match.group(0)
+        priced = [i for i, factor in enumerate(factors) if factor.split(".")[-1].lower() in money]
+        if len(priced) != 1:
+            return match.group(0)
+        factors[priced[0]] = to_cents(factors[priced[0]])
+        return f"({function}({' * '.join(factors)}) / 100.0)"
+
+    return _AGGREGATE.sub(rewrite, sql)
+
+
+def format_cents(cents):
+    """150 -> '1.50' (Python side, for display)."""
+    if cents is None:
+        return None
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def is_migrated(conn, table):
+    return table_exists(conn, "sql101_money") and conn.execute(
+        "SELECT 1 FROM sql101_money WHERE name = ?", (table,)).fetchone() is not None
+
+
+def lossy_values(conn, table, column):
+    """How many values of `column` aren't whole cents (they'd be rounded by the migration)."""
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE {column} IS NOT NULL "
+        f"AND ABS({column} * 100 - ROUND({column} * 100)) > 1e-6"
+    ).fetchone()[0]
+
+
+def _columns(conn, table):
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _storage_name(column, money):
+    return f"{column}_cents" if column in money else column
+
+
+def _triggers(table, columns, money, key):
+    """INSTEAD OF triggers turning writes on the view into writes on the cents table.
+
+    UPDATE and DELETE find the row by `key` first (an index lookup, see
+    `migrate`); the other columns only tell rows with the same id apart.
+    """
+    storage = cents_table(table)
+    names = [name for name, _ in columns]
+    stored = [_storage_name(name, money) for name in names]
+
+    def value(row, name):
+        return to_cents(f"{row}.{name}") if name in money else f"{row}.{name}"
+
+    match = " AND ".join([f"{key} IS OLD.{key}"] + [f"{s} IS {value('OLD', n)}" for n, s in zip(names, stored)
+                                                    if n != key])
+    new_values = ", ".join(value("NEW", n) for n in names)
+    assignments = ", ".join(f"{s} = {value('NEW', n)}" for n, s in zip(names, stored))
+    return [
+        f"CREATE TRIGGER {table}_money_ins INSTEAD OF INSERT ON {table}\nBEGIN\n"
+        f"    INSERT INTO {storage} ({', '.join(stored)}) VALUES ({new_values});\nEND",
+        f"CREATE TRIGGER {table}_money_upd INSTEAD OF UPDATE ON {table}\nBEGIN\n"
+        f"    UPDATE {storage} SET {assignments}\n    WHERE {match};\nEND",
+        f"CREATE TRIGGER {table}_money_del INSTEAD OF DELETE ON {table}\nBEGIN\n"
+        f"    DELETE FROM {storage} WHERE {match};\nEND",
+    ]
+
+
+def _is_indexed(conn, table, column):
+    """True if `column` is the rowid alias of `table` or the first column of one of its indexes."""
+    pks = [row for row in conn.execute(f"PRAGMA table_info({table})") if row[5]]
+    if len(pks) == 1 and pks[0][1] == column and pks[0][2].upper() == "INTEGER":
+        return True
+    for index in conn.execute(f"PRAGMA index_list({table})"):
+        first = conn.execute(f"PRAGMA index_info({index[1]})").fetchone()
+        if first and first[2] == column:
+            return True
+    return False
+
+
+def migrate(conn, table, allow_rounding=False):
+    """Move `table` to integer-cents storage behind a view with the original name.
+
+    Raises ValueError if the table doesn't exist, if some money values
+    aren't whole cents (pass `allow_rounding=True` to round them), or if
+    other triggers are attached to the table. Returns the number of rows migrated.
+    """
+    money = MONEY_COLUMNS[table]
+    if is_migrated(conn, table):
+        return 0
+    if not table_exists(conn, table):
+        raise ValueError(f"no table named {table}")
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))]
+    if triggers:
+        raise ValueError(f"{table} has triggers ({', '.join(triggers)}); remove them before migrating")
+    if not allow_rounding:
+        lossy = {column: lossy_values(conn, table, column) for column in money}
+        if any(lossy.values()):
+            raise ValueError(f"values that aren't whole cents in {table}: {lossy}")
+
+    columns = _columns(conn, table)
+    key = KEY_COLUMNS.get(table, columns[0][0])
+    storage = cents_table(table)
+    table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                             (table,)).fetchone()[0]
+    index_sql = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(CATALOG)
+        definitions = []
+        for name, declared in columns:
+            if name in money:
+                definitions.append(f"{name}_cents INTEGER")
+            else:
+                # Keep INTEGER PRIMARY KEY ids as rowids
+                is_pk = re.search(rf"\b{name}\s+INTEGER\s+PRIMARY\s+KEY", table_sql, re.IGNORECASE)
+                definitions.append(f"{name} {'INTEGER PRIMARY KEY' if is_pk else declared}".strip())
+        conn.execute(f"CREATE TABLE {storage} (\n    " + ",\n    ".join(definitions) + "\n)")
+        select = [to_cents(name) if name in money else name for name, _ in columns]
+        rows = conn.execute(f"INSERT INTO {storage} SELECT {', '.join(select)} FROM {table}").rowcount
+        conn.execute(f"DROP TABLE {table}")
+        view = [f"{name}_cents / 100.0 AS {name}" if name in money else name for name, _ in columns]
+        conn.execute(f"CREATE VIEW {table} AS SELECT {', '.join(view)} FROM {storage}")
+        for trigger in _triggers(table, columns, money, key):
+            conn.execute(trigger)
+        for sql in index_sql:
+            for column in money:
+                sql = re.sub(rf"\b{column}\b", f"{column}_cents", sql)
+            conn.execute(re.sub(rf"\bON\s+{table}\b", f"ON {storage}", sql, count=1, flags=re.IGNORECASE))
+        # The triggers look rows up by id: without the table's key that would be a full scan per row
+        if not _is_indexed(conn, storage, key):
+            conn.execute(f"CREATE INDEX {storage}_{key} ON {storage} ({key})")
+        conn.execute("INSERT INTO sql101_money (name, table_sql, index_sql) VALUES (?, ?, ?)",
+                     (table, table_sql, ";\n".join(index_sql)))
+    return rows
+
+
+def revert(conn, table):
+    """Turn a migrated table back into a plain table with REAL money columns."""
+    if not is_migrated(conn, table):
+        return 0
+    table_sql, index_sql = conn.execute("SELECT table_sql, index_sql FROM sql101_money WHERE name = ?",
+                                        (table,)).fetchone()
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        # The view already turns cents back into REALs
+        conn.execute(f"CREATE TEMP TABLE sql101_money_reverting AS SELECT * FROM {table}")
+        conn.execute(f"DROP VIEW {table}")
+        conn.execute(f"DROP TABLE {cents_table(table)}")
+        conn.execute(table_sql)
+        rows = conn.execute(f"INSERT INTO {table} SELECT * FROM temp.sql101_money_reverting").rowcount
+        conn.execute("DROP TABLE temp.sql101_money_reverting")
+        for sql in filter(None, index_sql.split(";\n")):
+            conn.execute(sql)
+        conn.execute("DELETE FROM sql101_money WHERE name = ?", (table,))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store money columns as integer cents.")
+    parser.add_argument("command", choices=["migrate", "revert", "status"])
+    parser.add_argument("tables", nargs="*", help=f"default: {', '.join(MONEY_COLUMNS)} (those that exist)")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--allow-rounding", action="store_true", help="round values that aren't whole cents")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        tables = args.tables or [t for t in MONEY_COLUMNS if table_exists(conn, t) or is_migrated(conn, t)]
+        for table in tables:
+            if args.command == "migrate":
+                print(f"{table}: {migrate(conn, table, args.allow_rounding):,} rows moved to {cents_table(table)}")
+            elif args.command == "revert":
+                print(f"{table}: {revert(conn, table):,} rows restored")
+            else:
+                print(f"{table}: {'integer cents' if is_migrated(conn, table) else 'REAL'}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Paged results for big SELECTs.
+
+`%%sql` fetches the whole result set before showing anything, so
+`SELECT * FROM sql_101_transactions` (2_Join, cell 10) or the unlimited
+`ORDER BY total_price DESC` (1_Select, cell 26) hold every row in memory
+on a scaled database. A `ResultPager` keeps the cursor open instead and
+fetches one page at a time with `fetchmany`:
+
+- the first page is shown as soon as it's fetched,
+- `next()` fetches the following page, only when asked,
+- only the current page is held, however large the table is.
+
+While a pager is open its cursor keeps a read transaction on the database,
+so writers on other connections may wait (or, in WAL mode, checkpoints
+can't finish). Page to the end or call `close()` when done.
+
+In a notebook, after `%load_ext sql`:
+
+    from sql101.paging import install_magic
+    install_magic("my_database.db")
+
+then
+
+    %%sql_page 50
+    SELECT * FROM sql_101_transactions
+
+and `_.next()` (or keep the pager in a variable) in the next cell.
+"""
+
+import html
+import sqlite3
+
+
+class ResultPager:
+    """Run `sql` on `conn` and hand out its rows `page_size` at a time."""
+
+    def __init__(self, conn, sql, params=(), page_size=100):
+        self.page_size = page_size
+        self.cursor = conn.execute(sql, params)
+        self.columns = [d[0] for d in self.cursor.description] if self.cursor.description else []
+        self.page = []
+        self.first_row = 0  # 0-based position of page[0] in the result
+        self.exhausted = False
+        self.next()
+
+    def next(self):
+        """Fetch the next page (an empty list once the result is exhausted) and return the pager."""
+        self.first_row += len(self.page)
+        self.page = [] if self.exhausted else self.cursor.fetchmany(self.page_size)
+        if len(self.page) < self.page_size:
+            self.close()
+        return self
+
+    def close(self):
+        """Release the cursor (and its read transaction)."""
+        if not self.exhausted:
+            self.cursor.close()
+            self.exhausted = True
+
+    def pages(self):
+        """Iterate over the remaining pages, starting with the current one."""
+        while self.page:
+            yield self.page
+            self.next()
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
+    def _status(self):
+        if not self.page:
+            return f"No more rows ({self.first_row:,} in total)."
+        last = self.first_row + len(self.page)
+        if self.exhausted:
+            return f"Rows {self.first_row + 1:,}-{last:,} of {last:,}."
+        return f"Rows {self.first_row + 1:,}-{last:,}, more available: call .next()."
+
+    def __repr__(self):
+        rows = [[str(value) for value in row] for row in self.page]
+        widths = [max([len(c)] + [len(r[i]) for r in rows]) for i, c in enumerate(self.columns)]
+        lines = [" | ".join(c.ljust(w) for c, w in zip(self.columns, widths))]
+        lines.append("-+-".join("-" * w for w in widths))
+        lines += [" | ".join(v.ljust(w) for v, w in zip(row, widths)) for row in rows]
+        return "\n".join(lines + [self._status()])
+
+    def _repr_html_(self):
+        header = "".join(f"<th>{html.escape(c)}</th>" for c in self.columns)
+        body = "".join("<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row) + "</tr>"
+                       for row in self.page)
+        return (f"<table><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table>"
+                f"<p>{html.escape(self._status())}</p>")
+
+
+def install_magic(db_path, page_size=100, ip=None):
+    """Register the `%%sql_page [page size]` cell magic, reading from `db_path`.
+
+    The magic runs on its own read-only connection, so an open pager never
+    holds a lock on the connection the %%sql cells write through.
+    `{variables}` in the cell are expanded like in %%sql.
+    """
+    if ip is None:
+        from IPython import get_ipython
+        ip = get_ipython()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def sql_page(line, cell=""):
+        size = int(line) if line.strip() else page_size
+        return ResultPager(conn, ip.var_expand(cell), page_size=size)
+
+    ip.register_magic_function(sql_page, "cell", "sql_page")
+    return conn
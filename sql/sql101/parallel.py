@@ -0,0 +1,181 @@
+"""Parallel 3_Group aggregates over a pool of worker processes.
+
+SQLite runs each query on one core. Here sql_101_transactions_ext is
+split into shards, each worker process aggregates its shards on its own
+read-only connection, and the parent merges the partial results:
+
+- COUNT and SUM partials are added, MIN and MAX compared.
+- AVG is never averaged across shards: workers return SUM and COUNT of
+  the column, and the parent divides the merged totals.
+
+Shards are either rowid ranges (the default: each one is a B-tree range
+scan, so the workers split the table's pages between them) or groups of
+store_ids. Store shards need an index on store_id (`sql101.ext` creates
+one) or every worker scans the whole table.
+
+The API follows `sql101.columnar`: aggregates are (function, column)
+pairs, `where` is a list of (column, operator, value) conditions, and
+the rows come back like SQLite's, ordered by the group columns. Integer
+results match SQLite exactly; float sums are added in a different order
+and can differ in the last digits.
+
+    from sql101.parallel import aggregate
+    aggregate("my_database.db", [("count", "*"), ("avg", "tot_spent")], group_by=["store_name"], workers=4)
+"""
+
+import concurrent.futures
+import os
+
+from . import DEFAULT_DB
+from .wal import connect
+
+EXT_TABLE = "sql_101_transactions_ext"
+
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+OPERATORS = ("=", "!=", "<>", "<", "<=", ">", ">=")
+SHARDINGS = ("rowid", "store")
+
+# Shards per worker: a few more than one evens out slow and fast shards
+SHARDS_PER_WORKER = 4
+
+
+def _partial_columns(aggregates):
+    """The SQL computed per shard for each aggregate (AVG needs two)."""
+    columns = []
+    for func, column in aggregates:
+        if func not in AGGREGATES:
+            raise ValueError(f"unknown aggregate {func!r}, expected one of {AGGREGATES}")
+        if func == "avg":
+            columns += [f"SUM({column})", f"COUNT({column})"]
+        else:
+            columns.append(f"{func.upper()}({column})")
+    return columns
+
+
+def _where_sql(where):
+    conditions, params = [], []
+    for column, op, value in where:
+        if op not in OPERATORS:
+            raise ValueError(f"unknown operator {op!r}, expected one of {OPERATORS}")
+        conditions.append(f"{column} {op} ?")
+        params.append(value)
+    return conditions, params
+
+
+def shards(conn, table=EXT_TABLE, by="rowid", n=8):
+    """Up to `n` shard conditions (SQL, params) that together cover `table` once."""
+    if by not in SHARDINGS:
+        raise ValueError(f"shard by one of {SHARDINGS}")
+    if by == "store":
+        stores = [row[0] for row in conn.execute(f"SELECT DISTINCT store_id FROM {table}")]
+        known = [store for store in stores if store is not None]
+        groups = [known[i::n] for i in range(min(n, len(known)))]
+        conditions = [(f"store_id IN ({', '.join('?' * len(group))})", group) for group in groups]
+        if len(known) < len(stores):
+            conditions.append(("store_id IS NULL", []))
+        return conditions
+    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // n))
+    return [("rowid BETWEEN ? AND ?", [start, min(start + step - 1, high)]) for start in range(low, high + 1, step)]
+
+
+def _run_shard(db_path, sql, params):
+    """Worker: one shard's partial aggregates, on a fresh read-only connection."""
+    conn = connect(db_path, readonly=True)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _sqlite_order(value):
+    """Sort key comparing values like SQLite: NULL < numbers < text < BLOBs.
+
+    Numbers compare by value, text by code point (BINARY collation on
+    UTF-8) and BLOBs byte by byte, so a MIN or MAX over a column holding
+    several types comes out as SQLite's own.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, bytes(value))
+
+
+def _merge(func, a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if func in ("count", "sum"):
+        return a + b
+    return min(a, b, key=_sqlite_order) if func == "min" else max(a, b, key=_sqlite_order)
+
+
+def _sort_key(row, n_keys):
+    return [_sqlite_order(value) for value in row[:n_keys]]
+
+
+def aggregate(db_path=DEFAULT_DB, aggregates=(("count", "*"),), group_by=(), where=(), table=EXT_TABLE,
+              shard_by="rowid", workers=None, n_shards=None):
+    """Run a grouped aggregate over `table` on `workers` processes (default: one per core).
+
+    `n_shards` defaults to SHARDS_PER_WORKER per worker. With workers=1
+    the shards run one after the other in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    group_by = list(group_by)
+    partial_columns = _partial_columns(aggregates)
+    conditions, params = _where_sql(where)
+    conn = connect(db_path, readonly=True)
+    try:
+        shard_list = shards(conn, table, shard_by, n_shards or workers * SHARDS_PER_WORKER)
+    finally:
+        conn.close()
+
+    tasks = []
+    for shard_sql, shard_params in shard_list:
+        sql = (f"SELECT {', '.join(group_by + partial_columns)} FROM {table} "
+               f"WHERE {' AND '.join([shard_sql] + conditions)}"
+               + (f" GROUP BY {', '.join(group_by)}" if group_by else ""))
+        tasks.append((db_path, sql, list(shard_params) + params))
+    if workers == 1:
+        partials = [_run_shard(*task) for task in tasks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_run_shard, *zip(*tasks))) if tasks else []
+
+    # How each partial column merges, in order: AVG's pair is a sum and a count
+    funcs = []
+    for func, _ in aggregates:
+        funcs += ["sum", "count"] if func == "avg" else [func]
+    n_keys = len(group_by)
+    merged = {}
+    for rows in partials:
+        for row in rows:
+            key, values = row[:n_keys], row[n_keys:]
+            if key not in merged:
+                merged[key] = list(values)
+            else:
+                merged[key] = [_merge(f, a, b) for f, a, b in zip(funcs, merged[key], values)]
+    if not merged and not group_by:
+        # No rows at all: SQLite still returns one row (COUNT 0, the rest NULL)
+        merged[()] = [0 if f == "count" else None for f in funcs]
+
+    results = []
+    for key, values in merged.items():
+        out, i = list(key), 0
+        for func, _ in aggregates:
+            if func == "avg":
+                total, count = values[i], values[i + 1]
+                out.append(total / count if count else None)
+                i += 2
+            else:
+                out.append(values[i])
+                i += 1
+        results.append(tuple(out))
+    return sorted(results, key=lambda row: _sort_key(row, n_keys))
@@ -0,0 +1,440 @@
+"""Monthly partitions of the fact table, with partition pruning.
+
+Every date filter in the lessons is a month-aligned range:
+`transaction_date >= '2024-06-01'`, `BETWEEN '2024-06-01' AND '2024-06-30'`
+(1_Select) and `> '2024-06-01'` (3_Group). On a multi-year table they still
+scan every row. Here the table is split into one table per month:
+
+- `partition` moves the rows of `sql_101_transactions` (or any table with
+  a date column, e.g. sql_101_transactions_ext) into `<table>_pYYYY_MM`
+  tables, plus `<table>_pother` for dates that aren't 'YYYY-MM-...' (NULLs
+  included). Each partition gets the table's columns, keys and indexes.
+  The table itself is dropped and replaced by a view with the same name,
+  a UNION ALL of the partitions, so the lesson queries keep working.
+  INSTEAD OF triggers on the view send INSERTs, UPDATEs and DELETEs to
+  the right partition; an INSERT for a month without a partition fails,
+  use `insert_rows` for those (and for bulk loads: it skips the
+  triggers). Like sql101.money, other triggers must be removed first,
+  and keys are only unique within a month.
+- `route` rewrites a query on the table so it only reads the partitions
+  its date predicate can match. The WHERE clause stays in the query, so
+  pruning never changes results; when the predicate isn't a plain AND
+  chain of comparisons against literals, nothing is pruned.
+- `drop_partition` deletes a month with a DROP TABLE (no row-by-row
+  DELETE, no index maintenance); `archive_partition` first copies that
+  month, and only that month, to another database file.
+- `unpartition` turns the partitions back into one table.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.partitions partition --db my_database.db
+    python -m sql101.partitions route "SELECT * FROM sql_101_transactions
+        WHERE transaction_date >= '2024-06-01'" --db my_database.db
+    python -m sql101.partitions archive 2023-01 --to archive.db --db my_database.db
+"""
+
+import argparse
+import re
+import sqlite3
+
+from . import DEFAULT_DB
+from .cache import normalize
+from .indexes import table_exists
+
+SOURCE_TABLE = "sql_101_transactions"
+DATE_COLUMN = "transaction_date"
+MONTH_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]*"
+OTHER = "other"
+
+CATALOG = """CREATE TABLE IF NOT EXISTS sql101_partitions (
+    source TEXT NOT NULL,
+    month TEXT NOT NULL,  -- 'YYYY-MM', or 'other'
+    name TEXT NOT NULL,
+    date_column TEXT NOT NULL,
+    PRIMARY KEY (source, month)
+)"""
+
+# The partitioned tables as they were: new partitions and `unpartition` are built from it
+SOURCES = """CREATE TABLE IF NOT EXISTS sql101_partitioned_tables (
+    source TEXT PRIMARY KEY,
+    table_sql TEXT NOT NULL,
+    index_sql TEXT NOT NULL  -- its CREATE INDEX statements, separated by a semicolon and a newline
+)"""
+
+# Words that make a WHERE clause more than an AND chain (or end it)
+_NO_PRUNING = re.compile(r"\b(OR|NOT|CASE|SELECT|IN)\b", re.IGNORECASE)
+_CLAUSE_END = re.compile(r"\b(GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|WINDOW|UNION|INTERSECT|EXCEPT)\b", re.IGNORECASE)
+_NOT_ALIASES = {"WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "ON", "USING",
+                "GROUP", "ORDER", "HAVING", "LIMIT", "WINDOW", "UNION", "INTERSECT", "EXCEPT"}
+_CREATE_TABLE = re.compile(r"^CREATE TABLE\s+(\"[^\"]+\"|\S+?)\s*\(", re.IGNORECASE)
+_CREATE_INDEX = re.compile(r"^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)(\"[^\"]+\"|\S+)\s+ON\s+(\"[^\"]+\"|\S+?)\s*\(",
+                           re.IGNORECASE)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.replace('-', '_')}"
+
+
+def next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    if not 1 <= mon <= 12:
+        raise ValueError(f"not a month: {month!r}")
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def is_partitioned(conn, table=SOURCE_TABLE):
+    return table_exists(conn, "sql101_partitioned_tables") and conn.execute(
+        "SELECT 1 FROM sql101_partitioned_tables WHERE source = ?", (table,)).fetchone() is not None
+
+
+def partitions(conn, table=SOURCE_TABLE):
+    """[(month, partition table)] for `table`, in month order ('other' last)."""
+    try:
+        rows = conn.execute("SELECT month, name FROM sql101_partitions WHERE source = ? ORDER BY month",
+                            (table,)).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return sorted(rows, key=lambda row: (row[0] == OTHER, row[0]))
+
+
+def _date_column(conn, table):
+    row = conn.execute("SELECT date_column FROM sql101_partitions WHERE source = ? LIMIT 1", (table,)).fetchone()
+    return row[0] if row else DATE_COLUMN
+
+
+def _has_month(date_column):
+    """SQL: `date_column` starts with 'YYYY-MM' and MM is 01..12."""
+    return f"{date_column} GLOB '{MONTH_GLOB}' AND substr({date_column}, 6, 2) BETWEEN '01' AND '12'"
+
+
+def _month_expr(date_column):
+    """SQL: the partition month of `date_column`, like `_month_of`."""
+    return f"CASE WHEN {_has_month(date_column)} THEN substr({date_column}, 1, 7) ELSE '{OTHER}' END"
+
+
+def _month_of(value):
+    """'YYYY-MM' for a date string starting with a real month, else OTHER."""
+    if isinstance(value, str) and re.match(r"\d{4}-\d{2}", value) and 1 <= int(value[5:7]) <= 12:
+        return value[:7]
+    return OTHER
+
+
+def _month_filter(date_column, month):
+    if month == OTHER:
+        return f"({date_column} IS NULL OR NOT ({_has_month(date_column)}))", ()
+    return f"{date_column} >= ? AND {date_column} < ?", (month, next_month(month))
+
+
+def _create_partition(conn, table, month, date_column):
+    """Create an empty partition from the table's own CREATE TABLE and CREATE INDEX statements."""
+    name = partition_name(table, month)
+    table_sql, index_sql = conn.execute(
+        "SELECT table_sql, index_sql FROM sql101_partitioned_tables WHERE source = ?", (table,)).fetchone()
+    conn.execute(_CREATE_TABLE.sub(f"CREATE TABLE {name} (", table_sql, count=1))
+    suffix = name[len(table):]
+
+    def on_partition(match):
+        # idx_x ON table  ->  idx_x_pYYYY_MM ON table_pYYYY_MM: index names are per database
+        index = match.group(2).strip('"')
+        return f"{match.group(1)}{index}{suffix} ON {name} ("
+
+    for sql in filter(None, index_sql.split(";\n")):
+        conn.execute(_CREATE_INDEX.sub(on_partition, sql, count=1))
+    conn.execute("INSERT INTO sql101_partitions (source, month, name, date_column) VALUES (?, ?, ?, ?)",
+                 (table, month, name, date_column))
+    return name
+
+
+def _triggers(table, columns, parts, date_column):
+    """INSTEAD OF triggers on the view that send each write to its month's partition."""
+    months = ", ".join(f"'{month}'" for month, _ in parts)
+    new_month = _month_expr(f"NEW.{date_column}")
+    old_month = _month_expr(f"OLD.{date_column}")
+    check = (f"SELECT RAISE(ABORT, 'no partition of {table} for that month: add it with "
+             f"sql101.partitions.insert_rows') WHERE {new_month} NOT IN ({months});")
+    insert = "\n".join(
+        f"INSERT INTO {name} ({', '.join(columns)}) SELECT {', '.join(f'NEW.{c}' for c in columns)} "
+        f"WHERE {new_month} = '{month}';" for month, name in parts)
+    # One row with OLD's values: identical rows are interchangeable
+    match = " AND ".join(f"{column} IS OLD.{column}" for column in columns)
+    delete = "\n".join(
+        f"DELETE FROM {name} WHERE {old_month} = '{month}' "
+        f"AND rowid = (SELECT rowid FROM {name} WHERE {match} LIMIT 1);" for month, name in parts)
+    return [
+        f"CREATE TRIGGER {table}_ins INSTEAD OF INSERT ON {table}\nBEGIN\n{check}\n{insert}\nEND",
+        f"CREATE TRIGGER {table}_upd INSTEAD OF UPDATE ON {table}\nBEGIN\n{check}\n{delete}\n{insert}\nEND",
+        f"CREATE TRIGGER {table}_del INSTEAD OF DELETE ON {table}\nBEGIN\n{delete}\nEND",
+    ]
+
+
+def create_view(conn, table=SOURCE_TABLE):
+    """(Re)create the `table` view, a UNION ALL of its partitions, and its triggers."""
+    parts = partitions(conn, table)
+    conn.execute(f"DROP VIEW IF EXISTS {table}")
+    conn.execute(f"CREATE VIEW {table} AS " + " UNION ALL ".join(f"SELECT * FROM {name}" for _, name in parts))
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({parts[0][1]})")]
+    for trigger in _triggers(table, columns, parts, _date_column(conn, table)):
+        conn.execute(trigger)
+
+
+def partition(conn, table=SOURCE_TABLE, date_column=DATE_COLUMN):
+    """Move the rows of `table` into monthly partitions behind a view named `table`.
+
+    Each month is copied with a range filter, so an index on the date
+    column (see `sql101.indexes`) turns the copy into one range scan per
+    month. Returns {month: rows}; {} if `table` is already partitioned.
+    Raises ValueError if the table doesn't exist or has triggers.
+    """
+    if is_partitioned(conn, table):
+        return {}
+    if not table_exists(conn, table):
+        raise ValueError(f"no table named {table}")
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))]
+    if triggers:
+        raise ValueError(f"{table} has triggers ({', '.join(triggers)}); remove them before partitioning")
+    table_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                             (table,)).fetchone()[0]
+    index_sql = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(CATALOG)
+        conn.execute(SOURCES)
+        conn.execute("INSERT INTO sql101_partitioned_tables (source, table_sql, index_sql) VALUES (?, ?, ?)",
+                     (table, table_sql, ";\n".join(index_sql)))
+        months = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr({date_column}, 1, 7) FROM {table} "
+            f"WHERE {_has_month(date_column)} ORDER BY 1")]
+        counts = {}
+        # 'other' always exists, so the view never runs out of partitions
+        for month in months + [OTHER]:
+            where, params = _month_filter(date_column, month)
+            name = _create_partition(conn, table, month, date_column)
+            counts[month] = conn.execute(f"INSERT INTO {name} SELECT * FROM {table} WHERE {where}",
+                                         params).rowcount
+        conn.execute(f"DROP TABLE {table}")
+        create_view(conn, table)
+    return counts
+
+
+def unpartition(conn, table=SOURCE_TABLE):
+    """Put the partitions of `table` back into one table (with its indexes) and drop them."""
+    if not is_partitioned(conn, table):
+        return
+    table_sql, index_sql = conn.execute(
+        "SELECT table_sql, index_sql FROM sql101_partitioned_tables WHERE source = ?", (table,)).fetchone()
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        conn.execute(f"DROP VIEW {table}")
+        conn.execute(table_sql)
+        for _, name in partitions(conn, table):
+            conn.execute(f"INSERT INTO {table} SELECT * FROM {name}")
+            conn.execute(f"DROP TABLE {name}")
+        for sql in filter(None, index_sql.split(";\n")):
+            conn.execute(sql)
+        conn.execute("DELETE FROM sql101_partitions WHERE source = ?", (table,))
+        conn.execute("DELETE FROM sql101_partitioned_tables WHERE source = ?", (table,))
+
+
+def drop_partition(conn, month, table=SOURCE_TABLE):
+    """Delete one month: a DROP TABLE plus a view rebuild, however many rows it holds.
+
+    Dropping 'other' leaves an empty 'other' partition behind.
+    """
+    name = dict(partitions(conn, table)).get(month)
+    if name is None:
+        raise KeyError(f"{table} has no partition for {month!r}")
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        date_column = _date_column(conn, table)
+        conn.execute(f"DROP TABLE {name}")
+        conn.execute("DELETE FROM sql101_partitions WHERE source = ? AND month = ?", (table, month))
+        if month == OTHER:
+            _create_partition(conn, table, OTHER, date_column)
+        create_view(conn, table)
+
+
+def archive_partition(conn, month, archive_path, table=SOURCE_TABLE):
+    """Copy one month to `archive_path` (same table name there), then drop it here.
+
+    Returns the number of rows archived.
+    """
+    name = dict(partitions(conn, table)).get(month)
+    if name is None:
+        raise KeyError(f"{table} has no partition for {month!r}")
+    ddl = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()[0]
+    conn.execute("ATTACH DATABASE ? AS sql101_archive", (archive_path,))
+    try:
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS sql101_archive.{name}")
+            conn.execute(ddl.replace(f"CREATE TABLE {name}", f"CREATE TABLE sql101_archive.{name}", 1))
+            rows = conn.execute(f"INSERT INTO sql101_archive.{name} SELECT * FROM main.{name}").rowcount
+    finally:
+        conn.execute("DETACH DATABASE sql101_archive")
+    drop_partition(conn, month, table)
+    return rows
+
+
+def insert_rows(conn, rows, table=SOURCE_TABLE):
+    """Insert full rows (in the table's column order) straight into their monthly partitions.
+
+    Missing partitions are created and the view rebuilt. Returns {month: rows}.
+    """
+    if not is_partitioned(conn, table):
+        raise ValueError(f"{table} is not partitioned")
+    date_column = _date_column(conn, table)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    date_index = columns.index(date_column)
+    by_month = {}
+    for row in rows:
+        month = _month_of(row[date_index])
+        by_month.setdefault(month, []).append(row)
+    existing = dict(partitions(conn, table))
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for month, month_rows in by_month.items():
+            name = existing.get(month) or _create_partition(conn, table, month, date_column)
+            conn.executemany(f"INSERT INTO {name} VALUES ({', '.join('?' * len(columns))})", month_rows)
+        if set(by_month) - set(existing):
+            create_view(conn, table)
+    return {month: len(month_rows) for month, month_rows in by_month.items()}
+
+
+def date_bounds(where, date_column=DATE_COLUMN, alias=None, qualified_only=False):
+    """(low, high) string bounds on `date_column` implied by an AND-only WHERE clause.
+
+    Either bound is None when unconstrained. Returns None when the clause
+    has OR/NOT/CASE/IN or subqueries, or when a comparison is part of a
+    bigger expression (`> '2024-06-01' + 0`, `(... > '2024-06-01') = 0`),
+    i.e. when it can't be read safely.
+    Comparisons qualified with another alias are ignored, and with
+    `qualified_only` so are unqualified ones.
+    """
+    if _NO_PRUNING.search(where):
+        return None
+    qualifier = rf"(?:(\w+)\.)?"
+    low = high = None
+    patterns = [
+        (rf"{qualifier}\b{date_column}\s+BETWEEN\s+'([^']*)'\s+AND\s+'([^']*)'", "between"),
+        (rf"{qualifier}\b{date_column}\s*(>=|<=|==|=|>|<)\s*'([^']*)'", "compare"),
+    ]
+    for pattern, kind in patterns:
+        for match in re.finditer(pattern, where, re.IGNORECASE):
+            owner = match.group(1)
+            if (owner and owner != alias) or (owner is None and qualified_only):
+                continue
+            # Only whole terms of the AND chain: anything around them changes what they mean
+            if not (re.search(r"(^|\bAND)\s*\(*\s*$", where[:match.start()], re.IGNORECASE)
+                    and re.match(r"\s*\)*\s*(AND\b|$)", where[match.end():], re.IGNORECASE)):
+                return None
+            if kind == "between":
+                lo, hi = match.group(2), match.group(3)
+            else:
+                op, value = match.group(2), match.group(3)
+                lo = value if op in (">=", ">", "=", "==") else None
+                hi = value if op in ("<=", "<", "=", "==") else None
+            if lo is not None and (low is None or lo > low):
+                low = lo
+            if hi is not None and (high is None or hi < high):
+                high = hi
+        if kind == "between":
+            # Keep the BETWEEN's AND from being read as a comparison below
+            where = re.sub(pattern, " ", where, flags=re.IGNORECASE)
+    return low, high
+
+
+def _month_matches(month, low, high):
+    """Can a date string starting with `month` be >= low and <= high?"""
+    if month == OTHER:
+        return True
+    # Every such string is >= 'YYYY-MM' and < the next month's prefix
+    return (low is None or next_month(month) > low) and (high is None or month <= high)
+
+
+def route(conn, sql, table=SOURCE_TABLE):
+    """Rewrite a query on partitioned `table` to read only the partitions it needs.
+
+    Returns (sql, months read). The query comes back unchanged (with all
+    months) when it doesn't reference the table exactly once or its date
+    predicate can't be read.
+    """
+    months = partitions(conn, table)
+    text = normalize(sql)
+    refs = list(re.finditer(rf"\b{table}\b(?:\s+(?:AS\s+)?(\w+))?", text, re.IGNORECASE))
+    # One plain SELECT only: with subqueries a WHERE may belong to another level, and writes go
+    # through the view's triggers
+    if (len(refs) != 1 or len(re.findall(r"\bSELECT\b", text, re.IGNORECASE)) != 1 or not months
+            or not text.upper().startswith("SELECT")):
+        return sql, [month for month, _ in months]
+    ref = refs[0]
+    alias = ref.group(1) if ref.group(1) and ref.group(1).upper() not in _NOT_ALIASES else None
+
+    where = re.search(r"\bWHERE\b(.*)", text, re.IGNORECASE | re.DOTALL)
+    bounds = None
+    if where:
+        clause = _CLAUSE_END.split(where.group(1))[0]
+        from_clause = text[ref.start():where.start()]
+        joined = "," in from_clause or re.search(r"\bJOIN\b", text, re.IGNORECASE)
+        bounds = date_bounds(clause, _date_column(conn, table), alias or table, qualified_only=bool(joined))
+    if not bounds:
+        return sql, [month for month, _ in months]
+
+    keep = [(month, name) for month, name in months if _month_matches(month, *bounds)]
+    if keep:
+        source = " UNION ALL ".join(f"SELECT * FROM {name}" for _, name in keep)
+    else:
+        source = f"SELECT * FROM {months[0][1]} WHERE 0"
+    end = ref.end() if alias else ref.start() + len(table)
+    rewritten = f"{text[:ref.start()]}({source}) AS {alias or table}{text[end:]}"
+    return rewritten, [month for month, _ in keep]
+
+
+def execute(conn, sql, params=(), table=SOURCE_TABLE):
+    """`conn.execute` on the routed query."""
+    return conn.execute(route(conn, sql, table)[0], params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monthly partitions of the fact table.")
+    parser.add_argument("command", choices=["partition", "unpartition", "list", "route", "drop", "archive"])
+    parser.add_argument("arg", nargs="?", help="the query for `route`, the month (YYYY-MM) for `drop`/`archive`")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--table", default=SOURCE_TABLE)
+    parser.add_argument("--date-column", default=DATE_COLUMN)
+    parser.add_argument("--to", help="archive database for `archive`")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "partition":
+            counts = partition(conn, args.table, args.date_column)
+            if not counts:
+                print(f"{args.table} is already partitioned")
+            else:
+                print(f"{len(counts)} partitions, {sum(counts.values()):,} rows moved, {args.table} is now a view")
+        elif args.command == "unpartition":
+            unpartition(conn, args.table)
+        elif args.command == "list":
+            for month, name in partitions(conn, args.table):
+                print(month, name, conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0])
+        elif args.command == "route":
+            sql, months = route(conn, args.arg, args.table)
+            print(f"-- {len(months)} partition(s): {', '.join(months)}\n{sql}")
+        elif args.command == "drop":
+            drop_partition(conn, args.arg, args.table)
+        else:
+            if not args.to:
+                parser.error("archive needs --to")
+            rows = archive_partition(conn, args.arg, args.to, args.table)
+            print(f"{rows:,} rows archived to {args.to}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
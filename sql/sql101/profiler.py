@@ -0,0 +1,261 @@
+"""Per-statement timing and query plans for the lesson queries.
+
+Records, for every %%sql cell (or every statement replayed from the
+lessons), the wall time, the rows returned and the EXPLAIN QUERY PLAN
+output, into `sql101_query_stats` in a separate stats database (so the
+lesson database isn't touched). Two plan features are flagged:
+
+- full table scans (`SCAN <table>`, also when it reads a covering
+  index instead of the table: every entry is still visited),
+- temp B-trees, i.e. a sort built for ORDER BY, GROUP BY or DISTINCT.
+
+A statement showing either is "scan-bound": it reads or sorts the whole
+table and will get slower as the data grows. `report` lists the slowest
+statements with those flags.
+
+Usage from the `sql/` folder (`run` replays the lessons on a copy of the
+database, since they create and drop tables):
+
+    python -m sql101.profiler run --db my_database.db
+    python -m sql101.profiler report
+
+or, in a notebook after `%load_ext sql`:
+
+    from sql101.profiler import install_magic
+    install_magic("my_database.db", source="1_Select")
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from . import DEFAULT_DB
+from .cache import normalize
+from .lessons import QUERY_LESSONS, lesson_path, sql_cells
+from .schema import split_statements
+
+STATS_DB = os.path.join(os.path.dirname(DEFAULT_DB), "sql101_stats.db")
+
+STATS_DDL = """CREATE TABLE IF NOT EXISTS sql101_query_stats (
+    id INTEGER PRIMARY KEY,
+    recorded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    source TEXT,             -- lesson or notebook
+    cell INT,
+    statement TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    wall_ms REAL,
+    rows INT,
+    plan TEXT,               -- EXPLAIN QUERY PLAN details, one per line
+    full_scans TEXT,         -- tables read with a full scan, comma-separated
+    temp_btrees TEXT,        -- 'ORDER BY', 'GROUP BY', 'DISTINCT' sorts
+    error TEXT
+)"""
+
+# Every SCAN step but rowid range scans ("SCAN t USING INTEGER PRIMARY KEY (rowid>?)")
+_SCAN = re.compile(r"^SCAN (\w+)\b(?!.* USING INTEGER PRIMARY KEY)")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (?:(?:LAST|RIGHT PART OF) )?(ORDER BY|GROUP BY|DISTINCT)")
+
+
+def explain(conn, sql):
+    """EXPLAIN QUERY PLAN details of `sql` (one string per plan step), or [] if it can't be planned."""
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    except (sqlite3.Error, sqlite3.Warning):
+        return []
+
+
+def plan_flags(details):
+    """(tables scanned in full, temp B-tree purposes) found in a query plan."""
+    scans, btrees = [], []
+    for detail in details:
+        scan = _SCAN.match(detail)
+        if scan and scan.group(1) != "CONSTANT" and scan.group(1) not in scans:
+            scans.append(scan.group(1))
+        btree = _TEMP_BTREE.search(detail)
+        if btree and btree.group(1) not in btrees:
+            btrees.append(btree.group(1))
+    return scans, btrees
+
+
+class StatsRecorder:
+    """Appends rows to `sql101_query_stats` in `stats_path`."""
+
+    def __init__(self, stats_path=STATS_DB):
+        self.conn = sqlite3.connect(stats_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(STATS_DDL)
+
+    def record(self, statement, wall_seconds, rows, plan, source=None, cell=None, error=None):
+        scans, btrees = plan_flags(plan)
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO sql101_query_stats (source, cell, statement, normalized, wall_ms, rows, plan, "
+                "full_scans, temp_btrees, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, cell, statement, normalize(statement), wall_seconds * 1000, rows, "\n".join(plan),
+                 ", ".join(scans) or None, ", ".join(btrees) or None, error),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def profile_statement(conn, sql, recorder, source=None, cell=None):
+    """Plan, run and record one statement on a sqlite3 connection. Returns the rows."""
+    plan = explain(conn, sql)
+    started = time.perf_counter()
+    try:
+        rows = conn.execute(sql).fetchall()
+    except sqlite3.Error as e:
+        recorder.record(sql, time.perf_counter() - started, None, plan, source, cell, error=str(e))
+        return None
+    recorder.record(sql, time.perf_counter() - started, len(rows), plan, source, cell)
+    return rows
+
+
+def profile_lessons(db_path=DEFAULT_DB, names=QUERY_LESSONS, stats_path=STATS_DB, in_place=False):
+    """Replay the %%sql cells of the lessons, recording every statement.
+
+    Runs on a temporary copy of `db_path` unless `in_place` is set, since
+    the lessons create, fill and drop tables. Returns the number of
+    statements recorded.
+    """
+    path = db_path
+    if not in_place:
+        path = os.path.join(tempfile.mkdtemp(prefix="sql101_profile_"), os.path.basename(db_path))
+        shutil.copyfile(db_path, path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    recorder = StatsRecorder(stats_path)
+    count = 0
+    try:
+        for name in names:
+            for cell, sql in sql_cells(lesson_path(name)):
+                for statement in split_statements(sql):
+                    profile_statement(conn, statement, recorder, name, cell)
+                    count += 1
+    finally:
+        conn.close()
+        recorder.close()
+        if not in_place:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    return count
+
+
+class _Tee(io.StringIO):
+    """Keeps a copy of what is written to `stream`."""
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def write(self, text):
+        self.stream.write(text)
+        return super().write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def install_magic(db_path, stats_path=STATS_DB, source=None, ip=None):
+    """Record every %%sql cell: wall time, rows returned and the plan of each statement.
+
+    Plans are taken on a separate read-only connection to `db_path` right
+    before the cell runs. `source` labels the records (default: the
+    notebook's session name when Jupyter provides one). ipython-sql prints
+    SQL errors and returns None instead of raising: such cells are
+    recorded with the printed message as their error. Returns the recorder.
+    """
+    if ip is None:
+        from IPython import get_ipython
+        ip = get_ipython()
+    recorder = StatsRecorder(stats_path)
+    planner = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    original = ip.magics_manager.magics["cell"]["sql"]
+    original = getattr(original, "__wrapped_sql101_profiler__", original)
+    label = source or os.path.basename(str(ip.user_ns.get("__session__", "notebook")))
+
+    def sql(line, cell="", local_ns=None):
+        text = ip.var_expand(cell)
+        statements = split_statements(text)
+        plan = [detail for statement in statements for detail in explain(planner, statement)]
+        # A successful run returns a result set, except when it goes to variables instead
+        to_variables = "<<" in line or "<<" in cell or getattr(getattr(original, "__self__", None),
+                                                                  "column_local_vars", False)
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(_Tee(sys.stdout)) as printed:
+                result = original(line, cell, local_ns=local_ns)
+        except Exception as e:
+            recorder.record(text, time.perf_counter() - started, None, plan, label, ip.execution_count, str(e))
+            raise
+        wall = time.perf_counter() - started
+        if result is None and statements and not to_variables:
+            # The message follows the " * <connection>" line
+            output = [entry.strip() for entry in printed.getvalue().splitlines() if entry.strip()]
+            error = next((entry for entry in output if not entry.startswith("*")), "no result from %%sql")
+            recorder.record(text, wall, None, plan, label, ip.execution_count, error)
+            return result
+        rows = len(result) if isinstance(result, list) else None
+        recorder.record(text, wall, rows, plan, label, ip.execution_count)
+        return result
+
+    sql.needs_local_scope = True
+    sql.__wrapped_sql101_profiler__ = original
+    ip.register_magic_function(sql, "cell", "sql")
+    return recorder
+
+
+def report(stats_path=STATS_DB, limit=20):
+    """The slowest recorded statements: [(source, cell, runs, avg ms, max ms, rows, full scans, temp B-trees, sql)]."""
+    conn = sqlite3.connect(stats_path)
+    try:
+        conn.execute(STATS_DDL)
+        return conn.execute(
+            """SELECT source, cell, COUNT(*), AVG(wall_ms), MAX(wall_ms), MAX(rows),
+                      MAX(full_scans), MAX(temp_btrees), MIN(normalized)
+               FROM sql101_query_stats
+               WHERE error IS NULL
+               GROUP BY source, cell, normalized
+               ORDER BY AVG(wall_ms) DESC
+               LIMIT ?""",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and explain the lesson queries.")
+    parser.add_argument("command", choices=["run", "report", "clear"])
+    parser.add_argument("lessons", nargs="*", default=QUERY_LESSONS, help=f"default: {' '.join(QUERY_LESSONS)}")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--stats", default=STATS_DB, help="where the records go")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        print(f"Recorded {profile_lessons(args.db, args.lessons, args.stats):,} statements in {args.stats}")
+    elif args.command == "clear":
+        conn = sqlite3.connect(args.stats)
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS sql101_query_stats")
+        conn.close()
+    else:
+        from .benchmarks import print_table
+
+        rows = []
+        for source, cell, runs, avg_ms, max_ms, n_rows, scans, btrees, sql in report(args.stats, args.limit):
+            bound = "; ".join(filter(None, [scans and f"scan {scans}", btrees and f"sort for {btrees}"]))
+            rows.append([source, cell, runs, f"{avg_ms:,.2f}", f"{max_ms:,.2f}", n_rows,
+                         f"SCAN-BOUND ({bound})" if bound else "", sql[:60]])
+        print_table(["lesson", "cell", "runs", "avg ms", "max ms", "rows", "plan", "statement"], rows)
+
+
+if __name__ == "__main__":
+    main()
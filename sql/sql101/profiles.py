@@ -0,0 +1,132 @@
+"""Named connection profiles: mmap, page cache and durability settings per workload.
+
+my_database.db is always opened with SQLite's defaults: a 2 MB page
+cache, no memory mapping, temp tables on disk (unless compiled
+otherwise) and synchronous=FULL. Those suit nobody in particular. Each
+profile here sets mmap_size, cache_size, temp_store, page_size and
+synchronous for one kind of work:
+
+- `analytics`: big scans, joins and sorts (the Select/Join/Group
+  lessons). The file is memory-mapped (up to SQLite's 2 GB limit), so
+  pages are read straight from the OS cache instead of being copied by
+  read() calls, with 8 KB pages and a 64 MB page cache. Sorts and temp
+  B-trees go to temp files: once the OS caches them too, that measured
+  faster for the lesson queries than temp_store=MEMORY, and so did a
+  small page cache rather than a big one.
+- `ingest`: bulk loads (`sql101.loader`, `sql101.customers.sync`). A
+  512 MB page cache keeps the index pages being updated in memory and
+  synchronous=OFF skips the fsyncs (a crash during the load can corrupt
+  the file, so only use it for data you can reload).
+- `low-memory`: small machines or many kernels. A 2 MB page cache, no
+  mmap and temp tables in files, so memory stays flat whatever the query.
+
+page_size only applies to a new, empty database. For an existing file
+`copy_with_page_size` writes a copy with the profile's page size
+(VACUUM INTO); WAL databases can't change it in place at all.
+
+    conn = profiles.connect("my_database.db", "analytics")
+
+Usage from the `sql/` folder:
+
+    python -m sql101.profiles show
+    python -m sql101.profiles copy analytics big.db big_8k.db
+"""
+
+import argparse
+import os
+import sqlite3
+
+from . import DEFAULT_DB
+from .bootstrap import apply_pragmas
+
+# Profile -> PRAGMAs, applied in order (page_size first, so a new file gets it)
+PROFILES = {
+    "analytics": {
+        "page_size": 8192,
+        "mmap_size": 2_147_418_112,  # SQLite's default maximum, ~2 GB
+        "cache_size": -65_536,  # 64 MB
+        "temp_store": "FILE",
+        "synchronous": "NORMAL",
+    },
+    "ingest": {
+        "page_size": 4096,
+        "mmap_size": 0,
+        "cache_size": -524_288,  # 512 MB
+        "temp_store": "MEMORY",
+        "synchronous": "OFF",
+    },
+    "low-memory": {
+        "page_size": 4096,
+        "mmap_size": 0,
+        "cache_size": -2048,  # 2 MB
+        "temp_store": "FILE",
+        "synchronous": "NORMAL",
+    },
+}
+
+
+def pragmas(profile):
+    """The PRAGMAs of `profile` (a name from PROFILES)."""
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}, expected one of {', '.join(PROFILES)}")
+    return dict(PROFILES[profile])
+
+
+def connect(db_path=DEFAULT_DB, profile="analytics", readonly=False, **kwargs):
+    """Open `db_path` with the settings of `profile`.
+
+    `readonly=True` opens the file with mode=ro. Extra keyword arguments
+    go to `sqlite3.connect`.
+    """
+    settings = pragmas(profile)
+    if readonly:
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, **kwargs)
+    apply_pragmas(conn, settings)
+    return conn
+
+
+def current(conn):
+    """{pragma: value} for the settings the profiles set, as the connection has them now."""
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in PROFILES["analytics"]}
+
+
+def copy_with_page_size(source, target, page_size):
+    """Write a compacted copy of `source` with `page_size` byte pages to `target` (VACUUM INTO)."""
+    if os.path.exists(target):
+        raise FileExistsError(target)
+    conn = sqlite3.connect(source)
+    try:
+        conn.execute(f"PRAGMA page_size = {int(page_size)}")
+        conn.execute("VACUUM INTO ?", (target,))
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Connection profiles for my_database.db.")
+    parser.add_argument("command", choices=["show", "copy"])
+    parser.add_argument("profile", nargs="?", choices=list(PROFILES))
+    parser.add_argument("source", nargs="?", help="copy: database to copy")
+    parser.add_argument("target", nargs="?", help="copy: new file with the profile's page size")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    args = parser.parse_args(argv)
+
+    if args.command == "copy":
+        if not (args.profile and args.source and args.target):
+            parser.error("copy needs a profile, a source and a target")
+        copy_with_page_size(args.source, args.target, PROFILES[args.profile]["page_size"])
+        print(f"Wrote {args.target} with {PROFILES[args.profile]['page_size']}-byte pages")
+        return
+    for name in [args.profile] if args.profile else PROFILES:
+        conn = connect(args.db, name, readonly=True)
+        try:
+            settings = ", ".join(f"{pragma}={value}" for pragma, value in current(conn).items())
+        finally:
+            conn.close()
+        print(f"{name}: {settings}")
+
+
+if __name__ == "__main__":
+    main()
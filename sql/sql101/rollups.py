@@ -0,0 +1,244 @@
+"""Trigger-maintained rollup tables for the 3_Group metrics.
+
+Every 3_Group query scans the whole sql_101_transactions_ext table to
+compute COUNT, SUM, AVG and MAX per brand/category, per store_name or per
+product. Here those metrics are kept in small summary tables instead,
+updated by triggers on every INSERT, UPDATE and DELETE against the ext
+table, so a dashboard query reads a few rows rather than the fact table.
+
+Each rollup is kept per group *and per day*:
+
+- Counts and integer sums are stored, never averages, so AVG is always
+  exactly SUM / COUNT of the rows currently in the table, whatever was
+  updated. Money (price_per_unit, tot_spent) is summed in integer cents
+  (`sql101.money.to_cents`), so adding and subtracting rows one at a
+  time can't drift from a fresh GROUP BY the way REAL sums do. Values
+  that aren't whole cents are rounded to cents.
+- Each measure has a count of its non-NULL values, so a group whose
+  values are all NULL reports a NULL SUM and AVG, like SQL does.
+- MAX(transaction_date) survives deletes: it's just the latest day that
+  still has rows (days whose count drops to zero are removed).
+- Date filters like `transaction_date > '2024-06-01'` become a range on
+  the day column, so the filtered 3_Group queries are rollup lookups too.
+
+Group keys and days keep their NULLs. They can't be a primary key, so
+the key is a unique index on `IFNULL(column, x'')`: an empty BLOB never
+equals a text value, so NULL and '' stay separate groups.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.rollups enable --db my_database.db
+    python -m sql101.rollups show brand_category --db my_database.db
+"""
+
+import argparse
+import sqlite3
+
+from . import DEFAULT_DB
+from .indexes import table_exists
+from .money import to_cents
+from .schema import run_script
+
+EXT_TABLE = "sql_101_transactions_ext"
+
+# Rollup name -> group columns, one per 3_Group GROUP BY
+ROLLUPS = {
+    "brand_category": ["brand", "category"],
+    "store": ["store_name"],
+    "product": ["brand", "product_name"],
+}
+
+# Measure column -> what one ext row ({row} = NEW/OLD) adds to it, all integers
+MEASURES = {
+    "nr_transactions": "1",
+    "nr_amount": "{row}.amount IS NOT NULL",
+    "sum_amount": "IFNULL({row}.amount, 0)",
+    "nr_unit_price": "{row}.price_per_unit IS NOT NULL",
+    "sum_unit_price_cents": f"IFNULL({to_cents('{row}.price_per_unit')}, 0)",
+    "nr_tot_spent": "{row}.tot_spent IS NOT NULL",
+    "sum_tot_spent_cents": f"IFNULL({to_cents('{row}.tot_spent')}, 0)",
+}
+
+
+def rollup_table(name):
+    return f"sql101_rollup_{name}"
+
+
+def _keys(name):
+    return ROLLUPS[name] + ["day"]
+
+
+def _key_exprs(name):
+    """The unique key of a rollup: its group columns and day, with NULL as an empty BLOB."""
+    return [f"IFNULL({key}, x'')" for key in _keys(name)]
+
+
+def _ddl(name):
+    table = rollup_table(name)
+    columns = [f"{column} TEXT" for column in ROLLUPS[name]] + ["day DATE"]
+    columns += [f"{measure} INTEGER NOT NULL" for measure in MEASURES]
+    return (f"CREATE TABLE {table} (\n    " + ",\n    ".join(columns) + "\n);\n"
+            f"CREATE UNIQUE INDEX {table}_key ON {table} ({', '.join(_key_exprs(name))});\n")
+
+
+def _add(name, row):
+    """Upsert adding one NEW/OLD row's measures to its group."""
+    table = rollup_table(name)
+    values = [f"{row}.{column}" for column in ROLLUPS[name] + ["transaction_date"]]
+    values += [expr.format(row=row) for expr in MEASURES.values()]
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in MEASURES)
+    return (f"    INSERT INTO {table} ({', '.join(_keys(name) + list(MEASURES))})\n"
+            f"    VALUES ({', '.join(values)})\n"
+            f"    ON CONFLICT ({', '.join(_key_exprs(name))}) DO UPDATE SET {updates};\n")
+
+
+def _subtract(name, row):
+    """Take one NEW/OLD row's measures out of its group, dropping emptied groups."""
+    table = rollup_table(name)
+    match = " AND ".join(f"{key} = IFNULL({row}.{column}, x'')"
+                         for key, column in zip(_key_exprs(name), ROLLUPS[name] + ["transaction_date"]))
+    updates = ", ".join(f"{m} = {m} - ({expr.format(row=row)})" for m, expr in MEASURES.items())
+    return (f"    UPDATE {table} SET {updates}\n    WHERE {match};\n"
+            f"    DELETE FROM {table} WHERE {match} AND nr_transactions = 0;\n")
+
+
+def _triggers(name):
+    prefix = rollup_table(name)
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ins AFTER INSERT ON {EXT_TABLE}\nBEGIN\n"
+        + _add(name, "NEW") + "END;\n"
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_del AFTER DELETE ON {EXT_TABLE}\nBEGIN\n"
+        + _subtract(name, "OLD") + "END;\n"
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_upd AFTER UPDATE ON {EXT_TABLE}\nBEGIN\n"
+        + _subtract(name, "OLD") + _add(name, "NEW") + "END;\n"
+    )
+
+
+def _fresh_sql(name):
+    """The rollup's rows computed with one GROUP BY over the ext table."""
+    groups = ROLLUPS[name] + ["transaction_date"]
+    sums = [f"SUM({expr.format(row=EXT_TABLE)})" for expr in MEASURES.values()]
+    return f"SELECT {', '.join(groups + sums)} FROM {EXT_TABLE} GROUP BY {', '.join(groups)}"
+
+
+def _populate(conn, name):
+    """Recompute one rollup from scratch."""
+    table = rollup_table(name)
+    conn.execute(f"DELETE FROM {table}")
+    conn.execute(f"INSERT INTO {table} ({', '.join(_keys(name) + list(MEASURES))}) {_fresh_sql(name)}")
+
+
+def is_enabled(conn, name=None):
+    """True if the rollup tables (or just `name`) exist."""
+    names = [name] if name else list(ROLLUPS)
+    return all(table_exists(conn, rollup_table(n)) for n in names)
+
+
+def has_triggers(conn):
+    """True if every rollup trigger is in place (rebuilding the ext table drops them)."""
+    expected = {f"{rollup_table(n)}_{op}" for n in ROLLUPS for op in ("ins", "del", "upd")}
+    found = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return expected <= found
+
+
+def enable(conn, names=None):
+    """Create the rollup tables and triggers and fill them from the current ext table.
+
+    Safe to call again: it rebuilds the rollups, which is also how to
+    recover after the ext table was dropped and recreated.
+    """
+    names = names or list(ROLLUPS)
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for name in names:
+            # Dropped first, so a rollup from an older layout is replaced too
+            conn.execute(f"DROP TABLE IF EXISTS {rollup_table(name)}")
+            run_script(conn, _ddl(name))
+            run_script(conn, _triggers(name))
+            _populate(conn, name)
+
+
+def disable(conn):
+    """Drop the rollup triggers and tables."""
+    with conn:
+        for name in ROLLUPS:
+            for op in ("ins", "del", "upd"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {rollup_table(name)}_{op}")
+            conn.execute(f"DROP TABLE IF EXISTS {rollup_table(name)}")
+
+
+def metrics_sql(name, start=None, end=None):
+    """SQL (and parameters) for the 3_Group metrics of one rollup.
+
+    `start` and `end` are inclusive 'YYYY-MM-DD' bounds on transaction_date;
+    `transaction_date > '2024-06-01'` is `start='2024-06-02'`.
+    """
+    groups = ROLLUPS[name]
+    where, params = [], []
+    if start:
+        where.append("day >= ?")
+        params.append(start)
+    if end:
+        where.append("day <= ?")
+        params.append(end)
+    select = groups + [
+        "SUM(nr_transactions) AS nr_transactions",
+        "CASE WHEN SUM(nr_amount) > 0 THEN SUM(sum_amount) END AS total_units_sold",
+        "CASE WHEN SUM(nr_tot_spent) > 0 THEN SUM(sum_tot_spent_cents) / 100.0 END AS sum_tot",
+        # One division of exact integers: the correctly rounded average
+        "SUM(sum_unit_price_cents) / (100.0 * NULLIF(SUM(nr_unit_price), 0)) AS avg_unit_price",
+        "SUM(sum_tot_spent_cents) / (100.0 * NULLIF(SUM(nr_tot_spent), 0)) AS avg_tot_spent",
+        "MAX(day) AS last_transaction",
+    ]
+    sql = (f"SELECT {', '.join(select)}\nFROM {rollup_table(name)}\n"
+           + (f"WHERE {' AND '.join(where)}\n" if where else "")
+           + f"GROUP BY {', '.join(groups)}\nORDER BY {', '.join(groups)}")
+    return sql, params
+
+
+def metrics(conn, name, start=None, end=None):
+    """Run `metrics_sql` and return the rows."""
+    sql, params = metrics_sql(name, start, end)
+    return conn.execute(sql, params).fetchall()
+
+
+def check(conn, name):
+    """Compare a rollup with the same GROUP BY run straight over the ext table.
+
+    Every measure is an integer, so the comparison is exact. Returns the
+    number of mismatching groups, counted both ways (0 = consistent).
+    """
+    stored = f"SELECT {', '.join(_keys(name) + list(MEASURES))} FROM {rollup_table(name)}"
+    fresh = _fresh_sql(name)
+    missing = conn.execute(f"SELECT COUNT(*) FROM ({fresh} EXCEPT {stored})").fetchone()[0]
+    extra = conn.execute(f"SELECT COUNT(*) FROM ({stored} EXCEPT {fresh})").fetchone()[0]
+    return missing + extra
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain rollup tables for the 3_Group metrics.")
+    parser.add_argument("command", choices=["enable", "disable", "show"])
+    parser.add_argument("name", nargs="?", choices=list(ROLLUPS), default="brand_category")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--start", help="first transaction_date to include (inclusive)")
+    parser.add_argument("--end", help="last transaction_date to include (inclusive)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "enable":
+            enable(conn)
+            print(f"Rollups enabled: {', '.join(rollup_table(n) for n in ROLLUPS)}")
+        elif args.command == "disable":
+            disable(conn)
+            print("Rollups dropped")
+        else:
+            for row in metrics(conn, args.name, args.start, args.end):
+                print(row)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
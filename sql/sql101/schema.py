@@ -0,0 +1,110 @@
+"""DDL for the sql_101_* star schema.
+
+`TABLES` is exactly what 0_Tables creates. `KEYED_TABLES` is the same
+schema with primary keys on the id columns (see `sql101.indexes`).
+"""
+
+import re
+import sqlite3
+
+STORE_DDL = """CREATE TABLE sql_101_store (
+    store_id INT,
+    store_name TEXT,
+    store_location TEXT,
+    store_manager TEXT,
+    store_open_date DATE,
+    store_phone TEXT
+)"""
+
+PRODUCT_DDL = """CREATE TABLE sql_101_product (
+    sku_id INT,
+    product_name TEXT,
+    category TEXT,
+    sub_category TEXT,
+    brand TEXT,
+    list_price DECIMAL(10, 2)
+)"""
+
+TRANSACTIONS_DDL = """CREATE TABLE sql_101_transactions (
+    transaction_id INT,
+    transaction_date DATE,
+    customer_id INT,
+    amount INT,
+    price_per_unit DECIMAL(10, 2),
+    sku_id INT,
+    store_id INT
+)"""
+
+# Table name -> CREATE statement, dimensions first
+TABLES = {
+    "sql_101_store": STORE_DDL,
+    "sql_101_product": PRODUCT_DDL,
+    "sql_101_transactions": TRANSACTIONS_DDL,
+}
+
+# Same tables, with INTEGER PRIMARY KEY ids: the id becomes the rowid, so
+# lookups and joins on it are a single B-tree search and duplicates are rejected
+KEYED_TABLES = {
+    "sql_101_store": STORE_DDL.replace("store_id INT,", "store_id INTEGER PRIMARY KEY,"),
+    "sql_101_product": PRODUCT_DDL.replace("sku_id INT,", "sku_id INTEGER PRIMARY KEY,"),
+    "sql_101_transactions": TRANSACTIONS_DDL.replace("transaction_id INT,", "transaction_id INTEGER PRIMARY KEY,"),
+}
+
+# The id column of each table
+KEY_COLUMNS = {
+    "sql_101_store": "store_id",
+    "sql_101_product": "sku_id",
+    "sql_101_transactions": "transaction_id",
+}
+
+# Column names per table, in declaration order
+COLUMNS = {
+    "sql_101_store": ["store_id", "store_name", "store_location", "store_manager", "store_open_date", "store_phone"],
+    "sql_101_product": ["sku_id", "product_name", "category", "sub_category", "brand", "list_price"],
+    "sql_101_transactions": ["transaction_id", "transaction_date", "customer_id", "amount", "price_per_unit", "sku_id", "store_id"],
+}
+
+
+def create_tables(conn, drop=True, keys=False):
+    """Create the three sql_101_* tables, dropping old copies first by default.
+
+    With `keys=True` the tables get primary keys on their id columns.
+    """
+    for name, ddl in (KEYED_TABLES if keys else TABLES).items():
+        if drop:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+        conn.execute(ddl)
+
+
+def split_statements(script):
+    """Split SQL text into single statements, keeping trigger bodies and string literals intact.
+
+    A `;` ends a statement only where `sqlite3.complete_statement` agrees.
+    Pieces with nothing but comments (e.g. after the last `;`) are dropped.
+    """
+    statements = []
+    start = 0
+    position = script.find(";")
+    while position != -1:
+        if sqlite3.complete_statement(script[start:position + 1]):
+            statements.append(script[start:position + 1])
+            start = position + 1
+        position = script.find(";", position + 1)
+    statements.append(script[start:])
+    return [s.strip() for s in statements if _has_code(s)]
+
+
+def _has_code(sql):
+    """False for text that is only whitespace, comments and semicolons."""
+    return bool(re.sub(r"--[^\n]*|/\*.*?(?:\*/|$)|\s|;", "", sql, flags=re.DOTALL))
+
+
+def run_script(conn, script):
+    """Execute a multi-statement DDL script one statement at a time.
+
+    Unlike `conn.executescript`, this doesn't COMMIT first, so the script
+    runs inside the caller's transaction. Statements are split with
+    `split_statements`, which keeps trigger bodies intact.
+    """
+    for statement in split_statements(script):
+        conn.execute(statement)
@@ -0,0 +1,219 @@
+"""FTS5 full-text search over product_name, brand and category.
+
+Product lookups in the lessons are `substr(product_name, 1, 5)`,
+`brand || ' ' || product_name` (1_Select cells 36-38), exact
+`product_name = '...'` filters and, for anything fuzzier, `LIKE '%...%'`.
+None of them can use a B-tree index, so every search scans the table.
+
+This module keeps FTS5 indexes next to the tables instead:
+
+- `product`: sql_101_product, searched for sku_ids.
+- `ext`: the denormalized sql_101_transactions_ext, searched for
+  transaction_ids, or used as a filter in 3_Group style aggregates
+  (`filter_sql`).
+
+The indexes are contentless (`content=''`): they hold only the tokens,
+keyed by the row's id as FTS5 rowid, so a search returns ids without
+touching the table and no text is stored twice. Triggers on the table
+add, remove and re-index rows on INSERT, DELETE and UPDATE. Rebuilding
+the ext table with `sql101.ext` rebuilds its index too, and
+`sql101.indexes.add_keys` keeps the triggers. If they are gone anyway
+(e.g. 0_Tables recreated the table), `search` raises instead of
+returning stale ids: `enable` again.
+
+FTS5 writes its pending tokens out at the end of every statement that
+fires a trigger, so rows inserted one statement at a time (executemany)
+cost around 100x more than without the index. One INSERT ... SELECT,
+like the ext refresh, pays it once for all its rows.
+
+Queries use the FTS5 syntax: terms are ANDed, `Fusill*` is a prefix,
+`brand: Berillo` limits a term to a column, `"Spaghetti N5"` is a
+phrase. With `raw=False`, `search` quotes every term of plain user text
+first, keeping a trailing `*`, so stray punctuation can't break it.
+Tokens are whole words: `Fusill*` finds Fusilli and Fusilloni, but
+unlike `LIKE '%usill%'` nothing matches in the middle of a word.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.search enable --db my_database.db
+    python -m sql101.search query "Berillo pasta"
+    python -m sql101.search query "Fusill*" --index ext --limit 10
+"""
+
+import argparse
+import sqlite3
+
+from . import DEFAULT_DB
+from .indexes import duplicate_keys, table_exists
+from .schema import run_script
+
+COLUMNS = ["product_name", "brand", "category"]
+
+# Index name -> (table, id column used as the FTS5 rowid)
+INDEXES = {
+    "product": ("sql_101_product", "sku_id"),
+    "ext": ("sql_101_transactions_ext", "transaction_id"),
+}
+
+
+def fts_table(name):
+    """The FTS5 table behind index `name`."""
+    return f"sql101_{name}_fts"
+
+
+def _ddl(name):
+    table, key = INDEXES[name]
+    fts = fts_table(name)
+    columns = ", ".join(COLUMNS)
+    new = ", ".join(f"new.{column}" for column in COLUMNS)
+    old = ", ".join(f"old.{column}" for column in COLUMNS)
+    # A contentless index forgets a row when given the values it was indexed with
+    delete = (f"INSERT INTO {fts} ({fts}, rowid, {columns}) "
+              f"SELECT 'delete', old.{key}, {old} WHERE old.{key} IS NOT NULL;")
+    insert = f"INSERT INTO {fts} (rowid, {columns}) SELECT new.{key}, {new} WHERE new.{key} IS NOT NULL;"
+    return f"""
+CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='');
+CREATE TRIGGER {fts}_ins AFTER INSERT ON {table}
+BEGIN
+    {insert}
+END;
+CREATE TRIGGER {fts}_del AFTER DELETE ON {table}
+BEGIN
+    {delete}
+END;
+CREATE TRIGGER {fts}_upd AFTER UPDATE ON {table}
+BEGIN
+    {delete}
+    {insert}
+END;
+"""
+
+
+def _trigger_names(name):
+    return [f"{fts_table(name)}_{op}" for op in ("ins", "del", "upd")]
+
+
+def _drop(conn, name):
+    for trigger in _trigger_names(name):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute(f"DROP TABLE IF EXISTS {fts_table(name)}")
+
+
+def is_enabled(conn, name):
+    """True if index `name` exists and the triggers keeping it up to date are on its table."""
+    if not table_exists(conn, fts_table(name)):
+        return False
+    found = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (INDEXES[name][0],))}
+    return set(_trigger_names(name)) <= found
+
+
+def enable(conn, names=None):
+    """(Re)build the FTS5 indexes `names` (default: every one whose table exists) and their triggers.
+
+    Safe to call again, which is also how to recover after the table was
+    dropped and recreated. The ids must be unique: a ValueError names
+    duplicates.
+    """
+    names = names or [name for name, (table, _) in INDEXES.items() if table_exists(conn, table)]
+    for name in names:
+        table, key = INDEXES[name]
+        if not table_exists(conn, table):
+            raise ValueError(f"{table} doesn't exist" + (" (build it with sql101.ext)" if name == "ext" else ""))
+        duplicates = duplicate_keys(conn, table, key)
+        if duplicates:
+            raise ValueError(f"{table}.{key} has duplicate ids (id, count): {duplicates}")
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        for name in names:
+            table, key = INDEXES[name]
+            _drop(conn, name)
+            run_script(conn, _ddl(name))
+            conn.execute(f"INSERT INTO {fts_table(name)} (rowid, {', '.join(COLUMNS)}) "
+                         f"SELECT {key}, {', '.join(COLUMNS)} FROM {table} WHERE {key} IS NOT NULL")
+    return names
+
+
+def disable(conn, names=None):
+    """Drop the FTS5 indexes and their triggers."""
+    with conn:
+        for name in names or list(INDEXES):
+            _drop(conn, name)
+
+
+def to_query(text):
+    """An FTS5 query matching every whitespace-separated term of `text`; a trailing * keeps a prefix."""
+    terms = []
+    for term in text.split():
+        star = "*" if term.endswith("*") else ""
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"{star}')
+    return " ".join(terms)
+
+
+def search(conn, text, name="product", limit=None, ranked=False, raw=False):
+    """Ids (sku_id for product, transaction_id for ext) of the rows matching `text`.
+
+    Ids come in ascending order, or best match first (bm25) with
+    `ranked=True`, which has to score every match before the `limit`.
+    `raw=True` passes `text` to FTS5 as a query of its own. Raises
+    sqlite3.OperationalError when the index or its triggers are missing.
+    """
+    if not is_enabled(conn, name):
+        raise sqlite3.OperationalError(f"the {name!r} search index is missing or no longer kept up to date "
+                                       f"(its triggers are gone): run sql101.search enable")
+    query = text if raw else to_query(text)
+    if not query:
+        return []
+    fts = fts_table(name)
+    sql = f"SELECT rowid FROM {fts} WHERE {fts} MATCH ?" + (" ORDER BY rank" if ranked else "")
+    params = [query]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [row[0] for row in conn.execute(sql, params)]
+
+
+def filter_sql(name="ext"):
+    """A WHERE condition with one `?` for the query: the rows of index `name`'s table that match.
+
+        conn.execute(f"SELECT SUM(tot_spent) FROM sql_101_transactions_ext WHERE {filter_sql()}",
+                     (to_query("Berillo pasta"),))
+    """
+    key = INDEXES[name][1]
+    fts = fts_table(name)
+    return f"{key} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over product_name, brand and category.")
+    parser.add_argument("command", choices=["enable", "disable", "query"])
+    parser.add_argument("text", nargs="?", help="what to search for")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--index", choices=list(INDEXES), help="default: product for query, all for enable")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--ranked", action="store_true", help="best match first")
+    parser.add_argument("--raw", action="store_true", help="TEXT is an FTS5 query")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "enable":
+            names = enable(conn, [args.index] if args.index else None)
+            print(f"Full-text indexes built: {', '.join(fts_table(name) for name in names)}")
+        elif args.command == "disable":
+            disable(conn, [args.index] if args.index else None)
+        else:
+            if not args.text:
+                parser.error("query needs the text to search for")
+            name = args.index or "product"
+            ids = search(conn, args.text, name, args.limit, args.ranked, args.raw)
+            print(f"{INDEXES[name][1]}: {', '.join(map(str, ids)) or '(no match)'}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""HyperLogLog sketches for approximate distinct counts.
+
+1_Select cells 28, 29 and 32 (`SELECT DISTINCT sku_id`, `DISTINCT
+customer_id, sku_id`, `DISTINCT customer_id ... WHERE sku_id = 1`) sort
+or hash the whole fact table, which gets slow as it grows. This module
+keeps HyperLogLog sketches of sql_101_transactions instead:
+
+- per store_id: distinct customers, SKUs and (customer, SKU) pairs,
+- per sku_id: distinct customers,
+- per day (transaction_date): distinct customers, SKUs and pairs.
+
+A sketch is 2**precision one-byte registers (4 KB at the default and
+minimum precision 12) stored as a BLOB in `sql101_hll`. Sketches merge by taking
+the register-wise max, so any set of stores, SKUs or days is answered by
+merging their sketches: all stores together give the whole table. The
+estimate has a standard error of 1.04 / sqrt(2**precision) (1.6% at
+precision 12), whatever the table size, in constant memory.
+
+New rows are picked up on insert: a trigger queues their keys in
+`sql101_hll_pending` (plain SQL, so it works from any connection) and
+`refresh` folds the queue into the sketches, which `estimate` does
+first. Sketches only grow: deleted or updated rows stay counted until
+the next `build`. With `exact=True`, `estimate` runs the COUNT(DISTINCT)
+on the table instead.
+
+Needs NumPy (`pip install numpy`). Usage from the `sql/` folder:
+
+    python -m sql101.sketches build --db my_database.db
+    python -m sql101.sketches estimate customers --by sku --keys 1
+"""
+
+import argparse
+import math
+import sqlite3
+
+try:
+    import numpy as np
+except ImportError as exc:
+    raise ImportError("sql101.sketches needs NumPy: pip install numpy") from exc
+
+from . import DEFAULT_DB
+from .schema import run_script
+
+FACT_TABLE = "sql_101_transactions"
+DEFAULT_PRECISION = 12
+# The ranks are read from 64 - precision hash bits through float64, exact up to 52 bits
+MIN_PRECISION = 12
+# Keys per `key IN (...)` when reading the stored sketches of a chunk
+KEY_BATCH = 500
+
+# Metric -> the columns whose distinct values (or combinations) it counts
+METRICS = {
+    "customers": ["customer_id"],
+    "skus": ["sku_id"],
+    "customer_skus": ["customer_id", "sku_id"],
+}
+
+# Dimension -> (group column, metrics kept per group)
+DIMENSIONS = {
+    "store": ("store_id", ["customers", "skus", "customer_skus"]),
+    "sku": ("sku_id", ["customers"]),
+    "day": ("transaction_date", ["customers", "skus", "customer_skus"]),
+}
+
+QUEUED = ["store_id", "sku_id", "customer_id", "transaction_date"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sql101_hll (
+    dimension TEXT NOT NULL,
+    key NOT NULL,
+    metric TEXT NOT NULL,
+    registers BLOB NOT NULL,
+    PRIMARY KEY (dimension, key, metric)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sql101_hll_pending ({', '.join(QUEUED)});
+CREATE TRIGGER IF NOT EXISTS sql101_hll_ins AFTER INSERT ON {FACT_TABLE}
+BEGIN
+    INSERT INTO sql101_hll_pending VALUES ({', '.join(f'NEW.{column}' for column in QUEUED)});
+END;
+"""
+
+
+def relative_error(precision=DEFAULT_PRECISION):
+    """Standard error of a HyperLogLog estimate with 2**precision registers."""
+    return 1.04 / math.sqrt(2 ** precision)
+
+
+def _hash(values):
+    """splitmix64 of a uint64 array."""
+    with np.errstate(over="ignore"):
+        x = values + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _register_ranks(hashes, precision):
+    """(register index, rank) per hash: the top `precision` bits pick the
+    register, the rank is 1 + the leading zeros of the remaining bits."""
+    rest_bits = 64 - precision
+    index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    # rest < 2**52 is exact as a float64, and frexp's exponent is its bit length
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    return index, (rest_bits - bit_length + 1).astype(np.uint8)
+
+
+def _metric_values(metric, columns):
+    """uint64 values to hash for `metric` and a mask of the rows where they aren't NULL."""
+    arrays = [columns[name] for name in METRICS[metric]]
+    valid = np.ones(len(arrays[0]), dtype=bool)
+    for array in arrays:
+        valid &= array != None  # noqa: E711 (elementwise on object arrays)
+    values = np.zeros(len(arrays[0]), dtype=np.uint64)
+    for array in arrays:
+        ints = np.where(valid, array, 0).astype(np.int64).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            values = (values << np.uint64(32)) ^ ints
+    return values, valid
+
+
+def empty(precision=DEFAULT_PRECISION):
+    return np.zeros(2 ** precision, dtype=np.uint8)
+
+
+def count(registers):
+    """HyperLogLog estimate of the distinct values added to `registers`."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Small range: linear counting on the empty registers is more accurate
+        estimate = m * math.log(m / zeros)
+    return estimate
+
+
+def _fold(conn, rows, precision):
+    """Merge the sketches of `rows` (tuples in QUEUED order) into sql101_hll."""
+    if not rows:
+        return
+    table = np.array(rows, dtype=object)
+    columns = {name: table[:, i] for i, name in enumerate(QUEUED)}
+    size = 2 ** precision
+    for dimension, (group_column, metrics) in DIMENSIONS.items():
+        has_group = columns[group_column] != None  # noqa: E711
+        for metric in metrics:
+            values, valid = _metric_values(metric, columns)
+            valid &= has_group
+            if not valid.any():
+                continue
+            keys, codes = np.unique(columns[group_column][valid], return_inverse=True)
+            index, ranks = _register_ranks(_hash(values[valid]), precision)
+            registers = np.zeros(len(keys) * size, dtype=np.uint8)
+            np.maximum.at(registers, codes * size + index, ranks)
+            registers = registers.reshape(len(keys), size)
+            keys = keys.tolist()
+            # Only the chunk's groups: a chunk of one day's rows reads one day's sketches
+            for start in range(0, len(keys), KEY_BATCH):
+                batch = keys[start:start + KEY_BATCH]
+                stored = dict(conn.execute(
+                    f"SELECT key, registers FROM sql101_hll WHERE dimension = ? AND metric = ? "
+                    f"AND key IN ({', '.join('?' * len(batch))})", [dimension, metric] + batch))
+                updates = []
+                for key, new in zip(batch, registers[start:start + KEY_BATCH]):
+                    if key in stored:
+                        new = np.maximum(new, np.frombuffer(stored[key], dtype=np.uint8))
+                    updates.append((dimension, key, metric, new.tobytes()))
+                conn.executemany("INSERT OR REPLACE INTO sql101_hll VALUES (?, ?, ?, ?)", updates)
+
+
+def precision_of(conn):
+    """The precision the stored sketches were built with (None if there are none)."""
+    row = conn.execute("SELECT length(registers) FROM sql101_hll LIMIT 1").fetchone()
+    return int(math.log2(row[0])) if row else None
+
+
+def is_enabled(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sql101_hll_ins'").fetchone() is not None
+
+
+def build(conn, precision=DEFAULT_PRECISION, chunk_size=500_000):
+    """(Re)build every sketch from the fact table and install the insert trigger.
+
+    Raises ValueError for a precision under MIN_PRECISION (12).
+    """
+    if precision < MIN_PRECISION:
+        raise ValueError(f"precision must be at least {MIN_PRECISION}, got {precision}")
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        run_script(conn, SCHEMA)
+        conn.execute("DELETE FROM sql101_hll")
+        conn.execute("DELETE FROM sql101_hll_pending")
+        cursor = conn.execute(f"SELECT {', '.join(QUEUED)} FROM {FACT_TABLE}")
+        while rows := cursor.fetchmany(chunk_size):
+            _fold(conn, rows, precision)
+
+
+def refresh(conn, chunk_size=500_000):
+    """Fold the rows queued by the insert trigger into the sketches; returns how many there were."""
+    precision = precision_of(conn) or DEFAULT_PRECISION
+    folded = 0
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        cursor = conn.execute(f"SELECT {', '.join(QUEUED)} FROM sql101_hll_pending")
+        while rows := cursor.fetchmany(chunk_size):
+            _fold(conn, rows, precision)
+            folded += len(rows)
+        conn.execute("DELETE FROM sql101_hll_pending")
+    return folded
+
+
+def drop(conn):
+    with conn:
+        conn.execute("DROP TRIGGER IF EXISTS sql101_hll_ins")
+        conn.execute("DROP TABLE IF EXISTS sql101_hll")
+        conn.execute("DROP TABLE IF EXISTS sql101_hll_pending")
+
+
+def _where(keys, start, end):
+    """WHERE clause (with a {column} placeholder) and parameters selecting groups by key."""
+    conditions, params = [], []
+    if keys is not None:
+        conditions.append(f"{{column}} IN ({', '.join('?' * len(keys))})")
+        params += list(keys)
+    if start is not None:
+        conditions.append("{column} >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("{column} <= ?")
+        params.append(end)
+    return " AND ".join(conditions), params
+
+
+def exact_count(conn, metric, dimension=None, keys=None, start=None, end=None):
+    """The exact COUNT(DISTINCT ...) that a sketch estimate approximates."""
+    columns = METRICS[metric]
+    where, params = _where(keys, start, end)
+    conditions = [f"{column} IS NOT NULL" for column in columns]
+    if dimension:
+        group_column = DIMENSIONS[dimension][0]
+        conditions.append(f"{group_column} IS NOT NULL")
+        if where:
+            conditions.append(where.format(column=group_column))
+    sql = (f"SELECT COUNT(*) FROM (SELECT DISTINCT {', '.join(columns)} FROM {FACT_TABLE} "
+           f"WHERE {' AND '.join(conditions)})")
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def merged(conn, metric, dimension="day", keys=None, start=None, end=None):
+    """The union sketch of the selected groups (every group when no keys or bounds are given)."""
+    group_metrics = DIMENSIONS[dimension][1]
+    if metric not in group_metrics:
+        raise ValueError(f"{dimension} sketches only count {', '.join(group_metrics)}")
+    where, params = _where(keys, start, end)
+    sql = "SELECT registers FROM sql101_hll WHERE dimension = ? AND metric = ?"
+    if where:
+        sql += " AND " + where.format(column="key")
+    registers = empty(precision_of(conn) or DEFAULT_PRECISION)
+    for (blob,) in conn.execute(sql, [dimension, metric] + params):
+        np.maximum(registers, np.frombuffer(blob, dtype=np.uint8), out=registers)
+    return registers
+
+
+def estimate(conn, metric, dimension=None, keys=None, start=None, end=None, exact=False):
+    """Distinct `metric` values over the selected groups of `dimension` (default: the whole table).
+
+    `keys` selects groups by value (store_id / sku_id / transaction_date),
+    `start` and `end` are inclusive bounds on them (dates, for "day").
+    Returns a dict with the `estimate`, its `relative_error` (one standard
+    error) and the `low`-`high` range of two standard errors; with
+    `exact=True` the count comes from the table and the error is 0.
+    """
+    if dimension is None and (keys is not None or start is not None or end is not None):
+        dimension = "day"
+    if exact:
+        value = exact_count(conn, metric, dimension, keys, start, end)
+        return {"estimate": value, "relative_error": 0.0, "low": value, "high": value, "exact": True}
+    if not is_enabled(conn):
+        raise RuntimeError("no sketches yet: run sketches.build(conn) first")
+    if conn.execute("SELECT 1 FROM sql101_hll_pending LIMIT 1").fetchone():
+        refresh(conn)
+    # The whole table is the union of the stores: fewer sketches to merge than days
+    registers = merged(conn, metric, dimension or "store", keys, start, end)
+    value = count(registers)
+    error = relative_error(int(math.log2(len(registers))))
+    return {"estimate": round(value), "relative_error": error, "low": math.floor(value * (1 - 2 * error)),
+            "high": math.ceil(value * (1 + 2 * error)), "exact": False}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approximate distinct counts over sql_101_transactions.")
+    parser.add_argument("command", choices=["build", "refresh", "estimate", "drop"])
+    parser.add_argument("metric", nargs="?", choices=list(METRICS), default="customers")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--precision", type=int, default=DEFAULT_PRECISION, help="log2 of the registers per sketch")
+    parser.add_argument("--by", choices=list(DIMENSIONS), help="restrict to some stores, SKUs or days")
+    parser.add_argument("--keys", nargs="+", help="store_id / sku_id / transaction_date values")
+    parser.add_argument("--start", help="first key to include (inclusive)")
+    parser.add_argument("--end", help="last key to include (inclusive)")
+    parser.add_argument("--exact", action="store_true", help="count on the table instead")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "build":
+            build(conn, args.precision)
+            print(f"Sketches built (precision {args.precision}, +/-{relative_error(args.precision):.1%})")
+        elif args.command == "refresh":
+            print(f"Folded {refresh(conn):,} new rows")
+        elif args.command == "drop":
+            drop(conn)
+        else:
+            keys = args.keys
+            if keys and args.by in ("store", "sku"):
+                keys = [int(key) for key in keys]
+            result = estimate(conn, args.metric, args.by, keys, args.start, args.end, args.exact)
+            if result["exact"]:
+                print(f"{args.metric}: {result['estimate']:,} (exact)")
+            else:
+                print(f"{args.metric}: ~{result['estimate']:,} (+/-{result['relative_error']:.1%}, "
+                      f"95% between {result['low']:,} and {result['high']:,})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Tiny helpers for timing queries in the benchmark scripts."""
+
+import math
+import statistics
+import time
+
+
+def run_query(conn, sql, params=()):
+    """Execute `sql` and fetch every row, returning the row count."""
+    return len(conn.execute(sql, params).fetchall())
+
+
+def time_call(func, repeat=5, warmup=1):
+    """Call `func()` `warmup` + `repeat` times and summarize the timed runs.
+
+    Returns a dict with the median, p95, min and max seconds plus the last result.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median": statistics.median(timings),
+        "p95": percentile(timings, 95),
+        "min": min(timings),
+        "max": max(timings),
+        "result": result,
+    }
+
+
+def time_query(conn, sql, params=(), repeat=5, warmup=1):
+    """Time a full execute + fetchall of `sql` (see `time_call`)."""
+    return time_call(lambda: run_query(conn, sql, params), repeat, warmup)
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:,.2f} ms"
+
+
+def percentile(values, pct):
+    """The `pct`-th percentile (0-100) of `values`, nearest-rank."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
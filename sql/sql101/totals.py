@@ -0,0 +1,142 @@
+"""An indexed tot_spent (amount * price_per_unit) on sql_101_transactions.
+
+1_Select cells 23, 26 and 34 and the 2_Join cell 26 CTAS all recompute
+`amount * price_per_unit`, and `WHERE amount * price_per_unit > 10` or
+`ORDER BY total_price DESC` scan and sort the whole table. Two ways to
+index the product:
+
+- `add_index`: an index on the expression itself. The table and every
+  lesson query stay as they are; SQLite uses the index whenever a query
+  spells the same expression (`amount * price_per_unit`, in that order).
+- `add_column`: a `tot_spent` generated column plus an index on it.
+  STORED (the default) keeps the value on disk; SQLite can't add a
+  stored column with ALTER TABLE, so the table is rebuilt with
+  `indexes.rebuild_table` (copy, drop, rename, keeping its indexes,
+  triggers and views). `stored=False` adds a VIRTUAL column instead,
+  computed on read, in one ALTER TABLE. Either way
+  `SELECT *` now returns tot_spent too, and `rewrite` turns the lesson
+  queries into ones that use it (sql101.ext does that for its own join).
+
+The index pays off for selective filters and top-N sorts (`LIMIT 10`).
+For the lesson's own `> 10` (about 12% of the rows) and the full sort,
+walking the index and fetching every row costs a bit more than the
+plain scan and sort.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.totals index --db my_database.db     # expression index
+    python -m sql101.totals column --db my_database.db    # stored column + index
+    python -m sql101.totals rewrite 1_Select              # the lesson cells, using tot_spent
+    python -m sql101.totals drop --db my_database.db
+"""
+
+import argparse
+import re
+import sqlite3
+
+from . import DEFAULT_DB
+from .indexes import rebuild_table, table_exists
+from .lessons import lesson_path, sql_cells
+
+TABLE = "sql_101_transactions"
+EXPRESSION = "amount * price_per_unit"
+COLUMN = "tot_spent"
+EXPRESSION_INDEX = "sql101_transactions_tot_spent_expr"
+COLUMN_INDEX = "sql101_transactions_tot_spent"
+
+# amount * price_per_unit, optionally qualified (t.amount * t.price_per_unit)
+_PRODUCT = re.compile(r"\b(?:(\w+)\.)?amount\s*\*\s*(?:\1\.)?price_per_unit\b", re.IGNORECASE)
+# The explicit tot_spent that `t.*` already returns once the column exists
+_REDUNDANT = re.compile(r",\s*(?:\w+\.)?tot_spent\s+AS\s+tot_spent\b", re.IGNORECASE)
+
+
+def has_column(conn, table=TABLE):
+    """True if `table` has a tot_spent column (generated columns only show in table_xinfo)."""
+    return any(row[1] == COLUMN for row in conn.execute(f"PRAGMA table_xinfo({table})"))
+
+
+def add_index(conn, table=TABLE):
+    """Index the amount * price_per_unit expression."""
+    with conn:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {EXPRESSION_INDEX} ON {table} ({EXPRESSION})")
+
+
+def _check_table(conn, table):
+    if not table_exists(conn, table):
+        raise ValueError(f"{table} is not a table (a view from sql101.money or sql101.partitions?)")
+
+
+def add_column(conn, table=TABLE, stored=True):
+    """Add tot_spent as a generated column of `table` and index it.
+
+    STORED rebuilds the table inside one transaction, keeping its
+    indexes, triggers and views; VIRTUAL is a plain ALTER TABLE.
+    """
+    _check_table(conn, table)
+    if has_column(conn, table):
+        return
+    definition = f"{COLUMN} GENERATED ALWAYS AS ({EXPRESSION}) {'STORED' if stored else 'VIRTUAL'}"
+    with conn:
+        # Explicit BEGIN so the rebuild steps are atomic too
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        if stored:
+            create = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (table,)).fetchone()[0]
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            body = create[create.index("(") + 1:create.rindex(")")].rstrip()
+            rebuild_table(conn, table, f"CREATE TABLE {table} ({body},\n    {definition}\n)", columns)
+        else:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+        conn.execute(f"CREATE INDEX {COLUMN_INDEX} ON {table} ({COLUMN})")
+
+
+def drop(conn, table=TABLE):
+    """Remove the expression index and the tot_spent column with its index."""
+    with conn:
+        conn.execute(f"DROP INDEX IF EXISTS {EXPRESSION_INDEX}")
+        conn.execute(f"DROP INDEX IF EXISTS {COLUMN_INDEX}")
+        if has_column(conn, table):
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {COLUMN}")
+
+
+def rewrite(sql):
+    """`sql` with amount * price_per_unit replaced by the tot_spent column.
+
+    A `t.*` already returns tot_spent, so an explicit `..., t.tot_spent AS
+    tot_spent` (2_Join cell 26) is dropped rather than duplicated.
+    """
+    sql = _PRODUCT.sub(lambda m: f"{m.group(1)}.{COLUMN}" if m.group(1) else COLUMN, sql)
+    return _REDUNDANT.sub("", sql)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index amount * price_per_unit on sql_101_transactions.")
+    parser.add_argument("command", choices=["index", "column", "drop", "rewrite"])
+    parser.add_argument("lesson", nargs="?", default="1_Select", help="lesson to rewrite")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--virtual", action="store_true", help="a VIRTUAL column instead of a STORED one")
+    args = parser.parse_args(argv)
+
+    if args.command == "rewrite":
+        for cell, sql in sql_cells(lesson_path(args.lesson)):
+            if rewrite(sql) != sql:
+                print(f"-- cell {cell}\n{rewrite(sql).strip()}\n")
+        return
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "index":
+            add_index(conn)
+            print(f"Created {EXPRESSION_INDEX} on {TABLE} ({EXPRESSION})")
+        elif args.command == "column":
+            add_column(conn, stored=not args.virtual)
+            print(f"{TABLE}.{COLUMN} added ({'VIRTUAL' if args.virtual else 'STORED'}) and indexed")
+        else:
+            drop(conn)
+            print("tot_spent index and column dropped")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
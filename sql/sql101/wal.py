@@ -0,0 +1,174 @@
+"""WAL mode and concurrent readers for my_database.db.
+
+With SQLite's default rollback journal, a notebook that runs a DROP/CREATE
+or a big INSERT locks the whole file, and the other kernels' SELECTs fail
+with "database is locked" (or wait, if they set a timeout). In WAL mode
+readers keep reading the last committed version while one writer works,
+and writers never wait for readers.
+
+This module provides:
+
+- `enable(db_path)`: switch the file to WAL (it stays WAL for every
+  connection until switched back with `disable`),
+- `connect(db_path, readonly=False)`: a connection with the WAL profile
+  (`WAL_PRAGMAS`: busy timeout, synchronous=NORMAL); `readonly=True` opens
+  the file read-only, for pure SELECT work,
+- `Checkpointer`: a background thread that checkpoints the WAL file on a
+  schedule, so it doesn't keep growing while readers are busy.
+
+Usage from the `sql/` folder:
+
+    python -m sql101.wal enable --db my_database.db
+    python -m sql101.wal status --db my_database.db
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+
+from . import DEFAULT_DB
+from .bootstrap import apply_pragmas
+
+# Per-connection settings for WAL work. synchronous=NORMAL is safe in WAL
+# mode (a power cut can lose the last commits, never corrupt the file) and
+# avoids an fsync on every commit. Writers wait up to 5 s for each other.
+WAL_PRAGMAS = {
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+}
+
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+def journal_mode(conn):
+    return conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+
+def enable(db_path=DEFAULT_DB):
+    """Switch `db_path` to WAL mode (persistent). Returns the new journal mode."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def disable(db_path=DEFAULT_DB):
+    """Go back to the rollback journal (needs every other connection closed)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def connect(db_path=DEFAULT_DB, readonly=False, pragmas=None, **kwargs):
+    """Open `db_path` with the WAL profile (`WAL_PRAGMAS`, or `pragmas`).
+
+    `readonly=True` opens the file with mode=ro: any write fails right
+    away instead of taking a lock. Extra keyword arguments go to
+    `sqlite3.connect`.
+    """
+    if readonly:
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_path, **kwargs)
+    apply_pragmas(conn, WAL_PRAGMAS if pragmas is None else pragmas)
+    return conn
+
+
+def checkpoint(conn, mode="PASSIVE"):
+    """Run one checkpoint. Returns (busy, wal pages, pages checkpointed).
+
+    PASSIVE copies what it can without waiting for anyone; TRUNCATE also
+    waits for readers and then empties the WAL file.
+    """
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f"mode must be one of {CHECKPOINT_MODES}")
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+
+def wal_size(db_path):
+    """Size of the -wal file in bytes (0 if there's none)."""
+    try:
+        return os.path.getsize(f"{db_path}-wal")
+    except OSError:
+        return 0
+
+
+class Checkpointer:
+    """Checkpoint `db_path` every `interval` seconds from a background thread.
+
+    Checkpoints are PASSIVE, so they never block readers or the writer;
+    when the WAL file has grown past `truncate_above` bytes a TRUNCATE
+    checkpoint is tried instead (it waits up to the busy timeout). Use it
+    as a context manager, or call `start()` and `stop()`.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, interval=30.0, truncate_above=64 * 1024 * 1024):
+        self.db_path = db_path
+        self.interval = interval
+        self.truncate_above = truncate_above
+        self.runs = 0
+        self.last = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, conn):
+        mode = "TRUNCATE" if wal_size(self.db_path) > self.truncate_above else "PASSIVE"
+        self.last = (mode,) + tuple(checkpoint(conn, mode))
+        self.runs += 1
+        return self.last
+
+    def _loop(self):
+        conn = connect(self.db_path)
+        try:
+            while not self._stop.wait(self.interval):
+                self.run_once(conn)
+        finally:
+            conn.close()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sql101-checkpointer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WAL mode for the lesson database.")
+    parser.add_argument("command", choices=["enable", "disable", "status", "checkpoint"])
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--mode", choices=CHECKPOINT_MODES, default="TRUNCATE", help="for `checkpoint`")
+    args = parser.parse_args(argv)
+
+    if args.command == "enable":
+        print(f"journal_mode = {enable(args.db)}")
+    elif args.command == "disable":
+        print(f"journal_mode = {disable(args.db)}")
+    else:
+        conn = connect(args.db)
+        try:
+            if args.command == "checkpoint":
+                busy, pages, done = checkpoint(conn, args.mode)
+                print(f"{args.mode} checkpoint: {done}/{pages} pages copied{' (busy)' if busy else ''}")
+            print(f"journal_mode = {journal_mode(conn)}, WAL file {wal_size(args.db):,} bytes")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
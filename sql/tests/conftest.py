@@ -0,0 +1,29 @@
+"""Shared fixtures: small generated databases in a temporary folder (never my_database.db).
+
+Run from the `sql/` folder with `python -m pytest`.
+"""
+
+import sqlite3
+
+import pytest
+
+from sql101.datagen import generate
+
+
+@pytest.fixture(scope="session")
+def generated(tmp_path_factory):
+    """Path of a scale 2 database (2,000 transactions), built once per session."""
+    path = tmp_path_factory.mktemp("sql101") / "sf2.db"
+    generate(str(path), scale=2, seed=7)
+    return path
+
+
+@pytest.fixture
+def conn(generated, tmp_path):
+    """A connection to a private copy of the generated database."""
+    source = sqlite3.connect(generated)
+    conn = sqlite3.connect(tmp_path / "copy.db")
+    source.backup(conn)
+    source.close()
+    yield conn
+    conn.close()
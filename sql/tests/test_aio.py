@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from sql101 import aio
+
+
+class Connection:
+    """Stands in for a pooled connection and records the interrupts it gets."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.interrupts = 0
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def interrupt(self):
+        self.interrupts += 1
+        self.conn.interrupt()
+
+    def close(self):
+        self.conn.close()
+
+
+def pool(db_path, **options):
+    db = aio.AsyncDB(str(db_path), size=1, **options)
+    db._connections = [Connection(conn) for conn in db._connections]
+    return db, db._connections[0]
+
+
+# Runs for several seconds unless interrupted
+SLOW = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+
+
+def test_timeout_interrupts_the_query(generated):
+    async def main():
+        db, conn = pool(generated)
+        started = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await db.fetch(SLOW, timeout=0.1)
+        assert conn.interrupts == 1
+        assert await db.fetch("SELECT COUNT(*) FROM sql_101_store")
+        await db.close()
+        return time.perf_counter() - started
+
+    assert asyncio.run(main()) < 5
+
+
+def test_cancel_after_completion_does_not_interrupt(generated, monkeypatch):
+    async def main():
+        loop = asyncio.get_running_loop()
+        db, conn = pool(generated)
+        fetch = aio._fetchall
+
+        def fetchall(conn, sql, params):
+            def cancel():
+                # Keep the loop busy until the worker has returned, then cancel
+                time.sleep(0.2)
+                task.cancel()
+            loop.call_soon_threadsafe(cancel)
+            return fetch(conn, sql, params)
+
+        monkeypatch.setattr(aio, "_fetchall", fetchall)
+        task = asyncio.ensure_future(db.fetch("SELECT COUNT(*) FROM sql_101_store"))
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        monkeypatch.setattr(aio, "_fetchall", fetch)
+        assert conn.interrupts == 0
+        rows = await db.fetch("SELECT COUNT(*) FROM sql_101_store")
+        await db.close()
+        return rows
+
+    assert asyncio.run(main())[0][0] > 0
+
+
+def test_close_waits_for_running_queries(generated):
+    async def main():
+        db, _ = pool(generated)
+        running = asyncio.ensure_future(db.fetch("SELECT COUNT(*) FROM sql_101_transactions"))
+        waiting = asyncio.ensure_future(db.fetch("SELECT COUNT(*) FROM sql_101_store"))
+        await asyncio.sleep(0)
+        await db.close()
+        return await asyncio.gather(running, waiting, return_exceptions=True)
+
+    rows, cancelled = asyncio.run(main())
+    assert rows[0][0] > 0
+    assert isinstance(cancelled, asyncio.CancelledError)
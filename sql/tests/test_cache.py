@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from sql101.cache import QueryCache, reads_clock, track_tables
+
+
+def test_write_on_another_connection_invalidates(conn, tmp_path):
+    cache = QueryCache(conn)
+    sql = "SELECT COUNT(*) FROM sql_101_product"
+    before = cache.execute(sql)
+    assert cache.execute("-- again\n" + sql) == before
+    assert cache.stats()["hits"] == 1
+    other = sqlite3.connect(tmp_path / "copy.db")
+    with other:
+        other.execute("DELETE FROM sql_101_product WHERE sku_id = 1")
+    other.close()
+    assert cache.execute(sql) == [(before[0][0] - 1,)]
+
+
+def test_tracked_tables_keep_unrelated_entries(conn):
+    track_tables(conn, ["sql_101_product", "sql_101_store"])
+    cache = QueryCache(conn)
+    products = "SELECT COUNT(*) FROM sql_101_product"
+    stores = "SELECT COUNT(*) FROM sql_101_store"
+    cache.execute(products)
+    cache.execute(stores)
+    with conn:
+        conn.execute("DELETE FROM sql_101_store WHERE rowid = 1")
+    assert cache.get(products) is not None
+    assert cache.get(stores) is None
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT random()",
+    "SELECT sku_id FROM sql_101_product ORDER BY random() LIMIT 1",
+    "SELECT last_insert_rowid()",
+    "SELECT total_changes()",
+    "SELECT CURRENT_TIMESTAMP",
+    "SELECT date('now')",
+    "SELECT julianday('NOW') - julianday(transaction_date) FROM sql_101_transactions",
+    "SELECT datetime()",
+    "SELECT strftime('%Y')",
+    "SELECT date(?)",
+])
+def test_volatile_statements_are_not_cached(conn, sql):
+    cache = QueryCache(conn)
+    params = ("now",) if "?" in sql else ()
+    cache.execute(sql, params)
+    assert cache.stats()["entries"] == 0
+
+
+def test_volatile_view_is_not_cached(conn):
+    with conn:
+        conn.execute("CREATE VIEW today AS SELECT date('now') AS day")
+    cache = QueryCache(conn)
+    cache.execute("SELECT * FROM today")
+    assert cache.stats()["entries"] == 0
+
+
+def test_date_functions_on_data_are_cached(conn):
+    cache = QueryCache(conn)
+    cache.execute("SELECT strftime('%Y', transaction_date), date(transaction_date, '+1 day') "
+                  "FROM sql_101_transactions WHERE customer_id <> 'now'")
+    assert cache.stats()["entries"] == 1
+
+
+def test_reads_clock():
+    assert reads_clock("SELECT date(date('now'), '+1 day')")
+    assert not reads_clock("SELECT date(transaction_date) FROM t WHERE id = ?")
+    assert not reads_clock("SELECT 'date()' FROM t")
+
+
+def test_parameterized_statements_are_cached(conn):
+    cache = QueryCache(conn)
+    sql = "SELECT store_name FROM sql_101_store WHERE store_id = ?"
+    first = cache.execute(sql, (1,))
+    assert cache.execute(sql, (1,)) == first
+    assert cache.stats() == {**cache.stats(), "entries": 1, "hits": 1}
+    cache.execute(sql, (2,))
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,26 @@
+from sql101 import cdc, indexes
+
+
+def test_cdc_survives_add_keys(conn):
+    cdc.enable(conn)
+    indexes.apply(conn)
+    assert cdc.is_enabled(conn)
+    cdc.subscribe(conn, "test")
+    with conn:
+        conn.execute("UPDATE sql_101_product SET product_name = ? WHERE sku_id = 1", (b"\x00\xff",))
+    (change,) = cdc.poll(conn, "test")
+    assert (change["op"], change["key"], change["new"]["product_name"]) == ("U", 1, b"\x00\xff")
+
+
+def test_reals_round_trip(conn):
+    cdc.enable(conn)
+    cdc.subscribe(conn, "test")
+    values = [0.1 + 0.2, 1 / 3, 1e300, 5e-324, 2.5]
+    with conn:
+        conn.executemany("INSERT INTO sql_101_transactions (transaction_id, price_per_unit, amount) "
+                         "VALUES (?, ?, 1)", [(900000 + i, value) for i, value in enumerate(values)])
+        conn.execute("UPDATE sql_101_transactions SET price_per_unit = 0.7 + 0.1 WHERE transaction_id = 900004")
+    changes = cdc.poll(conn, "test")
+    assert [change["new"]["price_per_unit"] for change in changes] == values + [0.7 + 0.1]
+    assert changes[-1]["old"]["price_per_unit"] == 2.5
+    assert changes[0]["new"]["amount"] == 1 and isinstance(changes[0]["new"]["amount"], int)
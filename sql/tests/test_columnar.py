@@ -0,0 +1,28 @@
+import pytest
+
+from sql101 import ext
+from sql101.columnar import ColumnStore
+
+WHERE = [("transaction_date", ">", "2024-06-01")]
+SQL = """SELECT brand, category, COUNT(*), SUM(amount), MIN(price_per_unit), MAX(tot_spent), AVG(tot_spent)
+FROM sql_101_transactions_ext WHERE transaction_date > '2024-06-01'
+GROUP BY brand, category ORDER BY brand, category"""
+
+
+def test_matches_sqlite(conn):
+    ext.refresh(conn)
+    store = ColumnStore.from_sqlite(conn, chunk_size=333)
+    rows = store.aggregate([("count", "*"), ("sum", "amount"), ("min", "price_per_unit"),
+                            ("max", "tot_spent"), ("avg", "tot_spent")],
+                           group_by=["brand", "category"], where=WHERE)
+    expected = conn.execute(SQL).fetchall()
+    assert [row[:6] for row in rows] == [row[:6] for row in expected]
+    assert [row[6] for row in rows] == pytest.approx([row[6] for row in expected], rel=1e-12)
+
+
+def test_no_group_by_returns_one_row(conn):
+    ext.refresh(conn)
+    store = ColumnStore.from_sqlite(conn)
+    assert store.aggregate([("count", "*"), ("sum", "amount")], where=[("transaction_date", ">", "9999")]) \
+        == [conn.execute("SELECT COUNT(*), SUM(amount) FROM sql_101_transactions_ext "
+                         "WHERE transaction_date > '9999'").fetchone()]
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+from sql101 import customers
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = sqlite3.connect(tmp_path / "customers.db")
+    customers.prepare(conn)
+    yield conn
+    conn.close()
+
+
+def test_sync_stats(db):
+    first = customers.sync(db, [(1, "Ann", 30, None), (2, "Bob", 40, "bob@example.com")])
+    assert (first["inserted"], first["updated"], first["unchanged"]) == (2, 0, 0)
+    second = customers.sync(db, [(1, "Ann", 31, None), (2, "Bob", 40, "bob@example.com"), (3, "Cy", 20, None)])
+    assert (second["rows"], second["inserted"], second["updated"], second["unchanged"]) == (3, 1, 1, 1)
+    assert customers.missing_emails(db) == [1, 3]
+
+
+def test_prepare_refuses_null_ids(tmp_path):
+    conn = sqlite3.connect(tmp_path / "lesson.db")
+    conn.execute("CREATE TABLE hkt_sql_customers (customer_id INT, customer_name TEXT, customer_age INT)")
+    conn.execute("INSERT INTO hkt_sql_customers VALUES (NULL, 'Ann', 30)")
+    conn.commit()
+    with pytest.raises(sqlite3.IntegrityError, match="NULL"):
+        customers.prepare(conn)
+    conn.close()
+
+
+def test_prepare_keys_a_lesson_table_behind_a_view(tmp_path):
+    conn = sqlite3.connect(tmp_path / "lesson.db")
+    conn.execute("CREATE TABLE hkt_sql_customers (customer_id INT, customer_name TEXT, customer_age INT)")
+    conn.execute("INSERT INTO hkt_sql_customers VALUES (2, 'Bob', 40), (1, 'Ann', 30)")
+    conn.execute("CREATE VIEW adults AS SELECT customer_name FROM hkt_sql_customers WHERE customer_age >= 18")
+    conn.commit()
+    customers.prepare(conn)
+    assert customers.sync(conn, [(3, "Cy", 20, None)])["inserted"] == 1
+    assert conn.execute("SELECT * FROM adults ORDER BY 1").fetchall() == [("Ann",), ("Bob",), ("Cy",)]
+    conn.close()
@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from sql101.datagen import generate, main
+
+TABLES = ["sql_101_product", "sql_101_store", "sql_101_transactions"]
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall() for table in TABLES}
+    finally:
+        conn.close()
+
+
+def test_same_seed_same_rows(tmp_path):
+    generate(str(tmp_path / "a.db"), scale=1, seed=3)
+    generate(str(tmp_path / "b.db"), scale=1, seed=3, batch_size=77, rows_per_transaction=500)
+    assert dump(tmp_path / "a.db") == dump(tmp_path / "b.db")
+
+
+def test_other_seed_other_rows(tmp_path):
+    generate(str(tmp_path / "a.db"), scale=1, seed=3)
+    generate(str(tmp_path / "b.db"), scale=1, seed=4)
+    assert dump(tmp_path / "a.db")["sql_101_transactions"] != dump(tmp_path / "b.db")["sql_101_transactions"]
+
+
+def test_scale_sets_row_counts(generated):
+    assert len(dump(generated)["sql_101_transactions"]) == 2000
+
+
+def test_the_database_must_be_named():
+    with pytest.raises(TypeError):
+        generate(scale=1)
+    with pytest.raises(SystemExit):
+        main(["--scale", "1"])
@@ -0,0 +1,36 @@
+from sql101 import ext
+
+
+def test_refresh_picks_up_every_kind_of_change(conn):
+    assert ext.refresh(conn)["mode"] == "rebuild"
+    assert ext.check(conn)["ok"]
+    with conn:
+        conn.execute("INSERT INTO sql_101_transactions SELECT transaction_id + 100000, transaction_date, "
+                     "customer_id, amount, price_per_unit, sku_id, store_id FROM sql_101_transactions LIMIT 10")
+        conn.execute("UPDATE sql_101_product SET brand = 'Corrected' WHERE sku_id = 1")
+        conn.execute("UPDATE sql_101_store SET store_name = 'Renamed' WHERE store_id = 2")
+        conn.execute("UPDATE sql_101_transactions SET amount = amount + 1 WHERE transaction_id = 5")
+        conn.execute("DELETE FROM sql_101_transactions WHERE transaction_id = 6")
+    assert not ext.check(conn)["ok"]
+    done = ext.refresh(conn)
+    assert done["mode"] == "incremental"
+    assert done["appended"] == 10
+    assert ext.check(conn)["ok"]
+
+
+def test_lesson_cell_rebuild_is_detected(conn):
+    ext.refresh(conn)
+    with conn:
+        conn.execute(f"DROP TABLE {ext.EXT_TABLE}")
+        conn.execute(f"CREATE TABLE {ext.EXT_TABLE} AS {ext.ext_select(conn)}")
+    assert not ext.is_managed(conn)
+    assert ext.refresh(conn)["mode"] == "rebuild"
+    assert ext.check(conn)["ok"]
+
+
+def test_check_reports_missing_and_extra_rows(conn):
+    ext.rebuild(conn)
+    with conn:
+        conn.execute(f"UPDATE {ext.EXT_TABLE} SET amount = -1 WHERE rowid = 1")
+    result = ext.check(conn)
+    assert (result["missing"], result["extra"], result["ok"]) == (1, 1, False)
@@ -0,0 +1,48 @@
+import pytest
+
+from sql101.hashjoin import Dimension, create_table_as, join_rows
+
+FACT = "SELECT * FROM sql_101_transactions ORDER BY rowid"
+
+
+def sql_join(conn, how):
+    join = "JOIN" if how == "inner" else "LEFT JOIN"
+    return conn.execute(f"SELECT t.*, p.brand, p.product_name FROM sql_101_transactions t "
+                        f"{join} sql_101_product p ON p.sku_id = t.sku_id ORDER BY t.rowid, p.rowid").fetchall()
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test_dense_join_matches_sqlite(conn, how):
+    with conn:
+        # A fact row without a product and one with a NULL key
+        conn.execute("UPDATE sql_101_transactions SET sku_id = 999999 WHERE rowid = 1")
+        conn.execute("UPDATE sql_101_transactions SET sku_id = NULL WHERE rowid = 2")
+    product = Dimension.from_sqlite(conn, "sql_101_product", "sku_id", ["brand", "product_name"])
+    assert product.dense is not None
+    columns, rows = join_rows(conn, FACT, [("sku_id", product, how)], chunk_size=300)
+    assert columns[-2:] == ["brand", "product_name"]
+    assert rows == sql_join(conn, how)
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test_duplicate_keys_yield_a_row_per_match(conn, how):
+    with conn:
+        # The duplicate sku 6 of 2_Join
+        conn.execute("INSERT INTO sql_101_product SELECT * FROM sql_101_product WHERE sku_id = 6")
+        conn.execute("DELETE FROM sql_101_product WHERE sku_id = 7")
+    product = Dimension.from_sqlite(conn, "sql_101_product", "sku_id", ["brand", "product_name"])
+    assert not product.unique
+    assert join_rows(conn, FACT, [("sku_id", product, how)])[1] == sql_join(conn, how)
+
+
+def test_create_table_as_matches_ctas(conn):
+    product = Dimension.from_sqlite(conn, "sql_101_product", "sku_id", ["brand"])
+    store = Dimension.from_sqlite(conn, "sql_101_store", "store_id", ["store_name"])
+    count = create_table_as(conn, "joined", FACT, [("sku_id", product, "inner"), ("store_id", store, "inner")])
+    conn.execute("CREATE TABLE expected AS SELECT t.*, p.brand, s.store_name FROM sql_101_transactions t "
+                 "JOIN sql_101_product p ON p.sku_id = t.sku_id JOIN sql_101_store s ON s.store_id = t.store_id "
+                 "ORDER BY t.rowid")
+    assert count == conn.execute("SELECT COUNT(*) FROM expected").fetchone()[0]
+    assert conn.execute("SELECT * FROM joined").fetchall() == conn.execute("SELECT * FROM expected").fetchall()
+    assert ([row[1:3] for row in conn.execute("PRAGMA table_info(joined)")]
+            == [row[1:3] for row in conn.execute("PRAGMA table_info(expected)")])
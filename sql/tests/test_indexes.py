@@ -0,0 +1,31 @@
+import sqlite3
+
+import pytest
+
+from sql101 import indexes
+
+
+def test_apply_keeps_views_indexes_and_triggers(conn):
+    with conn:
+        conn.execute("CREATE VIEW recent AS SELECT * FROM sql_101_transactions WHERE transaction_date >= '2024-12-01'")
+        conn.execute("CREATE INDEX by_customer ON sql_101_transactions (customer_id)")
+        conn.execute("CREATE TABLE audit (id)")
+        conn.execute("CREATE TRIGGER audit_del AFTER DELETE ON sql_101_transactions "
+                     "BEGIN INSERT INTO audit VALUES (OLD.transaction_id); END")
+    before = conn.execute("SELECT * FROM recent ORDER BY transaction_id").fetchall()
+    indexes.apply(conn)
+    assert indexes.has_primary_key(conn, "sql_101_transactions")
+    assert conn.execute("SELECT * FROM recent ORDER BY transaction_id").fetchall() == before
+    with conn:
+        conn.execute("DELETE FROM sql_101_transactions WHERE transaction_id = 1")
+    assert conn.execute("SELECT id FROM audit").fetchall() == [(1,)]
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'by_customer'").fetchone()
+    assert conn.execute("PRAGMA legacy_alter_table").fetchone()[0] == 0
+
+
+def test_duplicate_ids_leave_the_table_alone(conn):
+    with conn:
+        conn.execute("INSERT INTO sql_101_transactions (transaction_id) VALUES (1)")
+    with pytest.raises(sqlite3.IntegrityError, match="duplicate"):
+        indexes.add_keys(conn)
+    assert not indexes.has_primary_key(conn, "sql_101_transactions")
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from sql101 import loader
+from sql101.schema import create_tables
+
+HEADER = "store_id,store_name,store_location,store_manager,store_open_date,store_phone\n"
+
+
+@pytest.fixture
+def empty(tmp_path):
+    conn = sqlite3.connect(tmp_path / "load.db")
+    create_tables(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def write(tmp_path, lines):
+    path = tmp_path / "stores.csv"
+    path.write_text(HEADER + "".join(line + "\n" for line in lines))
+    return str(path)
+
+
+GOOD = "1,A,Here,Ann,2020-01-01,555"
+
+
+def test_error_names_the_file_lines(empty, tmp_path):
+    path = write(tmp_path, [GOOD, GOOD, "x,B,There,Bob,2020-01-01,555", GOOD, "5,C,There,Bob,2020-02-30,555"])
+    with pytest.raises(loader.LoadError, match=r"line\(s\) 4, 6$"):
+        loader.load_csv(empty, "sql_101_store", path)
+    with pytest.raises(loader.LoadError, match=r"line\(s\) 4$"):
+        loader.load_csv(empty, "sql_101_store", path, chunk_size=2)
+    # The chunk holding line 4 was rolled back, the one before it stays
+    assert empty.execute("SELECT COUNT(*) FROM sql_101_store").fetchone()[0] == 2
+
+
+def test_short_rows_keep_the_line_numbers(empty, tmp_path):
+    path = write(tmp_path, [GOOD, "2,B", GOOD, "x,B,There,Bob,2020-01-01,555"])
+    with pytest.raises(loader.LoadError, match=r"line\(s\) 3$"):
+        loader.load_csv(empty, "sql_101_store", path)
+    stats = loader.load_csv(empty, "sql_101_store", path, errors="skip")
+    assert (stats["rows"], stats["skipped"]) == (2, 2)
+
+
+def test_refuses_an_open_transaction(empty, tmp_path):
+    empty.execute("INSERT INTO sql_101_store (store_id) VALUES (1)")
+    with pytest.raises(sqlite3.OperationalError):
+        loader.load_csv(empty, "sql_101_store", write(tmp_path, [GOOD]))
+
+
+@pytest.fixture
+def keyed(empty):
+    empty.execute("CREATE UNIQUE INDEX sql_101_store_id ON sql_101_store (store_id)")
+    empty.commit()
+    return empty
+
+
+def test_constraint_errors_are_load_errors(keyed, tmp_path):
+    path = write(tmp_path, [GOOD, "2,B,There,Bob,2020-01-01,555", GOOD])
+    with pytest.raises(loader.LoadError, match=r"UNIQUE constraint failed.* line\(s\) 4$") as error:
+        loader.load_csv(keyed, "sql_101_store", path, chunk_size=2, rebuild_indexes=False)
+    assert error.value.loaded_rows == 2
+    with pytest.raises(loader.LoadError, match=r"line\(s\) 2-4$"):
+        loader.load_csv(keyed, "sql_101_store", path, rebuild_indexes=False)
+    assert keyed.execute("SELECT COUNT(*) FROM sql_101_store").fetchone()[0] == 2
+
+
+def test_skip_leaves_out_repeated_keys(keyed, tmp_path):
+    path = write(tmp_path, [GOOD, "2,B,There,Bob,2020-01-01,555", GOOD, "x,B,There,Bob,2020-01-01,555"])
+    stats = loader.load_csv(keyed, "sql_101_store", path, errors="skip")
+    assert (stats["rows"], stats["skipped"]) == (2, 2)
+    assert keyed.execute("SELECT store_id FROM sql_101_store ORDER BY 1").fetchall() == [(1,), (2,)]
+    assert [name for name, _ in loader._indexes(keyed, "sql_101_store")] == ["sql_101_store_id"]
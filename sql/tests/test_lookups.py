@@ -0,0 +1,41 @@
+import pytest
+
+from sql101 import lookups
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM sql_101_transactions WHERE sku_id = 6",
+     ("SELECT * FROM sql_101_transactions WHERE sku_id = ?", (6,))),
+    ("SELECT * FROM sql_101_product WHERE product_name = 'Spaghetti N5' AND list_price > 2.5",
+     ("SELECT * FROM sql_101_product WHERE product_name = ? AND list_price > ?", ("Spaghetti N5", 2.5))),
+    ("SELECT * FROM sql_101_product WHERE product_name LIKE 'O''Brien%' LIMIT 10",
+     ("SELECT * FROM sql_101_product WHERE product_name LIKE ? LIMIT 10", ("O'Brien%",))),
+    ("SELECT ROUND(list_price, 2), 'a = 1' FROM sql_101_product GROUP BY 1",
+     ("SELECT ROUND(list_price, 2), 'a = 1' FROM sql_101_product GROUP BY 1", ())),
+    ('SELECT "a = 1" FROM t -- WHERE x = 2\nWHERE y <> -3',
+     ('SELECT "a = 1" FROM t -- WHERE x = 2\nWHERE y <> ?', (-3,))),
+    ("SELECT * FROM t WHERE a = 1 AND b = ?", ("SELECT * FROM t WHERE a = 1 AND b = ?", ())),
+    ("SELECT * FROM t WHERE id = 99999999999999999999", ("SELECT * FROM t WHERE id = ?", (1e20,))),
+])
+def test_parameterize(sql, expected):
+    assert lookups.parameterize(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM sql_101_transactions WHERE sku_id = 6",
+    "SELECT * FROM sql_101_transactions WHERE price_per_unit >= 2.5 AND customer_id != 101",
+    "SELECT * FROM sql_101_product WHERE product_name LIKE 'S%'",
+    "SELECT * FROM sql_101_transactions WHERE amount = 1e0",
+    "SELECT * FROM sql_101_transactions WHERE transaction_date < '2021-01-01'",
+])
+def test_parameterized_queries_return_the_same_rows(conn, sql):
+    assert lookups.parameterize(sql)[1]
+    assert lookups.query(conn, sql) == conn.execute(sql).fetchall()
+
+
+def test_lookup_many_matches_lookup(conn):
+    keys = [1, 2, 3, 2, None, -1] + list(range(100, 130))
+    found = lookups.lookup_many(conn, "sql_101_transactions", "customer_id", keys, batch_size=7)
+    assert list(found) == list(dict.fromkeys(keys))
+    for key in found:
+        assert sorted(found[key]) == sorted(lookups.lookup(conn, "sql_101_transactions", "customer_id", key))
@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from sql101.memdb import MemoryDB
+
+COUNT = "SELECT COUNT(*) FROM sql_101_store"
+
+
+@pytest.fixture
+def work(generated):
+    work = MemoryDB(str(generated))
+    yield work
+    work.close()
+
+
+def test_restore_snapshots(work):
+    stores = work.conn.execute(COUNT).fetchone()[0]
+    with work.conn:
+        work.conn.execute("DELETE FROM sql_101_store WHERE store_id = 1")
+    work.snapshot("one less")
+    with work.conn:
+        work.conn.execute("DELETE FROM sql_101_store")
+    # Other connections share the in-memory copy
+    assert work.connect().execute(COUNT).fetchone()[0] == 0
+    work.restore("one less")
+    assert work.conn.execute(COUNT).fetchone()[0] == stores - 1
+    work.restore()
+    assert work.conn.execute(COUNT).fetchone()[0] == stores
+
+
+def test_restore_rolls_back_conn_and_refuses_other_writers(work):
+    stores = work.conn.execute(COUNT).fetchone()[0]
+    work.conn.execute("DELETE FROM sql_101_store")
+    work.restore()
+    assert work.conn.execute(COUNT).fetchone()[0] == stores
+    other = work.connect()
+    other.execute("DELETE FROM sql_101_store")
+    with pytest.raises(sqlite3.OperationalError):
+        work.restore()
+    with pytest.raises(sqlite3.OperationalError):
+        work.snapshot("busy")
+    other.rollback()
+    other.close()
+
+
+def test_checkpoint(work, tmp_path):
+    target = tmp_path / "checkpoint.db"
+    with work.conn:
+        work.conn.execute("DELETE FROM sql_101_store WHERE store_id = 1")
+    assert work.checkpoint(str(target)) is not None
+    disk = sqlite3.connect(target)
+    assert disk.execute(COUNT).fetchone()[0] == work.conn.execute(COUNT).fetchone()[0]
+    disk.close()
+    assert work.checkpoints == 1
+
+
+def test_checkpoint_skips_open_write_transactions(work, tmp_path):
+    target = tmp_path / "checkpoint.db"
+    other = work.connect()
+    other.execute("DELETE FROM sql_101_store")
+    assert work.checkpoint(str(target)) is None
+    other.commit()
+    other.close()
+    assert work.checkpoint(str(target)) is not None
+    disk = sqlite3.connect(target)
+    assert disk.execute(COUNT).fetchone()[0] == 0
+    disk.close()
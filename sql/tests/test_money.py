@@ -0,0 +1,36 @@
+import pytest
+
+from sql101 import money
+
+TABLE = "sql_101_transactions"
+
+
+def test_migrate_and_revert_round_trip(conn):
+    before = conn.execute(f"SELECT * FROM {TABLE} ORDER BY transaction_id").fetchall()
+    assert money.migrate(conn, TABLE) == len(before)
+    assert conn.execute(f"SELECT * FROM {TABLE} ORDER BY transaction_id").fetchall() == before
+    with conn:
+        conn.execute(f"UPDATE {TABLE} SET price_per_unit = 0.1 WHERE transaction_id = 1")
+        conn.execute(f"INSERT INTO {TABLE} VALUES (999999, '2024-01-01', 1, 3, 0.2, 1, 1)")
+    assert conn.execute(f"SELECT price_per_unit FROM {TABLE} WHERE transaction_id IN (1, 999999) "
+                        f"ORDER BY transaction_id").fetchall() == [(0.1,), (0.2,)]
+    money.revert(conn, TABLE)
+    assert not money.is_migrated(conn, TABLE)
+    assert conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0] == len(before) + 1
+
+
+def test_exact_sums(conn):
+    with conn:
+        conn.execute(f"DELETE FROM {TABLE}")
+        conn.executemany(f"INSERT INTO {TABLE} (transaction_id, amount, price_per_unit) VALUES (?, 1, ?)",
+                         [(i, 0.1) for i in range(10)])
+    sql = f"SELECT SUM(amount * price_per_unit) FROM {TABLE}"
+    assert conn.execute(sql).fetchone()[0] != 1.0
+    assert conn.execute(money.exact_sums(sql)).fetchone()[0] == 1.0
+
+
+def test_migrate_refuses_lossy_values(conn):
+    with conn:
+        conn.execute(f"UPDATE {TABLE} SET price_per_unit = 1.005 WHERE transaction_id = 1")
+    with pytest.raises(ValueError):
+        money.migrate(conn, TABLE)
@@ -0,0 +1,39 @@
+import pytest
+
+from sql101 import ext, parallel
+
+
+@pytest.fixture
+def ext_db(conn, tmp_path):
+    ext.rebuild(conn)
+    return str(tmp_path / "copy.db")
+
+
+def sqlite_aggregate(conn, columns, group_by="", where=""):
+    sql = f"SELECT {columns} FROM {parallel.EXT_TABLE} {where}"
+    if group_by:
+        sql += f" GROUP BY {group_by} ORDER BY {group_by}"
+    return conn.execute(sql).fetchall()
+
+
+@pytest.mark.parametrize("shard_by, workers", [("rowid", 1), ("store", 1), ("rowid", 2)])
+def test_grouped_aggregates_match_sqlite(conn, ext_db, shard_by, workers):
+    rows = parallel.aggregate(ext_db, [("count", "*"), ("sum", "amount"), ("min", "transaction_date"),
+                                       ("max", "price_per_unit"), ("avg", "tot_spent")],
+                              group_by=["store_name"], where=[("amount", ">", 1)], shard_by=shard_by,
+                              workers=workers, n_shards=5)
+    expected = sqlite_aggregate(conn, "store_name, COUNT(*), SUM(amount), MIN(transaction_date), "
+                                "MAX(price_per_unit), AVG(tot_spent)", "store_name", "WHERE amount > 1")
+    assert [row[:5] for row in rows] == [row[:5] for row in expected]
+    assert [row[5] for row in rows] == pytest.approx([row[5] for row in expected])
+
+
+def test_no_rows_gives_one_row_like_sqlite(conn, ext_db):
+    where = [("amount", "<", -1)]
+    rows = parallel.aggregate(ext_db, [("count", "*"), ("avg", "amount")], where=where, workers=1)
+    assert rows == sqlite_aggregate(conn, "COUNT(*), AVG(amount)", where="WHERE amount < -1")
+
+
+def test_unknown_operator(ext_db):
+    with pytest.raises(ValueError):
+        parallel.aggregate(ext_db, where=[("amount", "LIKE", 1)], workers=1)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from sql101 import indexes, partitions
+
+TABLE = partitions.SOURCE_TABLE
+
+
+def rows(conn, sql="SELECT * FROM sql_101_transactions"):
+    return sorted(conn.execute(sql).fetchall(), key=repr)
+
+
+@pytest.fixture
+def split(conn):
+    """The generated database with the fact table split, and its rows from before."""
+    before = rows(conn)
+    partitions.partition(conn)
+    return conn, before
+
+
+def test_partition_moves_the_rows(split):
+    conn, before = split
+    assert not indexes.table_exists(conn, TABLE)
+    assert rows(conn) == before
+    assert sum(conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+               for _, name in partitions.partitions(conn)) == len(before)
+    assert partitions.partition(conn) == {}
+
+
+def test_routes_to_the_months_in_range(split):
+    conn, before = split
+    sql = f"SELECT COUNT(*), SUM(amount) FROM {TABLE} WHERE transaction_date >= '2024-06-01' " \
+          f"AND transaction_date <= '2024-07-31'"
+    routed, months = partitions.route(conn, sql)
+    # Dates that aren't YYYY-MM-... can still compare in range
+    assert months == ["2024-06", "2024-07", partitions.OTHER]
+    assert conn.execute(routed).fetchall() == conn.execute(sql).fetchall()
+    assert conn.execute(routed).fetchone()[0] == sum(
+        1 for row in before if row[1] is not None and "2024-06-01" <= row[1] <= "2024-07-31")
+
+
+@pytest.mark.parametrize("where", [
+    "transaction_date > '2024-06-01' OR store_id = 1",
+    "NOT transaction_date > '2024-06-01'",
+    "(transaction_date > '2024-06-01') = 0",
+])
+def test_unreadable_predicates_read_everything(split, where):
+    conn, _ = split
+    sql = f"SELECT COUNT(*) FROM {TABLE} WHERE {where}"
+    routed, months = partitions.route(conn, sql)
+    assert months == [month for month, _ in partitions.partitions(conn)]
+    assert routed == sql
+
+
+def test_writes_go_through_the_view(split):
+    conn, before = split
+    with conn:
+        conn.execute(f"INSERT INTO {TABLE} VALUES (900001, '2024-03-15', 1, 2, 1.5, 1, 1)")
+        conn.execute(f"UPDATE {TABLE} SET transaction_date = '2024-04-01' WHERE transaction_id = 900001")
+        conn.execute(f"DELETE FROM {TABLE} WHERE transaction_id = 1")
+    by_month = dict(partitions.partitions(conn))
+    assert conn.execute(f"SELECT transaction_id FROM {by_month['2024-04']} WHERE transaction_id = 900001").fetchone()
+    assert not conn.execute(f"SELECT 1 FROM {by_month['2024-03']} WHERE transaction_id = 900001").fetchone()
+    assert len(rows(conn)) == len(before)
+    with pytest.raises(sqlite3.IntegrityError, match="no partition"):
+        conn.execute(f"INSERT INTO {TABLE} VALUES (900002, '1999-01-01', 1, 1, 1.0, 1, 1)")
+
+
+def test_drop_partition_frees_the_month(split):
+    conn, before = split
+    month, name = partitions.partitions(conn)[0]
+    partitions.drop_partition(conn, month)
+    assert not indexes.table_exists(conn, name)
+    assert len(rows(conn)) == sum(1 for row in before if partitions._month_of(row[1]) != month)
+
+
+def test_insert_rows_routes_bad_dates_to_other(split):
+    conn, before = split
+    counts = partitions.insert_rows(conn, [
+        (900001, "2024-13-01", 1, 1, 1.0, 1, 1),
+        (900002, None, 1, 1, 1.0, 1, 1),
+        (900003, "1999-03-15", 1, 1, 1.0, 1, 1),
+    ])
+    assert counts == {partitions.OTHER: 2, "1999-03": 1}
+    assert len(rows(conn)) == len(before) + 3
+
+
+def test_unpartition_restores_the_table(split):
+    conn, before = split
+    partitions.unpartition(conn)
+    assert indexes.table_exists(conn, TABLE)
+    assert rows(conn) == before
+    assert partitions.partitions(conn) == []
+
+
+def test_partitions_carry_the_indexes(conn):
+    with conn:
+        conn.execute(f"CREATE INDEX by_date ON {TABLE} (transaction_date)")
+    partitions.partition(conn)
+    month, name = partitions.partitions(conn)[0]
+    assert [row[1] for row in conn.execute(f"PRAGMA index_list({name})")] == [f"by_date{name[len(TABLE):]}"]
+    partitions.unpartition(conn)
+    assert [row[1] for row in conn.execute(f"PRAGMA index_list({TABLE})")] == ["by_date"]
@@ -0,0 +1,27 @@
+from sql101 import ext, rollups
+
+
+def add_transactions(conn, n=50):
+    with conn:
+        conn.execute(
+            "INSERT INTO sql_101_transactions SELECT transaction_id + (SELECT MAX(transaction_id) FROM "
+            "sql_101_transactions), '2024-12-30', customer_id, amount + 1, price_per_unit, sku_id, store_id "
+            "FROM sql_101_transactions ORDER BY transaction_id LIMIT ?", (n,))
+
+
+def test_incremental_matches_rebuild(conn):
+    ext.refresh(conn)
+    rollups.enable(conn)
+    add_transactions(conn)
+    with conn:
+        conn.execute("UPDATE sql_101_product SET brand = 'Renamed' WHERE sku_id = 1")
+        conn.execute("DELETE FROM sql_101_transactions WHERE transaction_id % 97 = 0")
+    assert ext.refresh(conn)["mode"] == "incremental"
+    assert ext.check(conn)["ok"]
+    incremental = {name: rollups.metrics(conn, name) for name in rollups.ROLLUPS}
+    for name in rollups.ROLLUPS:
+        assert rollups.check(conn, name) == 0
+
+    ext.refresh(conn, force_rebuild=True)
+    assert rollups.has_triggers(conn)
+    assert {name: rollups.metrics(conn, name) for name in rollups.ROLLUPS} == incremental
@@ -0,0 +1,12 @@
+from sql101 import ext, indexes, search
+
+
+def test_search_survives_add_keys_and_ext_rebuild(conn):
+    ext.refresh(conn)
+    search.enable(conn)
+    indexes.apply(conn)
+    ext.refresh(conn, force_rebuild=True)
+    assert search.is_enabled(conn, "product") and search.is_enabled(conn, "ext")
+    with conn:
+        conn.execute("UPDATE sql_101_product SET product_name = 'Zanzibar' WHERE sku_id = 1")
+    assert search.search(conn, "zanzibar") == [1]
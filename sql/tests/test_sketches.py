@@ -0,0 +1,39 @@
+import pytest
+
+from sql101 import sketches
+
+
+@pytest.fixture
+def sketched(conn):
+    sketches.build(conn)
+    return conn
+
+
+@pytest.mark.parametrize("metric, dimension, keys", [
+    ("customers", None, None),
+    ("customer_skus", None, None),
+    ("customers", "sku", [1, 2, 3]),
+    ("skus", "store", [1]),
+])
+def test_estimates_bracket_the_exact_count(sketched, metric, dimension, keys):
+    estimate = sketches.estimate(sketched, metric, dimension, keys)
+    exact = sketches.exact_count(sketched, metric, dimension, keys)
+    assert estimate["low"] <= exact <= estimate["high"]
+    assert sketches.estimate(sketched, metric, dimension, keys, exact=True)["estimate"] == exact
+
+
+def test_inserts_are_folded_in(sketched):
+    with sketched:
+        sketched.execute("INSERT INTO sql_101_transactions (transaction_id, transaction_date, customer_id, amount, "
+                         "price_per_unit, sku_id, store_id) SELECT transaction_id + 1000000, transaction_date, "
+                         "customer_id + 1000000, amount, price_per_unit, sku_id, store_id "
+                         "FROM sql_101_transactions")
+    assert sketched.execute("SELECT COUNT(*) FROM sql101_hll_pending").fetchone()[0] == 2000
+    estimate = sketches.estimate(sketched, "customers")
+    assert estimate["low"] <= sketches.exact_count(sketched, "customers") <= estimate["high"]
+    assert sketched.execute("SELECT COUNT(*) FROM sql101_hll_pending").fetchone()[0] == 0
+
+
+def test_precision_is_checked(conn):
+    with pytest.raises(ValueError):
+        sketches.build(conn, precision=8)
@@ -0,0 +1,20 @@
+import pytest
+
+from sql101 import totals
+
+
+@pytest.mark.parametrize("stored", [True, False])
+def test_add_column_keeps_views(conn, stored):
+    with conn:
+        conn.execute("CREATE VIEW big AS SELECT transaction_id FROM sql_101_transactions "
+                     "WHERE amount * price_per_unit > 10")
+    expected = conn.execute("SELECT * FROM big ORDER BY 1").fetchall()
+    totals.add_column(conn, stored=stored)
+    assert totals.has_column(conn)
+    assert conn.execute("SELECT * FROM big ORDER BY 1").fetchall() == expected
+    assert conn.execute("SELECT transaction_id FROM sql_101_transactions WHERE tot_spent > 10 "
+                        "ORDER BY 1").fetchall() == expected
+
+
+def test_rewrite():
+    assert totals.rewrite("SELECT t.amount * t.price_per_unit AS total FROM t") == "SELECT t.tot_spent AS total FROM t"